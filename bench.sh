@@ -0,0 +1,4 @@
+#This ensures that the src directory is included in the Python path, allowing imports
+export PYTHONPATH=$(pwd)/src
+#Run the build benchmarks, e.g. ./bench.sh --pages 500 --compare baseline.json
+python3 src/bench/bench.py "$@"
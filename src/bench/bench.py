@@ -0,0 +1,200 @@
+"""Build benchmarks.
+
+Generates a synthetic content tree and measures the throughput of each
+build stage. Results can be saved as a baseline and later runs compared
+against it, failing when a stage regresses by more than the threshold.
+
+    python3 src/bench/bench.py --pages 500 --save baseline.json
+    python3 src/bench/bench.py --pages 500 --compare baseline.json
+"""
+
+import argparse
+import json
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+from corpus import generate_corpus
+from build import build_site
+from main import parse_args, resolve_paths
+from markdown import (
+    markdown_to_blocks,
+    block_to_block_type,
+    markdown_to_html_node,
+    text_to_children,
+    BlockType,
+)
+
+TEMPLATE = "<html><head><title>{{ Title }}</title></head><body>{{ Content }}</body></html>"
+
+
+def best_time(func, repeat):
+    """Runs func repeat times and returns (fastest wall time, last result)."""
+    best = None
+    result = None
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = func()
+        elapsed = time.perf_counter() - started
+        best = elapsed if best is None else min(best, elapsed)
+    return best, result
+
+
+def bench_stages(documents, repeat):
+    """Measures each stage of markdown rendering over the documents.
+    Returns {stage: {"unit": ..., "count": ..., "seconds": ..., "rate": ...}}."""
+    results = {}
+
+    def record(stage, unit, count, seconds):
+        results[stage] = {
+            "unit": unit,
+            "count": count,
+            "seconds": seconds,
+            "rate": count / seconds if seconds else 0.0,
+        }
+
+    seconds, blocks = best_time(
+        lambda: [block for md in documents for block in markdown_to_blocks(md)],
+        repeat,
+    )
+    record("markdown_to_blocks", "blocks", len(blocks), seconds)
+
+    seconds, types = best_time(lambda: [block_to_block_type(b) for b in blocks], repeat)
+    record("block_to_block_type", "blocks", len(blocks), seconds)
+
+    paragraphs = [
+        " ".join(line.strip() for line in block.split("\n"))
+        for block, block_type in zip(blocks, types)
+        if block_type == BlockType.paragraph
+    ]
+    seconds, nodes = best_time(
+        lambda: sum(len(text_to_children(text)) for text in paragraphs), repeat
+    )
+    record("text_to_children", "inline nodes", nodes, seconds)
+
+    trees = [markdown_to_html_node(md) for md in documents]
+    seconds, html_bytes = best_time(
+        lambda: sum(len(tree.to_html().encode()) for tree in trees), repeat
+    )
+    record("to_html", "HTML bytes", html_bytes, seconds)
+
+    seconds, _ = best_time(
+        lambda: [markdown_to_html_node(md).to_html() for md in documents], repeat
+    )
+    record("markdown_to_html", "pages", len(documents), seconds)
+    return results
+
+
+def bench_build(site_dir, pages, repeat, jobs):
+    """Measures full (--force) builds of the site in site_dir."""
+    args = resolve_paths(parse_args(["--force", "--jobs", str(jobs)]), site_dir)
+    seconds, _ = best_time(lambda: build_site(args), repeat)
+    return {
+        "unit": "pages",
+        "count": pages,
+        "seconds": seconds,
+        "rate": pages / seconds if seconds else 0.0,
+    }
+
+
+def compare(results, baseline, threshold):
+    """Returns the stages whose rate dropped more than threshold below the
+    baseline, as (stage, baseline rate, rate) tuples."""
+    regressions = []
+    for stage, result in results.items():
+        if stage not in baseline:
+            continue
+        base_rate = baseline[stage]["rate"]
+        if base_rate and result["rate"] < base_rate * (1 - threshold):
+            regressions.append((stage, base_rate, result["rate"]))
+    return regressions
+
+
+def print_table(results, baseline=None):
+    print(f"{'stage':<22}{'rate':>16}  {'unit/s':<14}{'vs baseline':>12}")
+    for stage, result in results.items():
+        change = ""
+        if baseline and stage in baseline and baseline[stage]["rate"]:
+            change = f"{result['rate'] / baseline[stage]['rate'] - 1:+.1%}"
+        print(f"{stage:<22}{result['rate']:>16,.0f}  {result['unit']:<14}{change:>12}")
+
+
+def parse_bench_args(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the site build.")
+    parser.add_argument("--pages", type=int, default=200)
+    parser.add_argument("--blocks", type=int, default=20, help="blocks per page")
+    parser.add_argument("--paragraph-words", type=int, default=60)
+    parser.add_argument("--link-density", type=float, default=0.05)
+    parser.add_argument("--image-density", type=float, default=0.01)
+    parser.add_argument("--code-ratio", type=float, default=0.1)
+    parser.add_argument(
+        "--nesting", type=float, default=0.2, help="share of bold spans with nested markup"
+    )
+    parser.add_argument("--depth", type=int, default=2, help="section directory depth")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--jobs", type=int, default=1)
+    parser.add_argument("--save", metavar="PATH", help="save results as a baseline")
+    parser.add_argument("--compare", metavar="PATH", help="compare against a baseline")
+    parser.add_argument(
+        "--threshold",
+        type=float,
+        default=0.1,
+        help="allowed slowdown before a stage counts as a regression (default: 0.1)",
+    )
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_bench_args(argv)
+    site_dir = tempfile.mkdtemp(prefix="ssg-bench-")
+    try:
+        paths = generate_corpus(
+            os.path.join(site_dir, "content"),
+            pages=args.pages,
+            depth=args.depth,
+            seed=args.seed,
+            blocks=args.blocks,
+            paragraph_words=args.paragraph_words,
+            link_density=args.link_density,
+            image_density=args.image_density,
+            code_ratio=args.code_ratio,
+            nesting=args.nesting,
+        )
+        os.makedirs(os.path.join(site_dir, "static"))
+        with open(os.path.join(site_dir, "template.html"), "w") as fd:
+            fd.write(TEMPLATE)
+
+        documents = []
+        for path in paths:
+            with open(path) as fd:
+                documents.append(fd.read())
+
+        results = bench_stages(documents, args.repeat)
+        results["build"] = bench_build(site_dir, args.pages, args.repeat, args.jobs)
+    finally:
+        shutil.rmtree(site_dir)
+
+    baseline = None
+    if args.compare:
+        with open(args.compare) as fd:
+            baseline = json.load(fd)["results"]
+    print_table(results, baseline)
+
+    if args.save:
+        with open(args.save, "w") as fd:
+            json.dump({"options": vars(args), "results": results}, fd, indent=1)
+
+    if baseline:
+        regressions = compare(results, baseline, args.threshold)
+        for stage, base_rate, rate in regressions:
+            print(f"REGRESSION {stage}: {rate:,.0f}/s vs {base_rate:,.0f}/s baseline")
+        if regressions:
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
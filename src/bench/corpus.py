@@ -0,0 +1,95 @@
+import os
+import random
+
+WORDS = (
+    "the quick brown fox jumps over lazy dog elves dwarves hobbits wizard ring "
+    "mountain river forest shadow light journey fellowship tower king road"
+).split()
+
+
+def _sentence(rng, words, link_density, image_density, nesting):
+    """Returns words of text where each word may be replaced by inline markup."""
+    parts = []
+    for _ in range(words):
+        word = rng.choice(WORDS)
+        roll = rng.random()
+        if roll < link_density:
+            word = f"[{word}](/{rng.choice(WORDS)}/{rng.choice(WORDS)})"
+        elif roll < link_density + image_density:
+            word = f"![{word}](/images/{rng.choice(WORDS)}.png)"
+        elif roll < link_density + image_density + 0.05:
+            if rng.random() < nesting:
+                word = f"**{word} _{rng.choice(WORDS)}_ `{rng.choice(WORDS)}`**"
+            else:
+                word = f"**{word}**"
+        elif roll < link_density + image_density + 0.08:
+            word = f"_{word}_"
+        elif roll < link_density + image_density + 0.10:
+            word = f"`{word}`"
+        parts.append(word)
+    return " ".join(parts)
+
+
+def generate_page(
+    rng,
+    blocks=20,
+    paragraph_words=60,
+    link_density=0.05,
+    image_density=0.01,
+    code_ratio=0.1,
+    nesting=0.2,
+):
+    """Returns the markdown of one synthetic page: an h1 title followed by a
+    mix of paragraphs, headings, lists, quotes and code blocks."""
+    out = [f"# {_sentence(rng, 4, 0, 0, 0)}"]
+    for _ in range(blocks):
+        roll = rng.random()
+        if roll < code_ratio:
+            lines = [f"    {_sentence(rng, 6, 0, 0, 0)}" for _ in range(rng.randint(2, 10))]
+            out.append("```\n" + "\n".join(lines) + "\n```")
+        elif roll < code_ratio + 0.1:
+            out.append(f"{'#' * rng.randint(2, 4)} {_sentence(rng, 5, 0, 0, 0)}")
+        elif roll < code_ratio + 0.2:
+            items = rng.randint(2, 8)
+            out.append(
+                "\n".join(
+                    f"- {_sentence(rng, 10, link_density, 0, nesting)}"
+                    for _ in range(items)
+                )
+            )
+        elif roll < code_ratio + 0.25:
+            items = rng.randint(2, 8)
+            out.append(
+                "\n".join(
+                    f"{i + 1}. {_sentence(rng, 10, link_density, 0, nesting)}"
+                    for i in range(items)
+                )
+            )
+        elif roll < code_ratio + 0.3:
+            out.append(f"> {_sentence(rng, 20, link_density, 0, nesting)}")
+        else:
+            words = _sentence(
+                rng, paragraph_words, link_density, image_density, nesting
+            ).split(" ")
+            # Wrap paragraphs over several lines like hand-written markdown
+            out.append(
+                "\n".join(" ".join(words[i : i + 12]) for i in range(0, len(words), 12))
+            )
+    return "\n\n".join(out) + "\n"
+
+
+def generate_corpus(content_dir, pages=100, depth=2, seed=0, **page_options):
+    """Writes pages synthetic markdown pages under content_dir, spread over
+    nested sections depth directories deep. The same seed and options always
+    produce the same corpus. Returns the list of written paths."""
+    rng = random.Random(seed)
+    paths = []
+    for i in range(pages):
+        sections = [f"section{(i >> (3 * level)) % 8}" for level in range(depth)]
+        page_dir = os.path.join(content_dir, *sections, f"page{i}")
+        os.makedirs(page_dir, exist_ok=True)
+        path = os.path.join(page_dir, "index.md")
+        with open(path, "w") as fd:
+            fd.write(generate_page(rng, **page_options))
+        paths.append(path)
+    return paths
@@ -0,0 +1,703 @@
+import logging
+import os
+import time
+import traceback
+from collections import namedtuple
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from contextlib import nullcontext
+from functools import partial
+from buildlog import Progress, flush_logging
+from cache import FragmentCache
+from compress import Compressor
+from feeds import SiteFeeds, remove_terms
+from manifest import (
+    HashCache,
+    load_manifest,
+    save_manifest,
+    file_fingerprint,
+    remove_stale_outputs,
+)
+from page import process_md_file
+from profiling import PageRecorder, Profiler, SITE
+from staticfiles import copytree
+from template import Template
+from writer import OutputWriter
+
+logger = logging.getLogger(__name__)
+
+# Small pages are sent to workers in batches so pickling and IPC overhead is
+# paid once per batch rather than once per page.
+BATCH_MAX_PAGES = 64
+BATCH_MAX_BYTES = 1 << 20
+
+# What rendering one page produced. error is formatted text instead of a
+# raised exception, so one broken page doesn't abort the rest of the build.
+# timings are the page's profiling stages, or None when the build isn't
+# profiled; cache_counts are its (memory hits, disk hits, misses) in the
+# fragment cache, or None without one. unchanged is set when the page was
+# rendered to the same HTML its output already held, reasons lists why
+# it was rendered when the build explains itself, and terms are the search
+# terms of a rendered page when the build collects them.
+PageResult = namedtuple(
+    "PageResult",
+    [
+        "rel_path",
+        "entry",
+        "rendered",
+        "error",
+        "timings",
+        "cache_counts",
+        "unchanged",
+        "reasons",
+        "terms",
+    ],
+    defaults=[None, None, False, None, None],
+)
+
+# Settings shared by every page of a build, set once per worker process
+_worker_settings = None
+# Each process keeps its fragment cache across batches and, in watch mode,
+# across rebuilds; the on-disk tier is what processes share
+_fragment_caches = {}
+# Source hashes remembered between the builds of a resident process
+_source_hashes = HashCache()
+# Each process's Compressor, by (codecs, min_size)
+_compressors = {}
+
+
+class RenderSettings:
+    """What every page of a build needs besides its own source: the input
+    and output directories, the Template compiled once for the build, the
+    base_path, whether stage timings are recorded, the fragment cache
+    configuration (cache_size 0 disables the cache, cache_dir None keeps it
+    in memory only), the size from which sources are memory-mapped (None
+    never maps them), how many threads write pages in the background (0
+    writes them on the rendering thread), the static directory whose files
+    pages are checked against (None ignores them), whether the reasons
+    pages are rebuilt are logged, whether each page's title, excerpt and
+    search terms are recorded for the site feeds, the directory the terms
+    are kept in (None keeps them in memory only), whether the build runs in
+    a resident process (the daemon), which remembers source hashes between
+    builds, the codecs pages are compressed with (None for none) along
+    with the size below which they aren't, and whether pages are
+    minified."""
+
+    def __init__(
+        self,
+        content_dir,
+        public_dir,
+        template,
+        base_path,
+        profile=False,
+        cache_dir=None,
+        cache_size=0,
+        mmap_threshold=None,
+        write_threads=0,
+        static_dir=None,
+        explain=False,
+        summarize=False,
+        terms_dir=None,
+        resident=False,
+        compress=None,
+        compress_min_size=0,
+        minify=False,
+    ):
+        self.content_dir = content_dir
+        self.public_dir = public_dir
+        self.template = template
+        self.base_path = base_path
+        self.profile = profile
+        self.cache_dir = cache_dir
+        self.cache_size = cache_size
+        self.mmap_threshold = mmap_threshold
+        self.write_threads = write_threads
+        self.static_dir = static_dir
+        self.explain = explain
+        self.summarize = summarize
+        self.terms_dir = terms_dir
+        self.resident = resident
+        self.compress = compress
+        self.compress_min_size = compress_min_size
+        self.minify = minify
+
+    @classmethod
+    def from_args(cls, args, template, profile=False, resident=False):
+        return cls(
+            args.content_dir,
+            args.public_dir,
+            template,
+            args.base_path,
+            profile,
+            args.fragment_cache,
+            args.fragment_cache_size if args.fragment_cache else 0,
+            args.mmap_threshold,
+            args.write_threads,
+            args.static_dir,
+            args.explain,
+            bool(args.site_url),
+            args.terms_dir,
+            resident,
+            args.compress,
+            args.compress_min_size,
+            args.minify,
+        )
+
+
+def get_fragment_cache(settings):
+    """Returns this process's FragmentCache for settings, or None when
+    caching is disabled."""
+    if not settings.cache_size:
+        return None
+    key = (settings.cache_dir, settings.cache_size)
+    cache = _fragment_caches.get(key)
+    if cache is None:
+        cache = _fragment_caches[key] = FragmentCache(settings.cache_dir, settings.cache_size)
+    return cache
+
+
+def get_compressor(settings):
+    """Returns this process's Compressor for settings, or None when pages
+    aren't compressed. It compresses on the calling thread, i.e. on the
+    OutputWriter's threads."""
+    if not settings.compress:
+        return None
+    key = (tuple(settings.compress), settings.compress_min_size)
+    compressor = _compressors.get(key)
+    if compressor is None:
+        compressor = _compressors[key] = Compressor(
+            settings.compress, settings.compress_min_size
+        )
+    return compressor
+
+
+def discover_pages(content_dir, listings=None):
+    """Walks content_dir and returns (root, file, rel_path) for every markdown
+    file, sorted so builds process pages in a deterministic order.
+
+    listings, if given, is a dict that remembers each directory's
+    subdirectories and pages along with its mtime, which changes whenever
+    an entry is added, removed or renamed. Directories whose mtime is
+    unchanged since the previous walk are not listed again.
+    """
+    tasks = []
+    stack = [(content_dir, "")]
+    while stack:
+        root, rel_root = stack.pop()
+        try:
+            mtime = os.stat(root).st_mtime_ns
+        except OSError:
+            continue
+        listing = listings.get(root) if listings is not None else None
+        if listing is None or listing[0] != mtime:
+            listing = (mtime, *_list_dir(root, rel_root))
+            if listings is not None:
+                listings[root] = listing
+        _, dirs, pages = listing
+        tasks.extend(pages)
+        # Subdirectories are visited in sorted order, like a sorted os.walk
+        stack.extend(
+            (os.path.join(root, name), os.path.join(rel_root, name))
+            for name in reversed(dirs)
+        )
+    return tasks
+
+
+def _list_dir(path, rel_path):
+    """Returns the sorted subdirectories (not following symlinks) of the
+    directory at path, which is rel_path in the content directory, and a
+    (root, file, rel_path) task for each of its markdown files."""
+    dirs = []
+    files = []
+    try:
+        entries = list(os.scandir(path))
+    except OSError:
+        return (), ()
+    for entry in entries:
+        if entry.is_dir():
+            if not entry.is_symlink():
+                dirs.append(entry.name)
+        elif entry.name.endswith(".md"):
+            files.append(entry.name)
+    pages = tuple((path, file, os.path.join(rel_path, file)) for file in sorted(files))
+    return tuple(sorted(dirs)), pages
+
+
+def batch_tasks(tasks, max_pages=BATCH_MAX_PAGES, max_bytes=BATCH_MAX_BYTES):
+    """Groups tasks into batches of at most max_pages pages or max_bytes of
+    markdown; a single file larger than max_bytes gets a batch of its own."""
+    batches = []
+    batch = []
+    batch_bytes = 0
+    for task in tasks:
+        root, file = task[0], task[1]
+        size = os.path.getsize(os.path.join(root, file))
+        if batch and (len(batch) >= max_pages or batch_bytes + size > max_bytes):
+            batches.append(batch)
+            batch = []
+            batch_bytes = 0
+        batch.append(task)
+        batch_bytes += size
+    if batch:
+        batches.append(batch)
+    return batches
+
+
+def _init_worker(settings):
+    global _worker_settings
+    _worker_settings = settings
+
+
+def _render_task(task, settings, writer=None):
+    """Renders one page and returns its PageResult."""
+    root, file, rel_path, previous = task
+    recorder = PageRecorder(rel_path) if settings.profile else None
+    cache = get_fragment_cache(settings)
+    before = cache and cache.counts()
+    reasons = [] if settings.explain else None
+    terms = [] if settings.summarize else None
+    hashes = _source_hashes if settings.resident else None
+    try:
+        entry, rendered = process_md_file(
+            root,
+            file,
+            settings.content_dir,
+            settings.public_dir,
+            settings.template,
+            settings.base_path,
+            previous=previous,
+            recorder=recorder,
+            cache=cache,
+            mmap_threshold=settings.mmap_threshold,
+            writer=writer,
+            static_dir=settings.static_dir,
+            reasons=reasons,
+            summarize=settings.summarize,
+            hashes=hashes,
+            compress=settings.compress,
+            minify=settings.minify,
+            terms_dir=settings.terms_dir,
+            terms=terms,
+        )
+    except Exception:
+        return PageResult(rel_path, None, False, traceback.format_exc(limit=3))
+    if cache is not None:
+        cache_counts = tuple(a - b for a, b in zip(cache.counts(), before))
+    else:
+        cache_counts = None
+    return PageResult(
+        rel_path,
+        entry,
+        rendered,
+        None,
+        recorder and recorder.stages,
+        cache_counts,
+        reasons=reasons,
+        terms=terms if rendered else None,
+    )
+
+
+def render_batch(batch, settings):
+    """Renders a batch of tasks, returning a PageResult for each.
+    With settings.write_threads, pages are written in the background while
+    the rest of the batch renders; a page whose write fails is reported as
+    an error like one that failed to render."""
+    # A writer lives for one batch only: its record of created directories
+    # must not outlast stale outputs being pruned after the build
+    with OutputWriter(settings.write_threads, compressor=get_compressor(settings)) as writer:
+        results = [_render_task(task, settings, writer) for task in batch]
+        write_errors = writer.flush()
+
+    for i, result in enumerate(results):
+        if not result.rendered:
+            continue
+        dest_path = os.path.join(settings.public_dir, result.entry["output"])
+        error = write_errors.get(dest_path)
+        if error is not None:
+            results[i] = PageResult(result.rel_path, None, False, error)
+        elif dest_path in writer.unchanged:
+            results[i] = result._replace(unchanged=True)
+    # Worker processes exit without writing out buffered log records
+    flush_logging()
+    return results
+
+
+def _render_batch(batch):
+    return render_batch(batch, _worker_settings)
+
+
+def render_pages(
+    tasks,
+    settings,
+    jobs=1,
+    profiler=None,
+    progress=False,
+    stats=None,
+    on_page=None,
+    executor=None,
+):
+    """Renders every task and returns (pages, errors).
+
+    tasks are (root, file, rel_path, previous_entry) tuples and settings is
+    a RenderSettings. When settings.profile is set, each page's stage
+    timings are added to profiler. progress reports pages as they complete,
+    and if stats is a dict the number of pages rendered (of which changed
+    and unchanged, i.e. rendered to the HTML already on disk) and already
+    up to date, and the fragment cache's cache_memory_hits, cache_disk_hits
+    and cache_misses, are stored in it. on_page, if given, is called with
+    the rel_path, entry and search terms (None unless it was rendered) of
+    each page that built, in task order, as soon as its batch is done.
+    With jobs > 1 pages are rendered in a process pool, which is executor
+    when one is given so its workers (and their caches) outlive the build.
+    Results are always collected in task order, so the manifest and
+    reports are identical whatever the number of jobs.
+    """
+    pages = {}
+    errors = []
+    rendered_count = 0
+    unchanged_count = 0
+    cache_counts = [0, 0, 0]
+    counter = Progress(len(tasks), "Pages") if progress and tasks else None
+
+    if jobs <= 1:
+        pool = nullcontext()
+    elif executor is not None:
+        # The pool serves many builds, so settings go along with each batch
+        pool = nullcontext(executor)
+    else:
+        pool = ProcessPoolExecutor(
+            max_workers=jobs, initializer=_init_worker, initargs=(settings,)
+        )
+
+    with pool as pool_executor:
+        if pool_executor is None:
+            batch_results = (render_batch(batch, settings) for batch in batch_tasks(tasks))
+        elif executor is not None:
+            batch_results = pool_executor.map(
+                partial(render_batch, settings=settings), batch_tasks(tasks)
+            )
+        else:
+            batch_results = pool_executor.map(_render_batch, batch_tasks(tasks))
+
+        for results in batch_results:
+            for result in results:
+                if result.timings and profiler is not None:
+                    profiler.add(result.rel_path, result.timings)
+                if result.cache_counts is not None:
+                    for i, count in enumerate(result.cache_counts):
+                        cache_counts[i] += count
+                if result.reasons:
+                    logger.info(
+                        "Rebuilding %s: %s",
+                        result.rel_path,
+                        ", ".join(result.reasons),
+                        extra={"page": result.rel_path, "reasons": result.reasons},
+                    )
+                if result.error is None:
+                    pages[result.rel_path] = result.entry
+                    if on_page is not None:
+                        on_page(result.rel_path, result.entry, result.terms)
+                    rendered_count += result.rendered
+                    unchanged_count += result.unchanged
+                else:
+                    errors.append((result.rel_path, result.error))
+            if counter is not None:
+                counter.advance(len(results))
+
+    if stats is not None:
+        stats["rendered"] = rendered_count
+        stats["changed"] = rendered_count - unchanged_count
+        stats["unchanged"] = unchanged_count
+        stats["up_to_date"] = len(pages) - rendered_count
+        stats["cache_memory_hits"], stats["cache_disk_hits"], stats["cache_misses"] = cache_counts
+    return pages, errors
+
+
+def _timed_copytree(profiler, *args, stats, **kwargs):
+    started = PageRecorder(SITE).start()
+    files = copytree(*args, stats=stats, **kwargs)
+    profiler.record(SITE, "static_copy", started, stats["bytes"])
+    return files
+
+
+class BuildState:
+    """What a resident build process (the daemon) keeps between builds: the
+    manifest as last saved, compiled templates, the content directory
+    listings, and the worker pool for builds with more than one job.
+
+    Everything is checked against the files on disk before it is reused,
+    so builds run outside the daemon in the meantime are picked up.
+    """
+
+    def __init__(self):
+        self.manifest = None
+        self.manifest_fingerprint = None
+        self.templates = {}
+        self.listings = {}
+        self.executor = None
+        self.jobs = 0
+
+    def load_manifest(self, path):
+        fingerprint = file_fingerprint(path)
+        if self.manifest is None or fingerprint != self.manifest_fingerprint:
+            self.manifest = load_manifest(path)
+            self.manifest_fingerprint = fingerprint
+        return self.manifest
+
+    def save_manifest(self, path, manifest):
+        save_manifest(path, manifest)
+        self.manifest = manifest
+        self.manifest_fingerprint = file_fingerprint(path)
+
+    def template(self, path, base_path):
+        fingerprint = file_fingerprint(path)
+        cached = self.templates.get((path, base_path))
+        if cached is None or cached[0] != fingerprint:
+            cached = self.templates[path, base_path] = (
+                fingerprint,
+                Template.from_file(path, base_path),
+            )
+        return cached[1]
+
+    def discover_pages(self, content_dir):
+        return discover_pages(content_dir, self.listings)
+
+    def pool(self, jobs):
+        """Returns a process pool of jobs workers, kept for later builds
+        with as many jobs, or None for a single job."""
+        if jobs <= 1:
+            return None
+        if self.executor is None or self.jobs != jobs:
+            self.close()
+            self.executor = ProcessPoolExecutor(max_workers=jobs)
+            self.jobs = jobs
+            # Start the workers now, from the caller's state, rather than
+            # in the middle of whichever build first uses the pool
+            self.executor.submit(int).result()
+        return self.executor
+
+    def close(self):
+        if self.executor is not None:
+            self.executor.shutdown()
+            self.executor = None
+
+
+def build_site(args, profiler=None, state=None):
+    """Runs one incremental build. Returns the list of (rel_path, error)
+    for pages that failed to build.
+
+    When profiler (a profiling.Profiler) is given, or args.profile is set,
+    the time spent in each stage of each page is recorded; with
+    args.profile the report is also written out and summarized.
+    state, a BuildState, is given by resident processes to reuse what
+    earlier builds loaded instead of starting cold.
+    """
+    started = time.perf_counter()
+    if profiler is None and args.profile:
+        profiler = Profiler()
+    base_path = args.base_path
+    public_dir = args.public_dir
+    content_dir = args.content_dir
+
+    # The previous build's manifest tells us which pages are already up to
+    # date and which outputs are left over from pages and files since removed
+    if state is not None:
+        manifest = state.load_manifest(args.manifest_path)
+    else:
+        manifest = load_manifest(args.manifest_path)
+    previous_pages = manifest["pages"]
+
+    os.makedirs(public_dir, exist_ok=True)
+    logger.debug("Using base_path: %s", base_path)
+
+    # The template is read and compiled once, then shared by every page
+    if state is not None:
+        template = state.template(args.template_path, base_path)
+        discovered = state.discover_pages(content_dir)
+    else:
+        template = Template.from_file(args.template_path, base_path)
+        discovered = discover_pages(content_dir)
+    settings = RenderSettings.from_args(
+        args, template, profile=profiler is not None, resident=state is not None
+    )
+    # --force rebuilds every page, but still prunes what the manifest lists
+    tasks = [
+        (root, file, rel_path, None if args.force else previous_pages.get(rel_path))
+        for root, file, rel_path in discovered
+    ]
+
+    # Static files are synced in a background thread while pages render
+    static_stats = {}
+    page_stats = {}
+    feeds = None
+    if args.site_url:
+        feeds = SiteFeeds(public_dir, args.site_url, base_path, args.terms_dir)
+    static_compressor = None
+    if args.compress:
+        static_compressor = Compressor(
+            args.compress, args.compress_min_size, max(args.write_threads, 1)
+        )
+    with ThreadPoolExecutor(max_workers=1) as static_executor:
+        sync = copytree if profiler is None else partial(_timed_copytree, profiler)
+        static_future = static_executor.submit(
+            sync,
+            args.static_dir,
+            public_dir,
+            previous=manifest["static"],
+            link=args.link_static,
+            checksum=args.checksum,
+            stats=static_stats,
+            compressor=static_compressor,
+            stale_siblings=manifest.get("static_siblings", True),
+        )
+        pages, errors = render_pages(
+            tasks,
+            settings,
+            args.jobs,
+            profiler,
+            args.progress,
+            page_stats,
+            on_page=feeds and feeds.add,
+            executor=state and state.pool(args.jobs),
+        )
+        static_files = static_future.result()
+    if static_compressor is not None:
+        static_compressor.close()
+    if feeds is not None:
+        log_feeds(feeds, feeds.close())
+
+    # Pages that failed keep their previous output; leaving them out of the
+    # new manifest makes the next build retry them.
+    current_pages = dict(pages)
+    for rel_path, error in errors:
+        if rel_path in previous_pages:
+            current_pages[rel_path] = previous_pages[rel_path]
+    removed = remove_stale_outputs(previous_pages, current_pages, public_dir)
+    for output in removed:
+        logger.debug("Removed stale output %s", output)
+    if args.site_url:
+        for rel_path in previous_pages.keys() - current_pages.keys():
+            remove_terms(args.terms_dir, rel_path)
+
+    # A build that changed nothing leaves the manifest as it is, rather than
+    # serializing every page's entry again
+    # Whether static files may have compressed siblings; once a build
+    # without --compress has removed them, later ones skip the check
+    static_siblings = bool(args.compress)
+    if (
+        pages != previous_pages
+        or static_files != manifest["static"]
+        or static_siblings != manifest.get("static_siblings", True)
+        or not os.path.exists(args.manifest_path)
+    ):
+        manifest["pages"] = pages
+        manifest["static"] = static_files
+        manifest["static_siblings"] = static_siblings
+        if state is not None:
+            state.save_manifest(args.manifest_path, manifest)
+        else:
+            save_manifest(args.manifest_path, manifest)
+
+    logger.info(
+        "Built %d page(s) in %.2f s: %d rendered (%d changed, %d unchanged), "
+        "%d up to date, %d failed, %d stale removed; "
+        "%d static file(s) copied (%d bytes), %d removed",
+        len(tasks),
+        time.perf_counter() - started,
+        page_stats["rendered"],
+        page_stats["changed"],
+        page_stats["unchanged"],
+        page_stats["up_to_date"],
+        len(errors),
+        len(removed),
+        static_stats["copied"],
+        static_stats["bytes"],
+        static_stats["removed"],
+        extra={
+            "pages": len(tasks),
+            "rendered": page_stats["rendered"],
+            "changed": page_stats["changed"],
+            "unchanged": page_stats["unchanged"],
+            "up_to_date": page_stats["up_to_date"],
+            "failed": len(errors),
+            "stale_removed": len(removed),
+            "static_copied": static_stats["copied"],
+            "static_bytes": static_stats["bytes"],
+            "static_removed": static_stats["removed"],
+        },
+    )
+
+    if settings.cache_size:
+        hits = page_stats["cache_memory_hits"] + page_stats["cache_disk_hits"]
+        logger.info(
+            "Fragment cache: %d hit(s) (%d memory, %d disk), %d miss(es)",
+            hits,
+            page_stats["cache_memory_hits"],
+            page_stats["cache_disk_hits"],
+            page_stats["cache_misses"],
+            extra={
+                "cache_memory_hits": page_stats["cache_memory_hits"],
+                "cache_disk_hits": page_stats["cache_disk_hits"],
+                "cache_misses": page_stats["cache_misses"],
+            },
+        )
+
+    if args.profile:
+        profiler.write_json(args.profile, args.profile_top)
+        # Logged rather than printed, so -q silences it and json logs stay json
+        logger.info("%s", profiler.format_table(args.profile_top))
+        logger.info("Profile written to %s", args.profile)
+    return errors
+
+
+def log_feeds(feeds, terms):
+    logger.info(
+        "Wrote sitemap (%d page(s)), feed (%d item(s)) and search index (%d term(s))",
+        feeds.pages,
+        feeds.feed_items,
+        terms,
+        extra={"feed_items": feeds.feed_items, "search_terms": terms},
+    )
+
+
+def write_site_feeds(args, pages):
+    """Writes the sitemap, feed and search index for the manifest's pages
+    without rendering anything."""
+    feeds = SiteFeeds(args.public_dir, args.site_url, args.base_path, args.terms_dir)
+    for rel_path, entry in pages.items():
+        feeds.add(rel_path, entry)
+    log_feeds(feeds, feeds.close())
+
+
+def update_pages(args, manifest, template, rel_paths):
+    """Brings the given pages (paths relative to content_dir) up to date
+    without walking the whole site: existing sources are re-rendered if
+    their manifest entry is stale, and outputs of deleted ones are removed.
+    manifest is updated in place. Returns the list of (rel_path, error).
+    """
+    previous_pages = manifest["pages"]
+    tasks = []
+    removed = {}
+    for rel_path in sorted(rel_paths):
+        content_path = os.path.join(args.content_dir, rel_path)
+        if os.path.isfile(content_path):
+            root, file = os.path.split(content_path)
+            tasks.append((root, file, rel_path, previous_pages.get(rel_path)))
+        elif rel_path in previous_pages:
+            removed[rel_path] = previous_pages.pop(rel_path)
+
+    settings = RenderSettings.from_args(args, template)
+    pages, errors = render_pages(tasks, settings, jobs=args.jobs)
+    previous_pages.update(pages)
+    for output in remove_stale_outputs(removed, previous_pages, args.public_dir):
+        logger.debug("Removed stale output %s", output)
+    if args.site_url:
+        for rel_path in removed:
+            remove_terms(args.terms_dir, rel_path)
+    return errors
+
+
+def report_errors(errors):
+    for rel_path, error in errors:
+        logger.error("Failed to build %s:\n%s", rel_path, error, extra={"page": rel_path})
+    if errors:
+        logger.error("%d page(s) failed to build", len(errors))
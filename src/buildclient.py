@@ -0,0 +1,65 @@
+"""Asks a running build daemon (main.py --daemon) to build the site.
+
+Takes the same arguments as main.py and streams the build's output back.
+Only the standard library's socket support is imported, so a build
+request costs little more than starting the interpreter. Without a daemon
+the site is built in this process instead.
+"""
+
+import json
+import os
+import socket
+import sys
+
+SOCKET_NAME = ".build-daemon.sock"
+STOP_FLAG = "--stop-daemon"
+
+
+def socket_path(site_dir):
+    return os.path.join(site_dir, SOCKET_NAME)
+
+
+def request(path, message, stdout=None, stderr=None):
+    """Sends message to the daemon listening on path, copies the output it
+    streams back to stdout and stderr, and returns the exit status it
+    reports. Raises OSError when no daemon is listening."""
+    stdout = stdout or sys.stdout
+    stderr = stderr or sys.stderr
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as client:
+        client.connect(path)
+        client.sendall(json.dumps(message).encode() + b"\n")
+        with client.makefile("r") as replies:
+            for line in replies:
+                reply = json.loads(line)
+                if "status" in reply:
+                    return reply["status"]
+                stream = stdout if reply["stream"] == "stdout" else stderr
+                stream.write(reply["text"])
+                stream.flush()
+    stderr.write("Build daemon closed the connection\n")
+    return 1
+
+
+def main(argv=None):
+    argv = sys.argv[1:] if argv is None else argv
+    path = socket_path(os.getcwd())
+    if STOP_FLAG in argv:
+        message = {"stop": True}
+    else:
+        message = {"argv": argv}
+
+    try:
+        return request(path, message)
+    except (FileNotFoundError, ConnectionRefusedError):
+        pass
+
+    if "stop" in message:
+        sys.stderr.write(f"No build daemon is listening on {path}\n")
+        return 1
+    from main import main as build
+
+    return build(argv)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
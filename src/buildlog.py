@@ -0,0 +1,116 @@
+import json
+import logging
+import logging.handlers
+import sys
+import time
+
+# Records held before they are written out together
+BUFFER_CAPACITY = 256
+
+# LogRecord attributes that aren't user supplied "extra" fields
+_RECORD_ATTRS = set(vars(logging.makeLogRecord({}))) | {"message", "asctime"}
+
+
+class JsonFormatter(logging.Formatter):
+    """Formats each record as one JSON object per line, with any extra
+    fields passed to the logging call (e.g. extra={"page": ...}) included."""
+
+    def format(self, record):
+        entry = {
+            "time": time.strftime("%Y-%m-%dT%H:%M:%S", time.gmtime(record.created)),
+            "level": record.levelname.lower(),
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+        for key, value in vars(record).items():
+            if key not in _RECORD_ATTRS:
+                entry[key] = value
+        if record.exc_info:
+            entry["exception"] = self.formatException(record.exc_info)
+        return json.dumps(entry, default=str)
+
+
+class BufferedStreamHandler(logging.handlers.MemoryHandler):
+    """Holds up to capacity records and writes them to stream in one write,
+    so a build logging a line per file doesn't write once per line.
+    Records are written out as soon as a warning or error comes in, on
+    flush() and when the handler is closed, which logging does at exit."""
+
+    def __init__(self, stream, capacity=BUFFER_CAPACITY):
+        super().__init__(capacity, flushLevel=logging.WARNING)
+        self.stream = stream
+
+    def flush(self):
+        with self.lock:
+            if not self.buffer:
+                return
+            try:
+                self.stream.write("".join(self.format(record) + "\n" for record in self.buffer))
+                self.stream.flush()
+            except Exception:
+                self.handleError(self.buffer[-1])
+            self.buffer.clear()
+
+
+def setup_logging(verbosity=0, log_format="text", stream=None):
+    """Configures build logging, buffered by a BufferedStreamHandler.
+
+    verbosity 0 logs warnings and the build summary, 1 (-v) adds a line
+    per processed file, and -1 (-q) only logs warnings and errors.
+    """
+    if verbosity < 0:
+        level = logging.WARNING
+    elif verbosity == 0:
+        level = logging.INFO
+    else:
+        level = logging.DEBUG
+
+    handler = BufferedStreamHandler(stream or sys.stderr)
+    if log_format == "json":
+        handler.setFormatter(JsonFormatter())
+    else:
+        handler.setFormatter(logging.Formatter("%(message)s"))
+
+    root = logging.getLogger()
+    for old_handler in root.handlers[:]:
+        root.removeHandler(old_handler)
+        # Writes out what the old handler still holds
+        old_handler.close()
+    root.addHandler(handler)
+    root.setLevel(level)
+
+
+def flush_logging():
+    """Writes out the log records buffered so far, for output that has to
+    show up now, e.g. between rebuilds in watch mode."""
+    for handler in logging.getLogger().handlers:
+        handler.flush()
+
+
+class Progress:
+    """Reports how many of total items are done. On a terminal the counter is
+    redrawn in place; otherwise a line is logged every 10 percent."""
+
+    def __init__(self, total, label, stream=None):
+        self.total = total
+        self.label = label
+        self.done = 0
+        self.stream = stream or sys.stderr
+        self.interactive = self.stream.isatty()
+        self.next_report = 0
+
+    def advance(self, count=1):
+        self.done += count
+        if self.interactive:
+            # Buffered log lines go first, not after the counter
+            flush_logging()
+            self.stream.write(f"\r{self.label}: {self.done}/{self.total}")
+            if self.done >= self.total:
+                self.stream.write("\n")
+            self.stream.flush()
+        elif self.done >= self.next_report or self.done >= self.total:
+            logging.getLogger(__name__).info(
+                "%s: %d/%d", self.label, self.done, self.total,
+                extra={"done": self.done, "total": self.total},
+            )
+            self.next_report = self.done + max(self.total // 10, 1)
@@ -0,0 +1,79 @@
+import hashlib
+import os
+from collections import OrderedDict
+
+# Part of every key, so fragments rendered by an older renderer are never
+# reused. Bump whenever block rendering output changes.
+CACHE_VERSION = b"1"
+DEFAULT_MAX_ENTRIES = 10000
+
+
+class FragmentCache:
+    """Maps the text of a markdown block to its rendered HTML.
+
+    Lookups go to an in-memory LRU first, then to an optional directory
+    of one file per fragment. The directory is shared by every worker
+    process and by later builds; fragments are written to a temporary file
+    and renamed into place, so concurrent writers never expose partial
+    fragments.
+    """
+
+    def __init__(self, directory=None, max_entries=DEFAULT_MAX_ENTRIES):
+        self.directory = directory
+        self.max_entries = max_entries
+        self.memory = OrderedDict()
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def key(block):
+        return hashlib.sha256(CACHE_VERSION + block.encode()).hexdigest()
+
+    def _path(self, key):
+        return os.path.join(self.directory, key[:2], key[2:] + ".html")
+
+    def get(self, block):
+        """Returns the cached HTML for block, or None."""
+        key = self.key(block)
+        html = self.memory.get(key)
+        if html is not None:
+            self.memory.move_to_end(key)
+            self.memory_hits += 1
+            return html
+
+        if self.directory is not None:
+            try:
+                with open(self._path(key), encoding="utf-8") as fd:
+                    html = fd.read()
+            except FileNotFoundError:
+                pass
+            else:
+                self.disk_hits += 1
+                self._remember(key, html)
+                return html
+
+        self.misses += 1
+        return None
+
+    def put(self, block, html):
+        key = self.key(block)
+        self._remember(key, html)
+        if self.directory is None:
+            return
+
+        path = self._path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as fd:
+            fd.write(html)
+        os.replace(tmp_path, path)
+
+    def _remember(self, key, html):
+        self.memory[key] = html
+        self.memory.move_to_end(key)
+        if len(self.memory) > self.max_entries:
+            self.memory.popitem(last=False)
+
+    def counts(self):
+        return (self.memory_hits, self.disk_hits, self.misses)
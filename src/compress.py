@@ -0,0 +1,166 @@
+import gzip
+import logging
+import os
+import traceback
+from concurrent.futures import ThreadPoolExecutor
+
+try:
+    import zstandard
+except ImportError:  # optional, only needed for the zstd codec
+    zstandard = None
+
+logger = logging.getLogger(__name__)
+
+# Files smaller than this aren't worth compressing
+DEFAULT_MIN_SIZE = 1024
+# Copied static files that get compressed siblings
+COMPRESSIBLE_EXTENSIONS = (
+    ".html", ".css", ".js", ".mjs", ".json", ".map", ".svg", ".txt", ".xml",
+)
+
+
+class GzipCodec:
+    """Writes page.html.gz, as served by nginx's gzip_static."""
+
+    suffix = ".gz"
+
+    def __init__(self, level=9):
+        self.level = level
+
+    def compress(self, data):
+        # A fixed mtime keeps the output identical from build to build
+        return gzip.compress(data, self.level, mtime=0)
+
+
+class ZstdCodec:
+    """Writes page.html.zst; needs the optional zstandard package."""
+
+    suffix = ".zst"
+
+    def __init__(self, level=19):
+        if zstandard is None:
+            raise ValueError("the zstd codec needs the zstandard package")
+        self.level = level
+
+    def compress(self, data):
+        # Compressor objects can't be shared between threads
+        return zstandard.ZstdCompressor(level=self.level).compress(data)
+
+
+# Codec name -> class. A codec only needs a suffix and compress(bytes);
+# register more here to make them available to --compress.
+CODECS = {"gzip": GzipCodec, "zstd": ZstdCodec}
+
+
+def make_codecs(names):
+    """Returns an instance of each named codec. Raises ValueError for
+    unknown codecs and ones whose optional package is missing."""
+    unknown = [name for name in names if name not in CODECS]
+    if unknown:
+        raise ValueError(f"unknown compression codec: {', '.join(unknown)}")
+    return [CODECS[name]() for name in names]
+
+
+def sibling_suffixes():
+    return tuple(codec.suffix for codec in CODECS.values())
+
+
+def remove_siblings(path, suffixes=None):
+    """Removes the compressed siblings of path, of every known codec unless
+    suffixes are given, so none outlives the file it was made from."""
+    if suffixes is None:
+        suffixes = sibling_suffixes()
+    for suffix in suffixes:
+        try:
+            os.remove(path + suffix)
+        except FileNotFoundError:
+            pass
+
+
+class Compressor:
+    """Keeps compressed siblings (page.html.gz, ...) of output files in
+    step with them, using the named codecs.
+
+    update() is called with every file that was written or found unchanged.
+    A written file gets fresh siblings, or none if it's smaller than
+    min_size; an unchanged one only gets the siblings it's missing, e.g.
+    when a codec was just enabled. Siblings of other known codecs are
+    removed, so a stale one can never be served.
+
+    With threads, compression runs in a pool of threads (zlib releases the
+    GIL while it works) and flush() waits for it and returns
+    {path: error} for the files that failed; otherwise update() compresses
+    on the calling thread and errors raise.
+    """
+
+    def __init__(self, names, min_size=DEFAULT_MIN_SIZE, threads=0):
+        self.names = list(names)
+        self.codecs = make_codecs(names)
+        self.min_size = min_size
+        own_suffixes = {codec.suffix for codec in self.codecs}
+        self.other_suffixes = tuple(
+            suffix for suffix in sibling_suffixes() if suffix not in own_suffixes
+        )
+        self.executor = ThreadPoolExecutor(max_workers=threads) if threads else None
+        self.futures = {}
+
+    def update(self, path, data=None, changed=True):
+        """Updates the siblings of the file at path, whose contents are data
+        (bytes) if given, else read back from disk when needed."""
+        if self.executor is None:
+            self._update(path, data, changed)
+        else:
+            self.futures[path] = self.executor.submit(self._update, path, data, changed)
+
+    def _update(self, path, data, changed):
+        if changed:
+            remove_siblings(path, self.other_suffixes)
+            codecs = self.codecs
+        else:
+            codecs = [
+                codec for codec in self.codecs if not os.path.exists(path + codec.suffix)
+            ]
+            if not codecs:
+                return
+
+        if data is None:
+            with open(path, "rb") as fd:
+                data = fd.read()
+        if len(data) < self.min_size:
+            if changed:
+                remove_siblings(path, [codec.suffix for codec in self.codecs])
+            return
+
+        for codec in codecs:
+            compressed_path = path + codec.suffix
+            tmp_path = compressed_path + ".tmp"
+            try:
+                with open(tmp_path, "wb") as fd:
+                    fd.write(codec.compress(data))
+                os.replace(tmp_path, compressed_path)
+            except BaseException:
+                if os.path.exists(tmp_path):
+                    os.remove(tmp_path)
+                raise
+        logger.debug("Compressed %s", path)
+
+    def flush(self):
+        errors = {}
+        for path, future in self.futures.items():
+            error = future.exception()
+            if error is not None:
+                errors[path] = "".join(traceback.format_exception(error, limit=3))
+        self.futures = {}
+        return errors
+
+    def close(self):
+        errors = self.flush()
+        if self.executor is not None:
+            self.executor.shutdown()
+        return errors
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
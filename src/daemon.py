@@ -0,0 +1,172 @@
+import json
+import logging
+import os
+import signal
+import socket
+import socketserver
+import sys
+import time
+from contextlib import redirect_stderr, redirect_stdout
+from build import BuildState, build_site, report_errors
+from buildlog import flush_logging, setup_logging
+
+logger = logging.getLogger(__name__)
+
+
+class ReplyStream:
+    """A text stream that sends everything written to it to a build client
+    as {"stream": name, "text": ...} lines. Once the client is gone, output
+    is dropped, so the build still runs to completion."""
+
+    def __init__(self, wfile, name):
+        self.wfile = wfile
+        self.name = name
+        self.closed = False
+
+    def write(self, text):
+        if text and not self.closed:
+            try:
+                send(self.wfile, {"stream": self.name, "text": text})
+            except OSError:
+                self.closed = True
+        return len(text)
+
+    def flush(self):
+        pass
+
+    def isatty(self):
+        return False
+
+
+def send(wfile, message):
+    wfile.write(json.dumps(message).encode() + b"\n")
+    wfile.flush()
+
+
+class BuildDaemon(socketserver.UnixStreamServer):
+    """Builds the site whenever a client connects to its Unix socket.
+
+    The process stays up between builds, so the interpreter, the imported
+    modules and everything a BuildState holds (manifest, compiled template,
+    directory listings, source hashes, worker pool) as well as the fragment
+    caches are already warm when a request arrives. Requests are handled
+    one at a time.
+
+    A client sends one JSON line, {"argv": [...]} with main.py's
+    arguments or {"stop": true}, and gets back the build's output as
+    {"stream": "stdout" | "stderr", "text": ...} lines followed by
+    {"status": exit_status}.
+    """
+
+    def __init__(self, path, parse_args, verbosity=0, log_format="text"):
+        self.parse_args = parse_args
+        self.verbosity = verbosity
+        self.log_format = log_format
+        # The daemon's own log, which builds replace with their client's
+        self.log_stream = sys.stderr
+        self.state = BuildState()
+        self.stopping = False
+        self.bound = False
+        super().__init__(path, DaemonHandler)
+
+    def server_bind(self):
+        # A socket left behind by a daemon that didn't exit cleanly
+        # would make bind() fail; one that still answers is in use
+        if os.path.exists(self.server_address):
+            probe = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            try:
+                probe.connect(self.server_address)
+            except OSError:
+                os.remove(self.server_address)
+            else:
+                raise OSError(f"A build daemon is already listening on {self.server_address}")
+            finally:
+                probe.close()
+        super().server_bind()
+        self.bound = True
+
+    def build(self, argv, stdout, stderr):
+        """Runs one build with main.py's arguments argv, its output going to
+        stdout and stderr. Returns the exit status."""
+        with redirect_stdout(stdout), redirect_stderr(stderr):
+            try:
+                args = self.parse_args(argv)
+            except SystemExit as exit:
+                return exit.code
+        # Worker processes are forked before output is redirected, so they
+        # don't hold on to this client's streams
+        self.state.pool(args.jobs)
+
+        setup_logging(args.verbose - args.quiet, args.log_format, stream=stderr)
+        try:
+            with redirect_stdout(stdout), redirect_stderr(stderr):
+                if args.watch or args.daemon:
+                    logger.error("--watch and --daemon can't be run through the daemon")
+                    return 2
+                errors = build_site(args, state=self.state)
+                report_errors(errors)
+                return 1 if errors else 0
+        except Exception:
+            logger.exception("Build failed")
+            return 1
+        finally:
+            setup_logging(self.verbosity, self.log_format, stream=self.log_stream)
+
+    def serve(self):
+        """Handles requests until a client asks the daemon to stop."""
+        while not self.stopping:
+            self.handle_request()
+
+    def server_close(self):
+        super().server_close()
+        self.state.close()
+        if self.bound and os.path.exists(self.server_address):
+            os.remove(self.server_address)
+
+
+class DaemonHandler(socketserver.StreamRequestHandler):
+    def handle(self):
+        try:
+            message = json.loads(self.rfile.readline())
+        except ValueError:
+            return
+        if message.get("stop"):
+            self.server.stopping = True
+            send(self.wfile, {"status": 0})
+            return
+
+        argv = message.get("argv", [])
+        started = time.perf_counter()
+        status = self.server.build(
+            argv, ReplyStream(self.wfile, "stdout"), ReplyStream(self.wfile, "stderr")
+        )
+        logger.info(
+            "Build %s finished with status %s in %.2f s",
+            " ".join(argv) or "(no arguments)",
+            status,
+            time.perf_counter() - started,
+        )
+        flush_logging()
+        try:
+            send(self.wfile, {"status": status})
+        except OSError:
+            pass  # the client went away during the build
+
+
+def serve(args, parse_args, path):
+    """Builds the site once, to warm up, then serves build requests on the
+    Unix socket at path until stopped. parse_args turns a request's
+    arguments into the args of a build, paths included."""
+    daemon = BuildDaemon(path, parse_args, args.verbose - args.quiet, args.log_format)
+    # Exit through the finally below, which removes the socket
+    signal.signal(signal.SIGTERM, lambda signum, frame: sys.exit(0))
+    try:
+        report_errors(build_site(args, state=daemon.state))
+        logger.info("Build daemon listening on %s", path)
+        flush_logging()
+        daemon.serve()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        daemon.server_close()
+    return 0
@@ -0,0 +1,348 @@
+import functools
+import logging
+import os
+import threading
+import time
+from http.server import SimpleHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+from build import build_site, update_pages, report_errors, write_site_feeds
+from buildlog import flush_logging
+from compress import Compressor
+from manifest import dependents, load_manifest, save_manifest
+from staticfiles import sync_paths
+from template import Template
+
+try:
+    import inotify_simple
+except ImportError:  # optional, polling is used without it
+    inotify_simple = None
+
+logger = logging.getLogger(__name__)
+
+POLL_INTERVAL = 0.25
+# Editors often save a file in several writes; wait this long for a burst
+# of events to settle before rebuilding
+DEBOUNCE_MS = 20
+LIVERELOAD_PATH = "/__livereload"
+LIVERELOAD_TIMEOUT = 30
+
+# Long-polls the server and reloads the page as soon as a rebuild finishes
+LIVERELOAD_SCRIPT = f"""<script>
+(function () {{
+  var version = null;
+  function poll() {{
+    var url = "{LIVERELOAD_PATH}" + (version === null ? "" : "?since=" + version);
+    fetch(url).then(function (response) {{ return response.text(); }}).then(function (text) {{
+      if (version !== null && text !== version) {{ location.reload(); return; }}
+      version = text;
+      poll();
+    }}).catch(function () {{ setTimeout(poll, 1000); }});
+  }}
+  poll();
+}})();
+</script>"""
+
+
+class PollingWatcher:
+    """Detects changes by periodically comparing the size and mtime of every
+    file under the watched paths."""
+
+    def __init__(self, paths, interval=POLL_INTERVAL):
+        self.paths = paths
+        self.interval = interval
+        self.snapshot = self._scan()
+
+    def _scan(self):
+        snapshot = {}
+        for path in self.paths:
+            if os.path.isfile(path):
+                stat = os.stat(path)
+                snapshot[path] = (stat.st_size, stat.st_mtime_ns)
+                continue
+            for root, dirs, files in os.walk(path):
+                for file in files:
+                    file_path = os.path.join(root, file)
+                    try:
+                        stat = os.stat(file_path)
+                    except FileNotFoundError:
+                        continue
+                    snapshot[file_path] = (stat.st_size, stat.st_mtime_ns)
+        return snapshot
+
+    def wait(self):
+        """Blocks until something changes, then returns the changed paths."""
+        while True:
+            time.sleep(self.interval)
+            snapshot = self._scan()
+            changed = {
+                path
+                for path in snapshot.keys() | self.snapshot.keys()
+                if snapshot.get(path) != self.snapshot.get(path)
+            }
+            self.snapshot = snapshot
+            if changed:
+                return changed
+
+    def close(self):
+        pass
+
+
+class InotifyWatcher:
+    """Watches paths with inotify, which reports changes as they happen
+    instead of rescanning the tree."""
+
+    def __init__(self, paths):
+        self.inotify = inotify_simple.INotify()
+        flags = inotify_simple.flags
+        self.mask = (
+            flags.CLOSE_WRITE
+            | flags.CREATE
+            | flags.DELETE
+            | flags.MOVED_FROM
+            | flags.MOVED_TO
+        )
+        self.is_dir = flags.ISDIR
+        self.dirs = {}
+        # Single files are watched through their directory, so that editors
+        # that save by replacing the file are still noticed
+        self.files = set()
+        for path in paths:
+            if os.path.isfile(path):
+                self.files.add(path)
+                self._add_dir(os.path.dirname(path), recursive=False)
+            else:
+                self._add_dir(path)
+
+    def _add_dir(self, path, recursive=True):
+        for root, dirs, files in os.walk(path) if recursive else [(path, (), ())]:
+            self.dirs[self.inotify.add_watch(root, self.mask)] = (root, recursive)
+
+    def _remove_dir(self, path):
+        prefix = os.path.join(path, "")
+        for wd, (root, _) in list(self.dirs.items()):
+            if root == path or root.startswith(prefix):
+                del self.dirs[wd]
+                try:
+                    self.inotify.rm_watch(wd)
+                except OSError:
+                    pass  # deleted along with the directory
+
+    def _files_under(self, path):
+        return {os.path.join(root, file) for root, _, files in os.walk(path) for file in files}
+
+    def wait(self):
+        while True:
+            changed = set()
+            for event in self.inotify.read(read_delay=DEBOUNCE_MS):
+                if event.wd not in self.dirs:
+                    continue
+                directory, recursive = self.dirs[event.wd]
+                path = os.path.join(directory, event.name)
+                if not recursive:
+                    if path in self.files:
+                        changed.add(path)
+                elif event.mask & self.is_dir:
+                    if os.path.isdir(path):
+                        # A new directory may already hold files
+                        self._add_dir(path)
+                        changed |= self._files_under(path)
+                    else:
+                        # Its files are gone without events of their own
+                        # when it was moved away; rebuild treats the
+                        # directory as the removal of everything under it
+                        self._remove_dir(path)
+                        changed.add(path)
+                else:
+                    changed.add(path)
+            if changed:
+                return changed
+
+    def close(self):
+        self.inotify.close()
+
+
+def make_watcher(paths):
+    if inotify_simple is not None:
+        try:
+            return InotifyWatcher(paths)
+        except OSError:
+            pass  # e.g. out of inotify watches
+    return PollingWatcher(paths)
+
+
+class LiveReloadServer(ThreadingHTTPServer):
+    """Serves the output directory and tells open pages to reload after
+    each rebuild."""
+
+    daemon_threads = True
+
+    def __init__(self, address, public_dir, base_path):
+        self.version = 0
+        self.changed = threading.Condition()
+        handler = functools.partial(
+            LiveReloadHandler, directory=public_dir, base_path=base_path
+        )
+        super().__init__(address, handler)
+
+    def notify_reload(self):
+        with self.changed:
+            self.version += 1
+            self.changed.notify_all()
+
+    def wait_for_change(self, since, timeout=LIVERELOAD_TIMEOUT):
+        with self.changed:
+            self.changed.wait_for(lambda: self.version != since, timeout)
+            return self.version
+
+
+class LiveReloadHandler(SimpleHTTPRequestHandler):
+    def __init__(self, *args, base_path="/", **kwargs):
+        self.base_path = base_path
+        super().__init__(*args, **kwargs)
+
+    def translate_path(self, path):
+        # Pages link to base_path, but docs/ is served from the root
+        if self.base_path != "/" and path.startswith(self.base_path):
+            path = "/" + path[len(self.base_path) :]
+        return super().translate_path(path)
+
+    def do_GET(self):
+        url = urlsplit(self.path)
+        if url.path == LIVERELOAD_PATH:
+            return self.send_livereload(parse_qs(url.query).get("since"))
+
+        path = self.translate_path(url.path)
+        if os.path.isdir(path) and url.path.endswith("/"):
+            path = os.path.join(path, "index.html")
+        if path.endswith(".html") and os.path.isfile(path):
+            return self.send_html(path)
+        return super().do_GET()
+
+    def send_livereload(self, since):
+        version = self.server.version
+        if since:
+            version = self.server.wait_for_change(int(since[0]))
+        self.send_bytes(str(version).encode(), "text/plain")
+
+    def send_html(self, path):
+        with open(path, "rb") as fd:
+            html = fd.read()
+        script = LIVERELOAD_SCRIPT.encode()
+        index = html.rfind(b"</body>")
+        if index == -1:
+            html += script
+        else:
+            html = html[:index] + script + html[index:]
+        self.send_bytes(html, "text/html; charset=utf-8")
+
+    def send_bytes(self, data, content_type):
+        self.send_response(200)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(data)))
+        self.send_header("Cache-Control", "no-store")
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def _removed_dir(rel_dir, entries):
+    """Returns the entries (relative paths) under rel_dir, for a directory
+    that was removed or moved away with everything in it."""
+    prefix = os.path.join(rel_dir, "")
+    return [rel_path for rel_path in entries if rel_path.startswith(prefix)]
+
+
+def rebuild(args, manifest, template, changed, compressor=None):
+    """Rebuilds what the changed paths affect: every page for a template
+    change, otherwise only the changed pages and static files and the pages
+    that reference those static files. A changed path that is gone and
+    isn't a page stands for a removed directory and everything under it.
+    compressor, with --compress, keeps the compressed siblings of changed
+    static files up to date. Returns the (possibly recompiled) template and
+    the list of page errors."""
+    content_dir = os.path.join(args.content_dir, "")
+    static_dir = os.path.join(args.static_dir, "")
+    pages = set()
+    static = set()
+    for path in changed:
+        if path == args.template_path:
+            if not os.path.exists(path):
+                # Editors that save by renaming briefly remove the file;
+                # the current template stays until it is back
+                continue
+            template = Template.from_file(args.template_path, args.base_path)
+            pages.update(manifest["pages"])
+        elif path.startswith(content_dir):
+            rel_path = os.path.relpath(path, content_dir)
+            if path.endswith(".md"):
+                pages.add(rel_path)
+            elif not os.path.exists(path):
+                pages.update(_removed_dir(rel_path, manifest["pages"]))
+        elif path.startswith(static_dir):
+            rel_path = os.path.relpath(path, static_dir)
+            static.add(rel_path)
+            if not os.path.exists(path):
+                static.update(_removed_dir(rel_path, manifest["static"]))
+
+    if static:
+        sync_paths(
+            args.static_dir,
+            args.public_dir,
+            static,
+            manifest["static"],
+            args.link_static,
+            compressor,
+            manifest.get("static_siblings", True),
+        )
+        pages.update(dependents(manifest["pages"], static))
+    errors = update_pages(args, manifest, template, pages) if pages else []
+    if pages and args.site_url:
+        write_site_feeds(args, manifest["pages"])
+    return template, errors
+
+
+def watch(args):
+    """Builds the site, serves it, and keeps it up to date until interrupted."""
+    report_errors(build_site(args))
+    manifest = load_manifest(args.manifest_path)
+    template = Template.from_file(args.template_path, args.base_path)
+    compressor = None
+    if args.compress:
+        compressor = Compressor(args.compress, args.compress_min_size)
+
+    server = LiveReloadServer((args.bind, args.port), args.public_dir, args.base_path)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    logger.info(
+        "Serving %s at http://%s:%d%s",
+        args.public_dir, args.bind, args.port, args.base_path,
+    )
+    flush_logging()
+
+    watcher = make_watcher([args.content_dir, args.static_dir, args.template_path])
+    try:
+        while True:
+            changed = watcher.wait()
+            started = time.perf_counter()
+            try:
+                template, errors = rebuild(args, manifest, template, changed, compressor)
+            except Exception:
+                # e.g. a template that doesn't parse; keep watching for a fix
+                logger.exception("Rebuild failed")
+                flush_logging()
+                continue
+            report_errors(errors)
+            server.notify_reload()
+            elapsed = (time.perf_counter() - started) * 1000
+            logger.info("Rebuilt %d changed file(s) in %.0f ms", len(changed), elapsed)
+            flush_logging()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        watcher.close()
+        server.shutdown()
+        if compressor is not None:
+            compressor.close()
+        save_manifest(args.manifest_path, manifest)
+    return 0
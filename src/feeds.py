@@ -0,0 +1,297 @@
+import json
+import os
+import re
+import shutil
+import tempfile
+from collections import Counter, defaultdict
+from xml.sax.saxutils import escape
+from manifest import hash_file
+from textnode import IMAGE_RE, LINK_RE
+
+SITEMAP_NAME = "sitemap.xml"
+FEED_NAME = "feed.xml"
+SEARCH_DIR = "search"
+SEARCH_DOCS_NAME = "docs.json"
+# Pages whose source is under this directory of content/ go into the feed
+BLOG_DIR = "blog"
+
+EXCERPT_LENGTH = 200
+# Shorter paragraphs, like a "Back home" link, don't make an excerpt
+EXCERPT_MIN_LENGTH = 40
+# Each page is indexed under at most this many of its most frequent words
+MAX_TERMS = 100
+
+WORD_RE = re.compile(r"[^\W_]{2,}")
+# File names shard_name() gives search shards; other files in search/,
+# such as a search page or its script, aren't the index's to remove
+SHARD_FILE_RE = re.compile(r"[0-9a-z_]\.json")
+MARKER_RE = re.compile(r"^(?:#{1,6} |> ?|- |\d+\. )", re.MULTILINE)
+INLINE_DELIMITERS = str.maketrans("", "", "*_`")
+STOP_WORDS = frozenset(
+    "a an and are as at be but by for from has have he her his in is it its "
+    "of on or our she so that the their them they this to was we were which "
+    "will with you your".split()
+)
+
+
+def plain_text(block):
+    """Returns a markdown block's text without markdown syntax: images and
+    links are replaced by their text, and block markers and inline
+    delimiters are dropped."""
+    text = IMAGE_RE.sub(r"\1", block)
+    text = LINK_RE.sub(r"\1", text)
+    text = MARKER_RE.sub("", text)
+    text = text.translate(INLINE_DELIMITERS)
+    return " ".join(text.split())
+
+
+def truncate(text, length=EXCERPT_LENGTH):
+    if len(text) <= length:
+        return text
+    return text[:length].rsplit(" ", 1)[0] + "…"
+
+
+class PageSummary:
+    """Collects a page's excerpt and search terms from its blocks as they
+    are rendered."""
+
+    def __init__(self):
+        self.excerpt = None
+        self.first_text = None
+        self.words = Counter()
+
+    def add_block(self, block):
+        if block.startswith("```"):
+            return
+        text = plain_text(block)
+        self.words.update(
+            word for word in WORD_RE.findall(text.lower()) if word not in STOP_WORDS
+        )
+        if self.excerpt is not None or block.startswith("#"):
+            return
+        if len(text) >= EXCERPT_MIN_LENGTH:
+            self.excerpt = truncate(text)
+        elif self.first_text is None and text:
+            self.first_text = text
+
+    def terms(self, count=MAX_TERMS):
+        return [word for word, _ in self.words.most_common(count)]
+
+    def entry_fields(self):
+        """Returns the fields stored in the page's manifest entry. Its
+        terms are kept out of it, in a file of their own (write_terms)."""
+        return {"excerpt": self.excerpt or self.first_text or ""}
+
+
+def terms_path(terms_dir, rel_path):
+    """Returns the file in terms_dir holding the search terms of the page
+    whose source is at rel_path in the content directory."""
+    return os.path.join(terms_dir, rel_path + ".txt")
+
+
+def write_terms(terms_dir, rel_path, terms):
+    """Records a page's search terms, one per line, renaming the file into
+    place so an interrupted build never leaves it truncated."""
+    path = terms_path(terms_dir, rel_path)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path + ".tmp", "w", encoding="utf-8") as fd:
+        fd.writelines(term + "\n" for term in terms)
+    os.replace(path + ".tmp", path)
+
+
+def read_terms(terms_dir, rel_path):
+    """Returns the search terms write_terms recorded for a page, or an
+    empty list if there are none."""
+    try:
+        with open(terms_path(terms_dir, rel_path), encoding="utf-8") as fd:
+            return fd.read().split()
+    except OSError:
+        return []
+
+
+def remove_terms(terms_dir, rel_path):
+    """Removes the search terms recorded for a page that no longer exists."""
+    try:
+        os.remove(terms_path(terms_dir, rel_path))
+    except FileNotFoundError:
+        pass
+
+
+class _StagedFile:
+    """An output file written in pieces to a temporary file, which replaces
+    the real one on commit() only if the contents differ."""
+
+    def __init__(self, path):
+        self.path = path
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        self.tmp_path = path + ".tmp"
+        self.fd = open(self.tmp_path, "w", encoding="utf-8")
+
+    def write(self, text):
+        self.fd.write(text)
+
+    def commit(self):
+        self.fd.close()
+        try:
+            unchanged = hash_file(self.path) == hash_file(self.tmp_path)
+        except OSError:
+            unchanged = False
+        if unchanged:
+            os.remove(self.tmp_path)
+        else:
+            os.replace(self.tmp_path, self.path)
+
+
+def page_url(site_url, base_path, output):
+    """Returns the absolute URL of the page rendered to output (relative to
+    the output directory), linking to directories for index pages."""
+    path = output.replace(os.sep, "/")
+    if path == "index.html":
+        path = ""
+    elif path.endswith("/index.html"):
+        path = path[: -len("index.html")]
+    return site_url.rstrip("/") + base_path + path
+
+
+def shard_name(term):
+    """Search index shard a term belongs in: its first character, or "_"
+    for characters that don't make portable file names."""
+    first = term[0]
+    return first if first.isascii() and first.isalnum() else "_"
+
+
+class SiteFeeds:
+    """Writes sitemap.xml, an RSS feed of the blog and a sharded search
+    index for the pages passed to add(), one page at a time.
+
+    Sitemap entries are written as pages arrive. Feed items and search
+    postings are spooled to temporary files, because the feed's header
+    needs the home page's title and postings must be grouped by term; each
+    search shard is grouped on its own in close(), so memory stays bounded
+    by the largest shard rather than growing with the site.
+
+    The search index is docs.json, a list of [url, title, excerpt] indexed
+    by document number, and one <c>.json per first character c of the
+    terms, mapping each term to the increasing document numbers it occurs
+    in, delta-encoded. The terms of pages not passed to add() are read
+    from terms_dir, where write_terms recorded them.
+    """
+
+    def __init__(self, public_dir, site_url, base_path="/", terms_dir=None):
+        self.public_dir = public_dir
+        self.site_url = site_url
+        self.base_path = base_path
+        self.terms_dir = terms_dir
+        self.home_title = None
+        self.pages = 0
+        self.feed_items = 0
+        self.spool_dir = tempfile.TemporaryDirectory(prefix="site-feeds-")
+        self.shards = {}
+
+        self.sitemap = _StagedFile(os.path.join(public_dir, SITEMAP_NAME))
+        self.sitemap.write(
+            '<?xml version="1.0" encoding="UTF-8"?>\n'
+            '<urlset xmlns="http://www.sitemaps.org/schemas/sitemap/0.9">\n'
+        )
+        self.feed_spool = open(
+            os.path.join(self.spool_dir.name, "feed"), "w+", encoding="utf-8"
+        )
+        self.search_docs = _StagedFile(
+            os.path.join(public_dir, SEARCH_DIR, SEARCH_DOCS_NAME)
+        )
+        self.search_docs.write("[")
+
+    def add(self, rel_path, entry, terms=None):
+        """Adds the page with the given content-relative path and manifest
+        entry, which holds its title and excerpt. terms are its search
+        terms; when None they are read from terms_dir."""
+        url = page_url(self.site_url, self.base_path, entry["output"])
+        title = entry.get("title", "")
+        excerpt = entry.get("excerpt", "")
+        self.sitemap.write(f"<url><loc>{escape(url)}</loc></url>\n")
+
+        if rel_path == "index.md":
+            self.home_title = title
+        if rel_path.startswith(BLOG_DIR + os.sep):
+            self.feed_spool.write(
+                f"<item><title>{escape(title)}</title><link>{escape(url)}</link>"
+                f"<guid>{escape(url)}</guid>"
+                f"<description>{escape(excerpt)}</description></item>\n"
+            )
+            self.feed_items += 1
+
+        doc = self.pages
+        separator = "\n" if doc == 0 else ",\n"
+        self.search_docs.write(
+            separator + json.dumps([url, title, excerpt], ensure_ascii=False)
+        )
+        if terms is None:
+            terms = read_terms(self.terms_dir, rel_path) if self.terms_dir else ()
+        terms = set(terms)
+        terms.update(word for word in WORD_RE.findall(title.lower()) if word not in STOP_WORDS)
+        for term in terms:
+            self._shard(shard_name(term)).write(f"{term}\t{doc}\n")
+        self.pages += 1
+
+    def _shard(self, name):
+        spool = self.shards.get(name)
+        if spool is None:
+            path = os.path.join(self.spool_dir.name, f"shard-{name}")
+            spool = self.shards[name] = open(path, "w+", encoding="utf-8")
+        return spool
+
+    def close(self):
+        """Finishes every artifact, replacing the previous ones that changed,
+        and returns the number of search terms written."""
+        self.sitemap.write("</urlset>\n")
+        self.sitemap.commit()
+        self._write_feed()
+        self.search_docs.write("\n]\n")
+        self.search_docs.commit()
+        terms = self._write_search_shards()
+        self.spool_dir.cleanup()
+        return terms
+
+    def _write_feed(self):
+        feed = _StagedFile(os.path.join(self.public_dir, FEED_NAME))
+        home = self.site_url.rstrip("/") + self.base_path
+        feed.write(
+            '<?xml version="1.0" encoding="UTF-8"?>\n<rss version="2.0"><channel>\n'
+            f"<title>{escape(self.home_title or home)}</title>"
+            f"<link>{escape(home)}</link>"
+            f"<description>{escape(self.home_title or home)}</description>\n"
+        )
+        self.feed_spool.seek(0)
+        shutil.copyfileobj(self.feed_spool, feed.fd)
+        self.feed_spool.close()
+        feed.write("</channel></rss>\n")
+        feed.commit()
+
+    def _write_search_shards(self):
+        search_dir = os.path.join(self.public_dir, SEARCH_DIR)
+        written = {SEARCH_DOCS_NAME}
+        terms = 0
+        for name in sorted(self.shards):
+            spool = self.shards[name]
+            spool.seek(0)
+            postings = defaultdict(list)
+            for line in spool:
+                term, doc = line.rstrip("\n").split("\t")
+                postings[term].append(int(doc))
+            spool.close()
+
+            index = {}
+            for term in sorted(postings):
+                docs = postings[term]
+                index[term] = [docs[0]] + [b - a for a, b in zip(docs, docs[1:])]
+            shard = _StagedFile(os.path.join(search_dir, f"{name}.json"))
+            json.dump(index, shard.fd, ensure_ascii=False, separators=(",", ":"))
+            shard.commit()
+            written.add(f"{name}.json")
+            terms += len(index)
+
+        # Shards whose terms all disappeared
+        for file in os.listdir(search_dir):
+            if file not in written and SHARD_FILE_RE.fullmatch(file):
+                os.remove(os.path.join(search_dir, file))
+        return terms
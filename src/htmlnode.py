@@ -1,28 +1,80 @@
+from types import MappingProxyType
+
+WRITE_BUFFER_SIZE = 1 << 16
+
+# Shared, immutable stand-ins for "no children" and "no props", so nodes
+# without them (most leaves) don't each allocate an empty list and dict
+EMPTY_CHILDREN = ()
+EMPTY_PROPS = MappingProxyType({})
+
+
 class HTMLNode:
+    __slots__ = ("tag", "value", "children", "props")
+
     def __init__(self, tag=None, value=None, children=None, props=None):
         self.tag = tag
         self.value = value
-        self.children = children if children is not None else []
-        self.props = props if props else {}
+        self.children = children if children is not None else EMPTY_CHILDREN
+        self.props = props if props else EMPTY_PROPS
 
     def to_html(self):
+        return "".join(self.iter_html())
+
+    def iter_html(self):
+        """Yields the node's HTML as a sequence of string chunks.
+
+        The tree is walked with an explicit stack rather than recursion, so
+        deeply nested content can't hit the recursion limit and no subtree is
+        ever materialized as an intermediate string.
+        """
+        stack = [self]
+        pop = stack.pop
+        push = stack.append
+        while stack:
+            node = pop()
+            # Closing tags are pushed as plain strings, to be emitted once
+            # all of the node's children have been
+            if node.__class__ is str:
+                yield node
+                continue
+
+            opening_tag, value, children, closing_tag = node._html_parts()
+            if opening_tag:
+                yield opening_tag
+            if value:
+                yield value
+            if children:
+                if closing_tag:
+                    push(closing_tag)
+                stack.extend(reversed(children))
+            elif closing_tag:
+                yield closing_tag
+
+    def write_html(self, fp, buffer_size=WRITE_BUFFER_SIZE):
+        """Writes the node's HTML to the file object fp, in writes of
+        roughly buffer_size characters."""
+        buffer = []
+        buffered = 0
+        for chunk in self.iter_html():
+            buffer.append(chunk)
+            buffered += len(chunk)
+            if buffered >= buffer_size:
+                fp.write("".join(buffer))
+                buffer.clear()
+                buffered = 0
+        if buffer:
+            fp.write("".join(buffer))
+
+    def _html_parts(self):
+        """Returns (opening_tag, value, children, closing_tag) for this node
+        alone; iter_html stitches the parts of the whole tree together."""
         # Determine the opening tag, including attributes (props)
         if self.tag:
-            # Add props to opening tag if they exist
-            props = " ".join(
-                f'{key}="{value}"' for key, value in (self.props or {}).items()
-            )
-            opening_tag = f"<{self.tag}" + (f" {props}" if props else "") + ">"
+            opening_tag = f"<{self.tag}{self.props_to_html()}>"
+            closing_tag = f"</{self.tag}>"
         else:
-            opening_tag = ""
-
-        # The content of the node (value or child nodes)
-        value = self.value or ""
-        children_html = "".join([child.to_html() for child in (self.children or [])])
-
-        # Determine the closing tag
-        closing_tag = f"</{self.tag}>" if self.tag else ""
-        return f"{opening_tag}{value}{children_html}{closing_tag}"
+            opening_tag = closing_tag = ""
+        return opening_tag, self.value, self.children, closing_tag
 
     def props_to_html(self):
         results = ""
@@ -36,48 +88,44 @@ class HTMLNode:
 
 
 class LeafNode(HTMLNode):
+    __slots__ = ()
+
     def __init__(self, tag, value, attributes=None, children=None):
         super().__init__(tag, value, children, attributes)
         if value is None:
             raise ValueError
-        self.attributes = attributes
 
-    def to_html(self):
+    @property
+    def attributes(self):
+        # Leaf attributes are the node's props, stored once
+        return self.props
+
+    def _html_parts(self):
         if self.value is None:
             raise ValueError("LeafNode must have a value")
         if self.tag is None:
-            return self.value
+            return "", self.value, None, ""
 
         attributes_str = ""
         if self.attributes:
             for key, value in self.attributes.items():
                 attributes_str += f' {key}="{value}"'
-        return f"<{self.tag}{attributes_str}>{self.value}</{self.tag}>"
+        return f"<{self.tag}{attributes_str}>", self.value, None, f"</{self.tag}>"
 
     def text_node_to_html_node(self):
         pass
 
 
 class ParentNode(HTMLNode):
+    __slots__ = ()
+
     def __init__(self, tag, children, props=None):
         super().__init__(tag=tag, children=children, props=props)
 
-    def to_html(self):
+    def _html_parts(self):
         if self.tag is None:
             raise ValueError("ParentNode must have a tag")
         if not hasattr(self, "children") or self.children is None:
             raise ValueError("ParentNode must have children")
 
-        html = f"<{self.tag}"
-
-        if self.props:
-            for prop_name, prop_value in self.props.items():
-                html += f' {prop_name}="{prop_value}"'
-
-        html += ">"
-
-        for child in self.children:
-            html += child.to_html()
-
-        html += f"</{self.tag}>"
-        return html
+        return f"<{self.tag}{self.props_to_html()}>", None, self.children, f"</{self.tag}>"
@@ -0,0 +1,180 @@
+from htmlnode import HTMLNode, LeafNode
+
+# Node kinds: elements hold children, leaves hold a span of text
+ELEMENT = 0
+LEAF = 1
+
+# Every tag the markdown handlers emit; tag id 0 is "no tag", i.e. plain
+# text or a fragment of raw HTML
+TAGS = (
+    None, "div", "p", "h1", "h2", "h3", "h4", "h5", "h6", "pre", "code",
+    "blockquote", "ul", "ol", "li", "b", "i", "a", "img",
+)
+TAG_IDS = {tag: tag_id for tag_id, tag in enumerate(TAGS)}
+OPEN_TAGS = tuple(f"<{tag}>" if tag else "" for tag in TAGS)
+CLOSE_TAGS = tuple(f"</{tag}>" if tag else "" for tag in TAGS)
+
+NO_NODE = -1
+
+
+class Document:
+    """A markdown document as parallel arrays instead of a tree of nodes.
+
+    Node i has a kind, a tag id (an index into TAGS), a parent (NO_NODE for
+    top-level nodes), optional attributes as a tuple of (name, value) pairs
+    and, for leaves, a span sources[i][starts[i]:ends[i]] of text, which is
+    only sliced out when the document is serialized. Building a document
+    allocates no object per node; the columns are plain lists, which take
+    appends several times faster than array.array and mostly hold small,
+    shared ints.
+
+    Nodes must be added in document order, each after its parent and
+    previous sibling, so iter_html() can walk the columns front to back
+    instead of following links. The first_children and next_siblings
+    columns, for navigating the tree, are only filled in when something
+    asks for them. node() gives an HTMLNode view of a subtree for code
+    that wants the tree API.
+    """
+
+    def __init__(self):
+        self.kinds = []
+        self.tags = []
+        self.parents = []
+        self.sources = []
+        self.starts = []
+        self.ends = []
+        self.attributes = []
+        self.first_children = []
+        self.next_siblings = []
+
+    def __len__(self):
+        return len(self.kinds)
+
+    def clear(self):
+        for column in (
+            self.kinds, self.tags, self.parents, self.sources, self.starts,
+            self.ends, self.attributes, self.first_children, self.next_siblings,
+        ):
+            column.clear()
+
+    def element(self, tag, parent=NO_NODE, attributes=None):
+        """Adds an element and returns its index."""
+        index = len(self.kinds)
+        self.kinds.append(ELEMENT)
+        self.tags.append(TAG_IDS[tag])
+        self.parents.append(parent)
+        self.sources.append(None)
+        self.starts.append(0)
+        self.ends.append(0)
+        self.attributes.append(attributes)
+        return index
+
+    def leaf(self, tag, source, parent=NO_NODE, start=0, end=None, attributes=None):
+        """Adds a leaf holding source[start:end] and returns its index."""
+        index = len(self.kinds)
+        self.kinds.append(LEAF)
+        self.tags.append(TAG_IDS[tag])
+        self.parents.append(parent)
+        self.sources.append(source)
+        self.starts.append(start)
+        self.ends.append(len(source) if end is None else end)
+        self.attributes.append(attributes)
+        return index
+
+    def text(self, index):
+        """Returns the text of leaf index."""
+        return self.sources[index][self.starts[index] : self.ends[index]]
+
+    def _link(self):
+        """Fills in first_children and next_siblings from parents."""
+        count = len(self.kinds)
+        if len(self.first_children) == count:
+            return
+        first_children = self.first_children = [NO_NODE] * count
+        next_siblings = self.next_siblings = [NO_NODE] * count
+        last_children = {}
+        for index, parent in enumerate(self.parents):
+            previous = last_children.get(parent)
+            if previous is not None:
+                next_siblings[previous] = index
+            elif parent != NO_NODE:
+                first_children[parent] = index
+            last_children[parent] = index
+
+    def children(self, index):
+        self._link()
+        child = self.first_children[index]
+        while child != NO_NODE:
+            yield child
+            child = self.next_siblings[child]
+
+    def subtree_end(self, index):
+        """Returns the index just past the last descendant of index."""
+        self._link()
+        while index != NO_NODE:
+            following = self.next_siblings[index]
+            if following != NO_NODE:
+                return following
+            index = self.parents[index]
+        return len(self.kinds)
+
+    def iter_html(self, index=None):
+        """Yields the HTML of the subtree at index, or of the whole
+        document, as string chunks."""
+        return iter(self._html_chunks(index))
+
+    def to_html(self, index=None):
+        return "".join(self._html_chunks(index))
+
+    def _html_chunks(self, index):
+        """Returns the HTML chunks of the subtree at index, or of the whole
+        document. Because nodes are stored in document order this is a
+        single linear pass over the columns: open elements are kept on a
+        stack and closed once the walk reaches a node outside them."""
+        if index is None:
+            first, end = 0, len(self.kinds)
+        else:
+            first, end = index, self.subtree_end(index)
+        kinds, tags, parents = self.kinds, self.tags, self.parents
+        sources, starts, ends = self.sources, self.starts, self.ends
+        attributes = self.attributes
+        chunks = []
+        append = chunks.append
+        open_elements = []
+
+        for node in range(first, end):
+            parent = parents[node]
+            while open_elements and open_elements[-1] != parent:
+                append(CLOSE_TAGS[tags[open_elements.pop()]])
+
+            tag = tags[node]
+            if attributes[node] is None:
+                opening_tag = OPEN_TAGS[tag]
+            else:
+                opening_tag = _opening_tag(TAGS[tag], attributes[node])
+            if kinds[node] == ELEMENT:
+                append(opening_tag)
+                open_elements.append(node)
+            else:
+                append(opening_tag)
+                append(sources[node][starts[node] : ends[node]])
+                append(CLOSE_TAGS[tag])
+
+        while open_elements:
+            append(CLOSE_TAGS[tags[open_elements.pop()]])
+        return chunks
+
+    def node(self, index=0):
+        """Returns the subtree at index as HTMLNode/LeafNode objects."""
+        tag = TAGS[self.tags[index]]
+        attributes = self.attributes[index]
+        props = dict(attributes) if attributes else None
+        if self.kinds[index] == LEAF:
+            return LeafNode(tag, self.text(index), props)
+        children = [self.node(child) for child in self.children(index)]
+        return HTMLNode(tag, None, children, props)
+
+
+def _opening_tag(tag, attributes):
+    attributes_str = "".join(f' {name}="{value}"' for name, value in attributes)
+    return f"<{tag}{attributes_str}>"
@@ -1,125 +1,234 @@
+import argparse
 import os
-import shutil
-from markdown import markdown_to_html_node
-from textnode import TextNode
 import sys
-
-
-def extract_title(markdown):
-    """Pulls h1 header from markdown file and returns it.
-    strips # and removes any leading/trailing whitespace.
-    If there is no h1 header raises an exception.
-    """
-    lines = markdown.strip().splitlines()
-    title = None
-    for line in lines:
-        if line.startswith("# "):
-            title = line.lstrip("#").strip()
-            return title
-    raise Exception("no h1 title found")
-
-
-def generate_page(from_path, template_path, dest_path, base_path):
-    print(f"DEBUG: Using base_path: {base_path}")
-
-    with open(from_path) as md_fd:
-        md = md_fd.read()
-    with open(template_path) as template_fd:
-        template = template_fd.read()
-
-    content = markdown_to_html_node(md).to_html()
-    title = extract_title(md)
-
-    # First replace the content and title
-    html = template.replace("{{ Title }}", title)
-    html = html.replace("{{ Content }}", content)
-
-    # Then replace all instances of href="/ and src="/
-    if base_path != "/":  # Only modify paths if not at root
-        html = html.replace('href="/', f'href="{base_path}')
-        html = html.replace('src="/', f'src="{base_path}')
-
-    dest_dir = os.path.dirname(dest_path)
-    if dest_dir and not os.path.exists(dest_dir):
-        os.makedirs(dest_dir)
-
-    with open(dest_path, "w") as output_fd:
-        output_fd.write(html)
-
-
-def copytree(source, destination):
-    """recursive function that copies all contents from source directory to destination"""
-
-    if os.path.exists(destination):
-        shutil.rmtree(destination)
-
-    os.makedirs(destination)
-
-    for item in os.listdir(source):
-        source_item = os.path.join(source, item)
-        destination_item = os.path.join(destination, item)
-
-        if os.path.isfile(source_item):
-            print(f"Copying file: {source_item} to {destination_item}")
-            shutil.copy2(source_item, destination_item)
-        else:
-            copytree(source_item, destination_item)
-
-
-def process_md_file(root, file, content_dir, public_dir, template_path, base_path):
-
-    content_path = os.path.join(root, file)
-    rel_path = os.path.relpath(content_path, content_dir)
-
-    if file == "index.md":
-        rel_html_path = os.path.join(os.path.dirname(rel_path), "index.html")
-    else:
-        rel_html_path = rel_path.replace(".md", ".html")
-
-    dest_path = os.path.join(public_dir, rel_html_path)
-    os.makedirs(os.path.dirname(dest_path), exist_ok=True)
-
-    generate_page(content_path, template_path, dest_path, base_path)
-
-    print(f"Processed Markdown file {content_path} into {dest_path}")
-
-
-def main():
-
-    base_path = sys.argv[1] if len(sys.argv) > 1 else "/"
-    if not base_path.endswith("/"):
-        base_path += "/"
-
-    # path initialization
-    current_dir = os.getcwd()
-    public_dir = os.path.join(current_dir, "docs")
-    static_dir = os.path.join(current_dir, "static")
-    content_dir = os.path.join(current_dir, "content")
-    content_path = os.path.join(current_dir, "content/index.md")
-    template_path = os.path.join(current_dir, "template.html")
-    dest_path = os.path.join(public_dir, "index.html")
-
-    if os.path.exists(public_dir):
-        print("Removing existing public directory...")
-        shutil.rmtree(public_dir)
-    else:
-        print("Public directory does not exist, skipping removal.")
-
-    try:
-        os.makedirs(public_dir)
-        print(f"Created public directory at: {public_dir}")
-    except Exception as e:
-        print(f"Failed to create public directory: {e}")
-
-    copytree(static_dir, public_dir)
-
-    for root, dirs, files in os.walk(content_dir):
-        for file in files:
-            if file.endswith(".md"):
-                process_md_file(
-                    root, file, content_dir, public_dir, template_path, base_path
-                )
+from build import build_site, report_errors
+from buildclient import socket_path
+from buildlog import setup_logging
+from cache import DEFAULT_MAX_ENTRIES
+from compress import DEFAULT_MIN_SIZE, make_codecs
+from source import DEFAULT_MMAP_THRESHOLD
+from writer import DEFAULT_WRITE_THREADS
+from page import extract_title, generate_page, process_md_file
+from staticfiles import copytree
+
+MANIFEST_NAME = ".build-manifest.json"
+FRAGMENT_CACHE_DIR = ".cache/fragments"
+# Where each page's search terms are kept for the search index
+TERMS_DIR = ".cache/terms"
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Build the static site into docs/.")
+    parser.add_argument(
+        "base_path",
+        nargs="?",
+        default="/",
+        help="path prefix the site is served under (default: /)",
+    )
+    parser.add_argument(
+        "--force",
+        action="store_true",
+        help="regenerate every page, even those the build manifest lists as up to date",
+    )
+    parser.add_argument(
+        "--link-static",
+        action="store_true",
+        help="hardlink static files into docs/ instead of copying them, when possible",
+    )
+    parser.add_argument(
+        "--checksum",
+        action="store_true",
+        help="compare static files by content rather than size and mtime",
+    )
+    parser.add_argument(
+        "--watch",
+        action="store_true",
+        help="build, then serve docs/ and rebuild affected pages as files change",
+    )
+    parser.add_argument(
+        "--daemon",
+        action="store_true",
+        help="build, then stay resident and run the builds requested by "
+        "src/buildclient.py over a Unix socket",
+    )
+    parser.add_argument(
+        "--port",
+        type=int,
+        default=8888,
+        help="port the --watch server listens on (default: 8888)",
+    )
+    parser.add_argument(
+        "--bind",
+        default="127.0.0.1",
+        help="address the --watch server binds to (default: 127.0.0.1)",
+    )
+    parser.add_argument(
+        "--profile",
+        nargs="?",
+        const="build-profile.json",
+        metavar="PATH",
+        help="record per-stage timings for every page and write them as JSON "
+        "to PATH (default: build-profile.json)",
+    )
+    parser.add_argument(
+        "--profile-top",
+        type=int,
+        default=10,
+        metavar="N",
+        help="number of slowest pages listed in the profile (default: 10)",
+    )
+    parser.add_argument(
+        "-v",
+        "--verbose",
+        action="store_true",
+        help="log every processed page and copied file",
+    )
+    parser.add_argument(
+        "-q",
+        "--quiet",
+        action="store_true",
+        help="only log warnings and errors",
+    )
+    parser.add_argument(
+        "--progress",
+        action="store_true",
+        help="report how many pages have been rendered while building",
+    )
+    parser.add_argument(
+        "--log-format",
+        choices=["text", "json"],
+        default="text",
+        help="log as plain text or as JSON lines (default: text)",
+    )
+    parser.add_argument(
+        "--site-url",
+        metavar="URL",
+        help="public URL of the site, e.g. https://example.com; when given, "
+        "sitemap.xml, feed.xml (pages under content/blog/) and a search index "
+        "in search/ are generated",
+    )
+    parser.add_argument(
+        "--explain",
+        action="store_true",
+        help="log why each rebuilt page had to be rebuilt",
+    )
+    parser.add_argument(
+        "--fragment-cache",
+        nargs="?",
+        const=FRAGMENT_CACHE_DIR,
+        default=None,
+        metavar="DIR",
+        help="reuse rendered markdown blocks, stored in DIR between builds "
+        f"(default: {FRAGMENT_CACHE_DIR})",
+    )
+    parser.add_argument(
+        "--fragment-cache-size",
+        type=int,
+        default=DEFAULT_MAX_ENTRIES,
+        metavar="N",
+        help="fragments each process keeps in memory "
+        f"(default: {DEFAULT_MAX_ENTRIES})",
+    )
+    parser.add_argument(
+        "--mmap-threshold",
+        type=int,
+        default=DEFAULT_MMAP_THRESHOLD,
+        metavar="BYTES",
+        help="memory-map markdown sources of at least BYTES instead of "
+        f"reading them (default: {DEFAULT_MMAP_THRESHOLD})",
+    )
+    parser.add_argument(
+        "--write-threads",
+        type=int,
+        default=DEFAULT_WRITE_THREADS,
+        metavar="N",
+        help="write pages from N background threads per process, 0 to write "
+        f"them while rendering (default: {DEFAULT_WRITE_THREADS})",
+    )
+    parser.add_argument(
+        "--minify",
+        action="store_true",
+        help="minify pages as they are written: drop comments and whitespace "
+        "between tags and unquote attributes, leaving <pre> and <code> as they are",
+    )
+    parser.add_argument(
+        "--compress",
+        nargs="?",
+        const="gzip",
+        default=None,
+        metavar="CODECS",
+        help="also write compressed copies (page.html.gz, ...) of pages and "
+        "text assets, with the comma-separated CODECS: gzip, zstd "
+        "(default: gzip)",
+    )
+    parser.add_argument(
+        "--compress-min-size",
+        type=int,
+        default=DEFAULT_MIN_SIZE,
+        metavar="BYTES",
+        help=f"don't compress files smaller than BYTES (default: {DEFAULT_MIN_SIZE})",
+    )
+    parser.add_argument(
+        "-j",
+        "--jobs",
+        type=int,
+        default=1,
+        metavar="N",
+        help="render pages in N worker processes (0 = one per CPU, default: 1)",
+    )
+    args = parser.parse_args(argv)
+    if not args.base_path.endswith("/"):
+        args.base_path += "/"
+    if args.jobs <= 0:
+        args.jobs = os.cpu_count() or 1
+    if args.compress:
+        args.compress = args.compress.split(",")
+        try:
+            make_codecs(args.compress)
+        except ValueError as error:
+            parser.error(str(error))
+    return args
+
+
+def resolve_paths(args, current_dir):
+    """Sets the site's input and output locations on args, relative to current_dir."""
+    args.public_dir = os.path.join(current_dir, "docs")
+    args.static_dir = os.path.join(current_dir, "static")
+    args.content_dir = os.path.join(current_dir, "content")
+    args.template_path = os.path.join(current_dir, "template.html")
+    args.manifest_path = os.path.join(current_dir, MANIFEST_NAME)
+    args.terms_dir = os.path.join(current_dir, TERMS_DIR)
+    if args.fragment_cache:
+        args.fragment_cache = os.path.join(current_dir, args.fragment_cache)
+    return args
+
+
+def main(argv=None):
+
+    args = parse_args(argv)
+    resolve_paths(args, os.getcwd())
+    setup_logging(args.verbose - args.quiet, args.log_format)
+
+    # Watch mode and the daemon are imported only when used, so a one-shot
+    # build doesn't load http.server and socketserver
+    if args.watch:
+        from devserver import watch
+
+        return watch(args)
+    if args.daemon:
+        from daemon import serve
+
+        current_dir = os.getcwd()
+        return serve(
+            args,
+            lambda argv: resolve_paths(parse_args(argv), current_dir),
+            socket_path(current_dir),
+        )
+
+    errors = build_site(args)
+    report_errors(errors)
+    return 1 if errors else 0
 
 
 if __name__ == "__main__":
-    main()
+    sys.exit(main())
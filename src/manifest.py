@@ -0,0 +1,181 @@
+import hashlib
+import json
+import os
+from compress import remove_siblings
+from source import iter_mapped_chunks, map_file, should_map
+
+MANIFEST_VERSION = 1
+
+
+def hash_file(path, mmap_threshold=None):
+    """Returns the sha256 hex digest of a file's contents, read in chunks,
+    or hashed straight from a memory map if the file is at least
+    mmap_threshold bytes."""
+    digest = hashlib.sha256()
+    if should_map(path, mmap_threshold):
+        with map_file(path) as mapped:
+            for chunk in iter_mapped_chunks(mapped):
+                digest.update(chunk)
+        return digest.hexdigest()
+
+    with open(path, "rb") as fd:
+        for chunk in iter(lambda: fd.read(1 << 16), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+class HashCache:
+    """Remembers the hash of every file it is asked about and reuses it for
+    as long as the file's fingerprint (size and mtime) stays the same, so a
+    long-running process doesn't reread unchanged files build after build.
+    """
+
+    def __init__(self):
+        self.hashes = {}
+
+    def hash_file(self, path, mmap_threshold=None):
+        # Fingerprint first: a change while hashing leaves a newer mtime
+        fingerprint = file_fingerprint(path)
+        cached = self.hashes.get(path)
+        if cached is not None and cached[0] == fingerprint:
+            return cached[1]
+        digest = hash_file(path, mmap_threshold)
+        self.hashes[path] = (fingerprint, digest)
+        return digest
+
+
+def empty_manifest():
+    return {"version": MANIFEST_VERSION, "pages": {}, "static": {}}
+
+
+def load_manifest(path):
+    """Loads the build manifest written by the previous build.
+    A missing, unreadable or outdated manifest yields an empty one,
+    which simply makes every page rebuild.
+    """
+    try:
+        with open(path) as fd:
+            manifest = json.load(fd)
+    except (OSError, ValueError):
+        return empty_manifest()
+
+    if not isinstance(manifest, dict) or manifest.get("version") != MANIFEST_VERSION:
+        return empty_manifest()
+    manifest.setdefault("pages", {})
+    manifest.setdefault("static", {})
+    return manifest
+
+
+def save_manifest(path, manifest):
+    """Writes the manifest next to its final location and renames it into place,
+    so an interrupted build never leaves a truncated manifest behind.
+    """
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "w") as fd:
+        json.dump(manifest, fd, indent=1, sort_keys=True)
+    os.replace(tmp_path, path)
+
+
+def file_fingerprint(path):
+    """Returns [size, mtime_ns] of the file at path, or None if it's missing."""
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return None
+    return [stat.st_size, stat.st_mtime_ns]
+
+
+def page_entry(source_hash, template_hash, base_path, output):
+    """Returns a page's manifest entry from what its output depends on.
+    Once the page is rendered, the entry also records the output's sha256
+    hex digest as "digest" and, as "deps", the fingerprint of every static
+    file it references, keyed by path relative to the static directory."""
+    return {
+        "hash": source_hash,
+        "template": template_hash,
+        "base_path": base_path,
+        "output": output,
+    }
+
+
+# Why a page is rebuilt when one of its entry's inputs differs
+CHANGE_REASONS = {
+    "hash": "source changed",
+    "template": "template changed",
+    "base_path": "base path changed",
+    "output": "output path changed",
+    "compress": "compression changed",
+    "minify": "minification changed",
+}
+
+
+def stale_reasons(entry, new_entry, public_dir, static_dir=None):
+    """Returns why a page must be rebuilt, given its previous manifest
+    entry (None if it has none) and the new one, as a list of reasons that
+    is empty when the page is up to date. The fingerprints of its static
+    dependencies are only checked when static_dir is given."""
+    if entry is None:
+        return ["not in the previous build"]
+    # Inputs the old entry recorded but the new one lacks count too, e.g.
+    # compression being turned off
+    keys = list(new_entry) + [
+        key for key in CHANGE_REASONS if key in entry and key not in new_entry
+    ]
+    reasons = [
+        CHANGE_REASONS.get(key, f"{key} changed")
+        for key in keys
+        if entry.get(key) != new_entry.get(key)
+    ]
+    if not os.path.exists(os.path.join(public_dir, new_entry["output"])):
+        reasons.append("output missing")
+    if static_dir is not None:
+        for path, fingerprint in entry.get("deps", {}).items():
+            if file_fingerprint(os.path.join(static_dir, path)) != fingerprint:
+                reasons.append(f"static file {path} changed")
+    return reasons
+
+
+def is_up_to_date(entry, new_entry, public_dir, static_dir=None):
+    """True when a page's previous manifest entry has the same inputs as
+    the new one and its rendered output is still on disk."""
+    return not stale_reasons(entry, new_entry, public_dir, static_dir)
+
+
+def dependents(pages, static_paths):
+    """Returns the pages (manifest "pages" keys) that depend on any of the
+    static files at static_paths, relative to the static directory."""
+    static_paths = set(static_paths)
+    return {
+        rel_path
+        for rel_path, entry in pages.items()
+        if not static_paths.isdisjoint(entry.get("deps", ()))
+    }
+
+
+def remove_stale_outputs(previous_pages, current_pages, public_dir):
+    """Deletes outputs of pages whose markdown source no longer exists.
+    Returns the list of removed output paths (relative to public_dir).
+    """
+    current_outputs = {entry["output"] for entry in current_pages.values()}
+    removed = []
+    for source, entry in previous_pages.items():
+        if source in current_pages or entry["output"] in current_outputs:
+            continue
+        output_path = os.path.join(public_dir, entry["output"])
+        if os.path.exists(output_path):
+            os.remove(output_path)
+            removed.append(entry["output"])
+        remove_siblings(output_path)
+        prune_empty_dirs(os.path.dirname(output_path), public_dir)
+    return removed
+
+
+def prune_empty_dirs(directory, stop_dir):
+    """Removes directory and its empty parents, never going above stop_dir."""
+    stop_dir = os.path.abspath(stop_dir)
+    directory = os.path.abspath(directory)
+    while directory.startswith(stop_dir + os.sep) and os.path.isdir(directory):
+        if os.listdir(directory):
+            break
+        os.rmdir(directory)
+        directory = os.path.dirname(directory)
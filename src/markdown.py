@@ -1,6 +1,7 @@
 from enum import Enum
 from htmlnode import *
 from textnode import *
+from ir import Document, NO_NODE
 import re
 
 
@@ -13,29 +14,66 @@ class BlockType(Enum):
     ordered_list = "ordered_list"
 
 
+HEADING_RE = re.compile(r"#{1,6} ")
+# "1. ", "2. ", ... built once and extended when a longer list shows up
+ORDERED_PREFIXES = [f"{number}. " for number in range(1, 101)]
+
+# Set while a profiled page is being parsed, so inline parsing gets timed
+# without threading the recorder through every block handler
+_inline_recorder = None
+
+
+# The tag each kind of inline text is wrapped in
+INLINE_TAGS = {
+    TextType.TEXT: None,
+    TextType.BOLD: "b",
+    TextType.ITALIC: "i",
+    TextType.CODE: "code",
+}
+# Hashing an Enum member runs Python code, so the inline emitter, which
+# sees every run of text, compares identities with these instead
+_TEXT, _LINK, _IMAGE = TextType.TEXT, TextType.LINK, TextType.IMAGE
+
+
 def text_to_children(text):
     """
     Converts text with inline markdown to a list of HTMLNode objects
     """
-    # First create a single text node with the entire text
-    nodes = [TextNode(text, TextType.TEXT)]
+    doc = Document()
+    root = doc.element(None)
+    emit_inline(doc, root, text)
+    return [doc.node(child) for child in doc.children(root)]
 
-    # Then split nodes by different delimiters in sequence
-    nodes = split_nodes_delimiter(nodes, "**", TextType.BOLD)  # For bold text
-    nodes = split_nodes_delimiter(nodes, "_", TextType.ITALIC)  # For italic text
-    nodes = split_nodes_delimiter(nodes, "`", TextType.CODE)  # For inline code
-    nodes = split_nodes_image(nodes)
-    nodes = split_nodes_link(nodes)
-    # Convert each TextNode to an HTMLNode
-    html_nodes = []
-    for node in nodes:
-        html_node = text_node_to_html_node(node)
-        html_nodes.append(html_node)
 
-    return html_nodes
+def emit_inline(doc, parent, text):
+    """
+    Adds the inline markdown in text to doc as leaves under parent. Leaves
+    are spans of text, so no substring or node object is created per run.
+    """
+    recorder = _inline_recorder
+    if recorder is not None:
+        started = recorder.start()
+
+    leaf = doc.leaf
+
+    def emit(text_type, start, end, url=None):
+        if text_type is _TEXT:
+            leaf(None, text, parent, start, end)
+        elif text_type is _LINK:
+            leaf("a", text, parent, start, end, (("href", url),))
+        elif text_type is _IMAGE:
+            leaf("img", "", parent, attributes=(("src", url), ("alt", text[start:end])))
+        else:
+            leaf(INLINE_TAGS[text_type], text, parent, start, end)
 
+    # Split bold, italic, code, images and links in a single pass
+    scan_inline(text, emit)
 
-def handle_code_block(block):
+    if recorder is not None:
+        recorder.stop("inline", started, len(text))
+
+
+def emit_code_block(doc, parent, block):
     # Preserve the original block to check for a trailing newline later
     original_block = block
     # Carefully handle the opening and closing lines
@@ -47,52 +85,35 @@ def handle_code_block(block):
 
     # Then join the remaining lines without altering their internal formatting
     code_content = "".join(lines)
-    # print(f"Code block content before TextNode creation: {repr(code_content)}")
     # Add a trailing newline if the original block ended with one
     if original_block.endswith("\n"):
         code_content += "\n"
 
-    # Create text node with the raw content
-    text_node = TextNode(code_content, TextType.TEXT)
-    html_text_node = text_node_to_html_node(text_node)
+    # A <pre> node wrapping a <code> node around the raw content
+    pre = doc.element("pre", parent)
+    code = doc.element("code", pre)
+    doc.leaf(None, code_content, code)
+    return pre
 
-    # Create code and pre nodes
-    code_node = HTMLNode("code", None, [html_text_node], None)
-    pre_node = HTMLNode("pre", None, [code_node], None)
 
-    return pre_node
-
-
-def handle_unordered(block):
-    # Split the block into lines (list items)
-    items = block.split("\n")
-
-    # Create list item nodes
-    list_items = []
-    for item in items:
+def emit_unordered(doc, parent, block):
+    ul = doc.element("ul", parent)
+    # Each line is a list item
+    for item in block.split("\n"):
         # Remove the list marker and leading space
-        if item.startswith("- "):
-            content = item[2:]
-        elif item.startswith("* "):
+        if item.startswith("- ") or item.startswith("* "):
             content = item[2:]
         else:
             content = item  # Fallback
 
-        # Create a list item node with proper children
-        li_node = HTMLNode("li", None, text_to_children(content), {})
-        list_items.append(li_node)
-
-    # Create the unordered list node with list items as children
-    return HTMLNode("ul", None, list_items, {})
+        emit_inline(doc, doc.element("li", ul), content)
+    return ul
 
 
-def handle_ordered(block):
-    # Split the block into list items
-    items = block.split("\n")
-
-    # Create list item nodes
-    list_items = []
-    for item in items:
+def emit_ordered(doc, parent, block):
+    ol = doc.element("ol", parent)
+    # Each line is a list item
+    for item in block.split("\n"):
         # Check for the ordered list pattern: number followed by period and space
         if item and (
             len(item) >= 2
@@ -111,168 +132,313 @@ def handle_ordered(block):
         else:
             content = item  # Fallback case
 
-        # Create a list item node with proper children
-        li_node = HTMLNode("li", None, text_to_children(content), {})
-        list_items.append(li_node)
-
-    # Create the ordered list node with list items as children
-    return HTMLNode("ol", None, list_items, {})
+        emit_inline(doc, doc.element("li", ol), content)
+    return ol
 
 
-def handle_quote(block):
+def emit_quote(doc, parent, block):
     lines = block.split("\n")
     content = "\n".join(line.lstrip(">").lstrip() for line in lines)
+    blockquote = doc.element("blockquote", parent)
+    emit_inline(doc, blockquote, content)
+    return blockquote
+
+
+def emit_paragraph(doc, parent, block):
+    text = " ".join([line.strip() for line in block.split("\n")])
+    p = doc.element("p", parent)
+    emit_inline(doc, p, text)
+    return p
+
+
+def emit_heading(doc, parent, block):
+    # Extract the heading level (number of # symbols)
+    level = 0
+    for char in block:
+        if char == "#":
+            level += 1
+        else:
+            break
+
+    # Ensure level is between 1 and 6
+    level = min(level, 6)
+
+    # Extract the heading text (removing the # symbols and leading space)
+    heading_text = block[level:].strip()
+
+    # Heading node with appropriate tag (h1-h6) around the inline markdown
+    heading = doc.element(f"h{level}", parent)
+    emit_inline(doc, heading, heading_text)
+    return heading
+
+
+BLOCK_EMITTERS = {
+    BlockType.paragraph: emit_paragraph,
+    BlockType.heading: emit_heading,
+    # code blocks become a <pre> node wrapping a <code> node
+    BlockType.code: emit_code_block,
+    # quote blocks should be surrounded by <blockquote> tag
+    BlockType.quote: emit_quote,
+    # unordered list blocks should be surrounded by <ul> tag and each item surrounded with <li> tag
+    BlockType.unordered_list: emit_unordered,
+    # ordered list should be surrounded by <ol> tag and each item surrounded with <li> tag
+    BlockType.ordered_list: emit_ordered,
+}
 
-    children = text_to_children(content)
 
-    return HTMLNode("blockquote", None, children, {})
+def emit_block(doc, parent, block, block_type):
+    """
+    Adds a single markdown block of the given BlockType to doc under parent
+    and returns the index of its node.
+    """
+    return BLOCK_EMITTERS[block_type](doc, parent, block)
+
+
+def _block_node(emitter, block):
+    doc = Document()
+    return doc.node(emitter(doc, NO_NODE, block))
+
+
+def handle_code_block(block):
+    return _block_node(emit_code_block, block)
+
+
+def handle_unordered(block):
+    return _block_node(emit_unordered, block)
+
+
+def handle_ordered(block):
+    return _block_node(emit_ordered, block)
+
+
+def handle_quote(block):
+    return _block_node(emit_quote, block)
 
 
 def handle_paragraph(block):
-    text = " ".join([line.strip() for line in block.split("\n")])
-    children = text_to_children(text)
-    return HTMLNode("p", None, children, None)
+    return _block_node(emit_paragraph, block)
+
+
+def handle_heading(block):
+    return _block_node(emit_heading, block)
+
+
+def block_to_html_node(block, block_type):
+    """
+    Converts a single markdown block of the given BlockType to an HTMLNode.
+    """
+    return _block_node(BLOCK_EMITTERS[block_type], block)
 
 
-def markdown_to_html_node(markdown):
+def markdown_to_html_node(markdown, recorder=None, cache=None, on_block=None):
     """
     Converts a markdown string into a single parent HTMLNode containing
-    child nodes that represent the parsed markdown content.
+    child nodes that represent the parsed markdown content. This is a view
+    of markdown_to_document(), which takes the same arguments.
+
+    Returns:
+        HTMLNode: A div node containing all converted markdown as child nodes
+    """
+    return markdown_to_document(markdown, recorder, cache, on_block).node()
+
+
+def markdown_to_document(markdown, recorder=None, cache=None, on_block=None):
+    """
+    Converts a markdown string into a Document whose root (node 0) is a div
+    holding the parsed markdown content.
 
     Args:
         markdown (str): A string containing markdown content
+        recorder (PageRecorder): Optional profiling recorder, which gets the
+            time spent splitting blocks, classifying them and parsing inline
+            markdown
+        cache (FragmentCache): Optional cache of rendered blocks. Blocks
+            found in it become raw HTML leaves instead of being parsed again
+        on_block (callable): Optional function called with the text of
+            every block, e.g. to collect what the page references
 
     Returns:
-        HTMLNode: A div node containing all converted markdown as child nodes
+        Document: The parsed document
     """
+    if recorder is not None:
+        return _profiled_markdown_to_document(markdown, recorder, cache, on_block)
+
+    doc = Document()
+    div = doc.element("div")
+
+    for block, lines in iter_blocks(markdown.split("\n"), with_lines=True):
+        if on_block is not None:
+            on_block(block)
+        if cache is not None:
+            emit_cached_block(doc, div, block, cache, lines=lines)
+            continue
+        emit_block(doc, div, block, block_to_block_type(block, lines))
 
-    blocks = markdown_to_blocks(markdown)
-    div = HTMLNode("div", None, [])
-
-    for block in blocks:
-        block_type = block_to_block_type(block)
-        match block_type:
-            case BlockType.paragraph:
-                # create a paragraph node and add to div children
-                paragraph_node = handle_paragraph(block)
-                div.children.append(paragraph_node)
-
-            case BlockType.heading:
-                # Extract the heading level (number of # symbols)
-                level = 0
-                for char in block:
-                    if char == "#":
-                        level += 1
-                    else:
-                        break
-
-                # Ensure level is between 1 and 6
-                level = min(level, 6)
-
-                # Extract the heading text (removing the # symbols and leading space)
-                heading_text = block[level:].strip()
-
-                # Process inline markdown in the heading text
-                children = text_to_children(heading_text)
-
-                # Create heading node with appropriate tag (h1-h6)
-                heading_node = HTMLNode(f"h{level}", None, children, None)
-
-                # Add to div children
-                div.children.append(heading_node)
-
-            case BlockType.code:
-                # Use your helper function for code blocks
-                pre_node = handle_code_block(block)
-                # Add the resulting <pre> node to the div's children
-                div.children.append(pre_node)
-
-            case BlockType.quote:
-                # each line starts with >
-                # quote blocks should be surrounded by <blockquote> tag
-                quote_node = handle_quote(block)
-                div.children.append(quote_node)
-            case BlockType.unordered_list:
-                # each line starts with -
-                # unordered list blocks should be surrounded by <ul> tag and each item surrounded with <li> tag
-                unordered_node = handle_unordered(block)
-                div.children.append(unordered_node)
-            case BlockType.ordered_list:
-                # 1. item 2. item
-                # ordered list should be surrounded by <ol> tag and each item surrounded with <li> tag
-                ordered_node = handle_ordered(block)
-                div.children.append(ordered_node)
-
-    return div
-
-
-def block_to_block_type(block):
+    return doc
+
+
+def cached_block_html(block, cache, recorder=None, lines=None):
+    """
+    Returns the HTML of a block, from cache when the same block text was
+    rendered before, otherwise rendering and storing it.
+    """
+    html = cache.get(block)
+    if html is None:
+        if recorder is not None:
+            started = recorder.start()
+        block_type = block_to_block_type(block, lines)
+        if recorder is not None:
+            recorder.stop("block_to_block_type", started, len(block))
+        doc = Document()
+        emit_block(doc, NO_NODE, block, block_type)
+        html = doc.to_html()
+        cache.put(block, html)
+    return html
+
+
+def emit_cached_block(doc, parent, block, cache, recorder=None, lines=None):
+    """Adds the block to doc as a raw HTML leaf, rendered through cache."""
+    return doc.leaf(None, cached_block_html(block, cache, recorder, lines), parent)
+
+
+def iter_markdown_html(lines, cache=None, on_block=None):
+    """
+    Streaming counterpart of markdown_to_html_node(...).iter_html(): reads
+    blocks from an iterable of lines (such as an open file) and yields the
+    HTML of each one as soon as it is parsed, so memory stays proportional
+    to the largest block instead of the whole document. on_block, if
+    given, is called with the text of every block.
+    """
+    yield "<div>"
+    # One document, emptied after every block, holds the block being written
+    doc = Document()
+    for block, block_lines in iter_blocks(lines, with_lines=True):
+        if on_block is not None:
+            on_block(block)
+        if cache is not None:
+            yield cached_block_html(block, cache, lines=block_lines)
+            continue
+        emit_block(doc, NO_NODE, block, block_to_block_type(block, block_lines))
+        yield doc.to_html()
+        doc.clear()
+    yield "</div>"
+
+
+def _profiled_markdown_to_document(markdown, recorder, cache=None, on_block=None):
+    global _inline_recorder
+    started = recorder.start()
+    blocks = list(iter_blocks(markdown.split("\n"), with_lines=True))
+    recorder.stop("markdown_to_blocks", started, len(markdown))
+    doc = Document()
+    div = doc.element("div")
+
+    _inline_recorder = recorder
+    try:
+        for block, lines in blocks:
+            if on_block is not None:
+                on_block(block)
+            if cache is not None:
+                emit_cached_block(doc, div, block, cache, recorder, lines)
+                continue
+            started = recorder.start()
+            block_type = block_to_block_type(block, lines)
+            recorder.stop("block_to_block_type", started, len(block))
+            emit_block(doc, div, block, block_type)
+    finally:
+        _inline_recorder = None
+
+    return doc
+
+
+def block_to_block_type(block, lines=None):
     """
     Determines the type of a markdown block.
 
     Args:
         block (str): A string containing a block of markdown text
+        lines (list): The block's lines, if they are already split; they're
+            only needed to check ordered lists
 
     Returns:
         BlockType: The identified type of the markdown block (heading, paragraph,
                   code block, quote, ordered list, or unordered list)
     """
-    # Check for code blocks first (they have ```at start and end)
-    if block.startswith("```") and block.endswith("```"):
-        return BlockType.code
-
-    # Split into lines for multi-line checks
-    lines = block.split("\n")
-
-    # Check for headings (starts with # and has a space after the #s)
-    if block.startswith("#"):
-        heading_match = re.match(r"^#{1,6} ", block)
-        if heading_match:
+    # Only one block type can start with each character, so the first
+    # character picks the single check that needs to run
+    first = block[:1]
+
+    # Code blocks have ``` at start and end
+    if first == "`":
+        if block.startswith("```") and block.endswith("```"):
+            return BlockType.code
+        return BlockType.paragraph
+
+    # Headings start with 1-6 #s and a space
+    if first == "#":
+        if HEADING_RE.match(block):
             return BlockType.heading
-
-    # For quotes, check if ALL lines start with >
-    if all(line.startswith(">") for line in lines):
-        return BlockType.quote
-
-    # Check for unordered lists
-    if all(line.startswith("- ") for line in lines):
-        return BlockType.unordered_list
-
-    # Check for ordered lists
-    is_ordered_list = True
-    for i, line in enumerate(lines):
-        expected_start = f"{i+1}. "
-        if not line.startswith(expected_start):
-            is_ordered_list = False
-            break
-
-    if is_ordered_list and lines:  # Ensure there's at least one line
-        return BlockType.ordered_list
+        return BlockType.paragraph
+
+    # For quotes and unordered lists every line must start with the marker,
+    # i.e. every newline is followed by it
+    newlines = block.count("\n")
+    if first == ">":
+        if block.count("\n>") == newlines:
+            return BlockType.quote
+        return BlockType.paragraph
+
+    if first == "-":
+        if block.startswith("- ") and block.count("\n- ") == newlines:
+            return BlockType.unordered_list
+        return BlockType.paragraph
+
+    # Ordered lists are numbered 1. 2. 3. ...
+    if first == "1":
+        if lines is None:
+            lines = block.split("\n")
+        while len(ORDERED_PREFIXES) < len(lines):
+            ORDERED_PREFIXES.append(f"{len(ORDERED_PREFIXES) + 1}. ")
+        if all(map(str.startswith, lines, ORDERED_PREFIXES)):
+            return BlockType.ordered_list
+        return BlockType.paragraph
 
     return BlockType.paragraph
 
 
 def markdown_to_blocks(markdown):
-    blocks = []
-    lines = markdown.split("\n")
+    return list(iter_blocks(markdown.split("\n")))
+
+
+def iter_blocks(lines, with_lines=False):
+    """
+    Yields the markdown blocks of an iterable of lines, such as an open
+    file, as soon as each one is complete. Only the current block is held
+    in memory; trailing newlines on the lines are ignored, except that a
+    final newline ends in an empty line, as it does for str.split("\n").
+    With with_lines, (block, block_lines) pairs are yielded instead, so
+    callers can classify blocks without splitting them again.
+    """
     current_block = []
     in_code_block = False
+    newline = False
 
     for line in lines:
+        newline = line.endswith("\n")
+        if newline:
+            line = line[:-1]
         # Check for code block markers
         if line.strip().startswith("```"):
             if not in_code_block:
                 # Starting a code block
                 if current_block:
                     # Add the previous block
-                    blocks.append("\n".join(current_block))
-                    current_block = []
+                    yield from _finish_block(current_block, with_lines)
                 in_code_block = True
                 current_block = [line]  # Start with the code marker - don't strip!
             else:
                 # Ending a code block
                 current_block.append(line)  # Don't strip closing code marker
-                blocks.append("\n".join(current_block))
+                yield from _finish_block(current_block, with_lines)
                 current_block = []
                 in_code_block = False
         elif in_code_block:
@@ -283,15 +449,24 @@ def markdown_to_blocks(markdown):
             if line.strip() == "":
                 # Empty line marks end of block
                 if current_block:
-                    blocks.append("\n".join(current_block))
+                    yield from _finish_block(current_block, with_lines)
                     current_block = []
             else:
                 # Add line to current block, still strip for normal text
                 current_block.append(line.strip())
 
+    # The empty line after a final newline only counts in an unterminated
+    # code block; anywhere else it would just end the block
+    if newline and in_code_block:
+        current_block.append("")
+
     # Don't forget the last block if there is one
     if current_block:
-        blocks.append("\n".join(current_block))
+        yield from _finish_block(current_block, with_lines)
+
 
-    # Filter out empty blocks
-    return [block for block in blocks if block.strip()]
+def _finish_block(lines, with_lines):
+    block = "\n".join(lines)
+    # Skip empty blocks
+    if block.strip():
+        yield (block, lines) if with_lines else block
@@ -0,0 +1,207 @@
+import re
+
+# Elements whose contents are passed through untouched
+PRESERVED_TAGS = ("pre", "code", "textarea", "script", "style")
+# Elements that start a new line, so whitespace next to them never renders
+BLOCK_TAGS = frozenset((
+    "!doctype", "html", "head", "body", "title", "meta", "link", "base", "script", "style",
+    "article", "aside", "section", "nav", "header", "footer", "main", "div",
+    "p", "h1", "h2", "h3", "h4", "h5", "h6", "hr", "pre", "blockquote", "ul",
+    "ol", "li", "dl", "dt", "dd", "figure", "figcaption", "table", "thead",
+    "tbody", "tfoot", "tr", "th", "td", "caption", "form", "fieldset", "br",
+))
+VOID_TAGS = frozenset((
+    "area", "base", "br", "col", "embed", "hr", "img", "input", "link",
+    "meta", "source", "track", "wbr",
+))
+
+_WS = r"[ \t\n\r\f]"
+# A tag's attributes; quoted values may contain ">"
+_ATTRIBUTES = r"(?:[^>\"']|\"[^\"]*\"|'[^']*')*+"
+_PRESERVED = rf"<((?i:{'|'.join(PRESERVED_TAGS)}))(?=[\s/>])"
+
+# Every pattern starts with "<", which the regex engine skips to quickly,
+# so text costs next to nothing and only tags that change reach Python:
+# preserved elements (1-3) with attributes or tags inside, tags with
+# attributes (4-5) and tags followed by whitespace and another tag (6-7,
+# the next tag's name). A preserved element holding nothing but text is
+# safe from the rest of the pattern and goes unmatched.
+MINIFY_RE = re.compile(
+    rf"<(?:((?i:{'|'.join(PRESERVED_TAGS)}))(?=[\s/>])"
+    rf"(?:(\s{_ATTRIBUTES})>|>(?=[^<]*+<(?!/(?i:\1)\s*>)|{_WS}*<))(.*?</(?i:\1)\s*>)"
+    rf"|(/?[A-Za-z][^\s/>]*+|!(?i:doctype))(?:(\s{_ATTRIBUTES})>|>(?={_WS}+(?:<|\Z))))"
+    rf"(?:({_WS}+)(?=<(/?[^\s/>]*)|\Z))?",
+    re.S,
+)
+COMMENT_RE = re.compile(rf"{_PRESERVED}.*?</(?i:\1)\s*>|<!--(?!\[if).*?-->", re.S)
+OPEN_PRESERVED_RE = re.compile(rf"{_PRESERVED}.*?</(?i:\1)\s*>|({_PRESERVED})", re.S)
+# Attributes as the serializer writes them, one space apart, double-quoted
+SIMPLE_ATTRIBUTES_RE = re.compile(r'(?: [^\s"\'>/=]+="[^"]*")+')
+ATTRIBUTE_RE = re.compile(r"""([^\s"'>/=]+)(?:\s*=\s*(?:"([^"]*)"|'([^']*)'|([^\s>]+)))?""")
+UNQUOTED_VALUE_RE = re.compile(r"[^\s\"'=<>`]+")
+
+
+def minify_attributes(attributes):
+    """Rewrites a tag's attributes with single spaces between them and
+    values unquoted where HTML allows it. Returns the attributes and
+    whether the last value was left unquoted."""
+    parts = []
+    unquoted = False
+    for match in ATTRIBUTE_RE.finditer(attributes):
+        name, double, single, bare = match.groups()
+        value = double if double is not None else single if single is not None else bare
+        unquoted = False
+        if value is None:
+            parts.append(" " + name)
+        elif UNQUOTED_VALUE_RE.fullmatch(value):
+            parts.append(f" {name}={value}")
+            unquoted = True
+        elif single is not None:
+            parts.append(f" {name}='{value}'")
+        else:
+            parts.append(f' {name}="{value}"')
+    return "".join(parts), unquoted
+
+
+def minify_tag(name, attributes):
+    """Returns the tag <{name}{attributes}> minified, name including the
+    slash of an end tag. Void elements lose their trailing slash, which
+    only matters elsewhere in SVG and MathML."""
+    if not attributes or attributes.isspace():
+        return f"<{name}>"
+    if SIMPLE_ATTRIBUTES_RE.fullmatch(attributes):
+        # ' a="x" b="y"' splits into names (even) and values (odd)
+        parts = attributes.split('"')
+        for i in range(1, len(parts), 2):
+            if UNQUOTED_VALUE_RE.fullmatch(parts[i]) is None:
+                parts[i] = f'"{parts[i]}"'
+        return "<" + name + "".join(parts) + ">"
+    self_closing = attributes.rstrip().endswith("/")
+    attributes, unquoted = minify_attributes(attributes)
+    if self_closing and name.lower() not in VOID_TAGS:
+        # A space keeps the slash out of an unquoted value
+        return f"<{name}{attributes}{' />' if unquoted else '/>'}"
+    return f"<{name}{attributes}>"
+
+
+# Block tag names with and without the slash of an end tag
+_BLOCK_NAMES = BLOCK_TAGS | {"/" + name for name in BLOCK_TAGS}
+
+
+def _minify_match(match):
+    preserved, attributes, contents, name, tag_attributes, space, next_name = match.groups()
+    if preserved is not None:
+        html = minify_tag(preserved, attributes) + contents
+        name = preserved
+    elif tag_attributes:
+        html = minify_tag(name, tag_attributes)
+    else:
+        html = f"<{name}>"
+    # Whitespace up to the next tag renders as a space, unless a block
+    # element is on either side of it or the document ends
+    if (
+        space
+        and next_name is not None
+        and name.lower() not in _BLOCK_NAMES
+        and next_name.lower() not in _BLOCK_NAMES
+    ):
+        html += " "
+    return html
+
+
+def _remove_comment(match):
+    return match.group() if match.group(1) else ""
+
+
+def minify(html):
+    """Minifies a complete HTML document or fragment.
+
+    Comments are dropped (conditional ones are kept), whitespace between
+    two tags is removed next to block elements and collapsed to a single
+    space elsewhere, tags lose the whitespace inside them, attribute
+    values are unquoted where that's allowed and void elements lose their
+    trailing slash. Whitespace within text is left alone, as are the
+    contents of <pre>, <code>, <textarea>, <script> and <style> elements.
+    """
+    if "<!--" in html:
+        html = COMMENT_RE.sub(_remove_comment, html)
+    return MINIFY_RE.sub(_minify_match, html)
+
+
+class Minifier:
+    """Minifies HTML fed to it in chunks of any size, returning the
+    minified HTML as it goes. The result is the same as minify() of the
+    whole document.
+
+    Chunks are collected until there are batch_size characters, then
+    minified up to their last pair of adjacent tags ("><"), where
+    minifying both sides separately changes nothing; the rest waits for
+    the next batch. A comment on either side of the pair would leave
+    whitespace at the cut once dropped, so such pairs are passed over.
+    Comments and preserved elements that aren't complete yet wait as a
+    whole. Most pages fit in one batch and are minified in a single pass
+    when the minifier is closed.
+    """
+
+    def __init__(self, batch_size=16384):
+        self.batch_size = batch_size
+        self.pending = []
+        self.size = 0
+
+    def feed(self, chunk):
+        self.pending.append(chunk)
+        self.size += len(chunk)
+        if self.size < self.batch_size:
+            return ""
+        data = "".join(self.pending)
+        cut = self._safe_end(data)
+        self.pending = [data[cut:]]
+        self.size = len(data) - cut
+        return minify(data[:cut]) if cut else ""
+
+    def close(self):
+        """Returns the rest of the minified HTML."""
+        html = minify("".join(self.pending))
+        self.pending = []
+        self.size = 0
+        return html
+
+    @staticmethod
+    def _safe_end(data):
+        """Returns where the part of data that can be minified on its own
+        ends."""
+        cut = data.rfind("><") + 1
+        while cut:
+            if "<!--".startswith(data[cut:cut + 4]) or data.endswith("-->", 0, cut):
+                # Dropping a comment next to the cut, or one that may be
+                # starting there, would bring whitespace up to it
+                cut = data.rfind("><", 0, cut - 1) + 1
+                continue
+            incomplete = None
+            comment = data.rfind("<!--", 0, cut)
+            if comment >= 0:
+                comment_end = data.find("-->", comment)
+                if comment_end < 0 or comment_end + 3 > cut:
+                    incomplete = comment
+            for match in OPEN_PRESERVED_RE.finditer(data, 0, cut):
+                if match.group(2) is not None:
+                    if incomplete is None or match.start() < incomplete:
+                        incomplete = match.start()
+                    break
+            if incomplete is None:
+                break
+            cut = data.rfind("><", 0, incomplete) + 1
+        return cut
+
+
+def iter_minify(chunks, batch_size=16384):
+    """Minifies the HTML in chunks, yielding minified chunks as the input
+    arrives."""
+    minifier = Minifier(batch_size)
+    for chunk in chunks:
+        html = minifier.feed(chunk)
+        if html:
+            yield html
+    html = minifier.close()
+    if html:
+        yield html
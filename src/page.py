@@ -0,0 +1,291 @@
+import logging
+import os
+import posixpath
+from urllib.parse import urlsplit
+from markdown import markdown_to_document, iter_markdown_html
+from feeds import PageSummary, terms_path, write_terms
+from manifest import hash_file, page_entry, stale_reasons, file_fingerprint
+from minify import minify as minify_html, iter_minify
+from textnode import extract_markdown_images
+from source import open_source, should_map
+from template import Template
+from writer import OutputWriter
+
+logger = logging.getLogger(__name__)
+
+
+def extract_title(markdown):
+    """Pulls h1 header from markdown file and returns it.
+    strips # and removes any leading/trailing whitespace.
+    If there is no h1 header raises an exception.
+    """
+    lines = markdown.strip().splitlines()
+    title = None
+    for line in lines:
+        if line.startswith("# "):
+            title = line.lstrip("#").strip()
+            return title
+    raise Exception("no h1 title found")
+
+
+def find_title(lines):
+    """Like extract_title, but reads an iterable of lines such as an open
+    file, stopping at the h1 header instead of reading the whole document."""
+    first = True
+    for line in lines:
+        if first:
+            # The document's leading whitespace is ignored
+            line = line.lstrip()
+            if not line:
+                continue
+            first = False
+        if line.startswith("# "):
+            return line.lstrip("#").strip()
+    raise Exception("no h1 title found")
+
+
+def load_template(template, base_path):
+    """Accepts either a compiled Template or a path to a template file."""
+    if isinstance(template, Template):
+        return template
+    return Template.from_file(template, base_path)
+
+
+class PageInfo:
+    """What rendering a page learns about it besides its HTML: its title,
+    the URLs of its images and, with summarize, a feeds.PageSummary of its
+    text."""
+
+    def __init__(self, summarize=False):
+        self.title = None
+        self.images = []
+        self.summary = PageSummary() if summarize else None
+
+    def add_block(self, block):
+        if "![" in block:
+            self.images.extend(url for _, url in extract_markdown_images(block))
+        if self.summary is not None:
+            self.summary.add_block(block)
+
+
+def generate_page(
+    from_path,
+    template,
+    dest_path,
+    base_path,
+    recorder=None,
+    cache=None,
+    mmap_threshold=None,
+    writer=None,
+    known_digest=None,
+    info=None,
+    minify=False,
+):
+    """Renders the markdown file at from_path into dest_path and returns
+    the output's sha256 hex digest.
+    template is a Template compiled for base_path; passing a path to the
+    template file still works but compiles it for this page only.
+    recorder, a profiling.PageRecorder, gets the time spent in each stage.
+    cache, a cache.FragmentCache, reuses blocks rendered before.
+    Sources of at least mmap_threshold bytes are memory-mapped.
+    writer, a writer.OutputWriter, writes the page, in the background if it
+    has threads; memory-mapped sources are still streamed straight to their
+    output. An output already holding the same HTML isn't rewritten;
+    known_digest is the digest it had when last written, if known.
+    info, a PageInfo, collects the page's title, images and summary.
+    With minify, the page is minified as it streams out of the template.
+    """
+    template = load_template(template, base_path)
+    if writer is None:
+        writer = OutputWriter(threads=0)
+    if info is None:
+        info = PageInfo()
+    if recorder is not None:
+        return _profiled_generate_page(
+            from_path, template, dest_path, recorder, cache, mmap_threshold,
+            writer, known_digest, info, minify,
+        )
+
+    if writer.executor is not None and not should_map(from_path, mmap_threshold):
+        with open(from_path) as md_fd:
+            title = info.title = find_title(md_fd)
+            md_fd.seek(0)
+            content = iter_markdown_html(md_fd, cache, info.add_block)
+            chunks = template.iter_render(title, content)
+            html = "".join(iter_minify(chunks) if minify else chunks)
+        return writer.write(dest_path, html, known_digest)
+
+    # The source is read twice, first up to its title, then block by block
+    # while the HTML is streamed into the output file, so a page of any size
+    # never has to be held in memory.
+    with open_source(from_path, mmap_threshold) as md_fd:
+        title = info.title = find_title(md_fd)
+        md_fd.seek(0)
+        content = iter_markdown_html(md_fd, cache, info.add_block)
+        chunks = template.iter_render(title, content)
+        return writer.write_stream(
+            dest_path, iter_minify(chunks) if minify else chunks, known_digest
+        )
+
+
+def _profiled_generate_page(
+    from_path,
+    template,
+    dest_path,
+    recorder,
+    cache=None,
+    mmap_threshold=None,
+    writer=None,
+    known_digest=None,
+    info=None,
+    minify=False,
+):
+    """generate_page with each stage run to completion on its own, so
+    serialization, templating and writing can be timed separately."""
+    started = recorder.start()
+    with open_source(from_path, mmap_threshold) as md_fd:
+        md = md_fd.read()
+    recorder.stop("read", started, len(md))
+
+    content = markdown_to_document(md, recorder, cache, info.add_block)
+
+    started = recorder.start()
+    content_html = content.to_html()
+    recorder.stop("to_html", started, len(content_html))
+
+    started = recorder.start()
+    info.title = extract_title(md)
+    html = template.render(title=info.title, content=content_html)
+    recorder.stop("template", started, len(html))
+
+    if minify:
+        started = recorder.start()
+        html = minify_html(html)
+        recorder.stop("minify", started, len(html))
+
+    started = recorder.start()
+    digest = writer.write_stream(dest_path, [html], known_digest)
+    recorder.stop("write", started, len(html))
+    return digest
+
+
+def process_md_file(
+    root,
+    file,
+    content_dir,
+    public_dir,
+    template,
+    base_path,
+    previous=None,
+    recorder=None,
+    cache=None,
+    mmap_threshold=None,
+    writer=None,
+    static_dir=None,
+    reasons=None,
+    summarize=False,
+    hashes=None,
+    compress=None,
+    minify=False,
+    terms_dir=None,
+    terms=None,
+):
+    """Renders one markdown file into public_dir.
+
+    Returns the page's manifest entry and whether the page was rendered.
+    When previous (the entry from the last build) still matches the source,
+    template and base_path, and, given static_dir, none of the static files
+    it references changed, the page is not regenerated so its output keeps
+    its mtime. If reasons is a list, why the page was rendered is added.
+    With summarize, the entry also records the page's title and excerpt;
+    its search terms are added to terms if that is a list and, given
+    terms_dir, recorded there with feeds.write_terms. With writer (a writer.OutputWriter), the output may still
+    be being written when this returns; writer.unchanged tells whether the
+    rendered page differed from the output already on disk. hashes, a
+    manifest.HashCache, lets a long-running process skip rehashing sources
+    that haven't changed. compress lists the codecs the writer compresses
+    outputs with; pages are rebuilt when it changes, so every output gets
+    its compressed siblings. Likewise with minify, which minifies pages.
+    """
+
+    content_path = os.path.join(root, file)
+    rel_path = os.path.relpath(content_path, content_dir)
+
+    if file == "index.md":
+        rel_html_path = os.path.join(os.path.dirname(rel_path), "index.html")
+    else:
+        rel_html_path = rel_path.replace(".md", ".html")
+
+    template = load_template(template, base_path)
+    if hashes is not None:
+        source_hash = hashes.hash_file(content_path, mmap_threshold)
+    else:
+        source_hash = hash_file(content_path, mmap_threshold)
+    entry = page_entry(source_hash, template.hash, base_path, rel_html_path)
+    if compress:
+        entry["compress"] = list(compress)
+    if minify:
+        entry["minify"] = True
+    stale = stale_reasons(previous, entry, public_dir, static_dir)
+    if summarize and previous is not None:
+        if "excerpt" not in previous:
+            stale.append("no summary recorded")
+        elif terms_dir is not None and not os.path.exists(terms_path(terms_dir, rel_path)):
+            stale.append("no search terms recorded")
+    if not stale:
+        return previous, False
+    if reasons is not None:
+        reasons.extend(stale)
+
+    known_digest = None
+    if previous is not None and previous["output"] == rel_html_path:
+        known_digest = previous.get("digest")
+
+    info = PageInfo(summarize)
+    dest_path = os.path.join(public_dir, rel_html_path)
+    entry["digest"] = generate_page(
+        content_path,
+        template,
+        dest_path,
+        base_path,
+        recorder,
+        cache,
+        mmap_threshold,
+        writer,
+        known_digest,
+        info,
+        minify,
+    )
+    if static_dir is not None and info.images:
+        entry["deps"] = static_dependencies(info.images, rel_html_path, static_dir)
+    if summarize:
+        entry["title"] = info.title
+        entry.update(info.summary.entry_fields())
+        page_terms = info.summary.terms()
+        if terms_dir is not None:
+            write_terms(terms_dir, rel_path, page_terms)
+        if terms is not None:
+            terms.extend(page_terms)
+
+    logger.debug("Processed Markdown file %s into %s", content_path, dest_path)
+    return entry, True
+
+
+def static_dependencies(urls, rel_html_path, static_dir):
+    """Maps the local files among urls, as referenced from the page at
+    rel_html_path, to their fingerprint in static_dir (None while they
+    don't exist there). Keys are paths relative to static_dir."""
+    page_dir = posixpath.dirname(rel_html_path.replace(os.sep, "/"))
+    deps = {}
+    for url in urls:
+        parts = urlsplit(url)
+        if parts.scheme or parts.netloc or not parts.path:
+            continue
+        if parts.path.startswith("/"):
+            path = posixpath.normpath(parts.path.lstrip("/"))
+        else:
+            path = posixpath.normpath(posixpath.join(page_dir, parts.path))
+        if path == ".." or path.startswith("../"):
+            continue
+        deps[path] = file_fingerprint(os.path.join(static_dir, path))
+    return deps
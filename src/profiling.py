@@ -0,0 +1,138 @@
+import json
+import time
+
+STAGES = (
+    "read",
+    "markdown_to_blocks",
+    "block_to_block_type",
+    "inline",
+    "to_html",
+    "template",
+    "minify",
+    "write",
+    "static_copy",
+)
+
+# Timings of work that doesn't belong to a page, like syncing static files
+SITE = "<site>"
+
+
+class PageRecorder:
+    """Accumulates wall time, CPU time and bytes per stage for one page.
+
+    Recorders are cheap and picklable, so pool workers fill one in per page
+    and send its stages back to the Profiler in the main process.
+    """
+
+    __slots__ = ("page", "stages")
+
+    def __init__(self, page):
+        self.page = page
+        self.stages = {}
+
+    def start(self):
+        return time.perf_counter(), time.process_time()
+
+    def stop(self, stage, started, nbytes=0):
+        wall = time.perf_counter() - started[0]
+        cpu = time.process_time() - started[1]
+        totals = self.stages.get(stage)
+        if totals is None:
+            self.stages[stage] = [wall, cpu, nbytes]
+        else:
+            totals[0] += wall
+            totals[1] += cpu
+            totals[2] += nbytes
+
+
+class Profiler:
+    """Collects per-page stage timings for a build.
+
+    Hooks added with add_hook are called as hook(page, stage, wall, cpu,
+    nbytes) for every stage of every page as its timings reach the main
+    process, which lets callers stream or filter timings themselves.
+    """
+
+    def __init__(self):
+        self.pages = {}
+        self.hooks = []
+
+    def add_hook(self, hook):
+        self.hooks.append(hook)
+
+    def add(self, page, stages):
+        """Merges a page's {stage: [wall, cpu, bytes]} into the profile."""
+        page_stages = self.pages.setdefault(page, {})
+        for stage, (wall, cpu, nbytes) in stages.items():
+            totals = page_stages.setdefault(stage, [0.0, 0.0, 0])
+            totals[0] += wall
+            totals[1] += cpu
+            totals[2] += nbytes
+            for hook in self.hooks:
+                hook(page, stage, wall, cpu, nbytes)
+
+    def record(self, page, stage, started, nbytes=0):
+        """Records a stage timed in the main process with PageRecorder.start()."""
+        recorder = PageRecorder(page)
+        recorder.stop(stage, started, nbytes)
+        self.add(page, recorder.stages)
+
+    def totals(self):
+        totals = {}
+        for stages in self.pages.values():
+            for stage, (wall, cpu, nbytes) in stages.items():
+                stage_totals = totals.setdefault(stage, [0.0, 0.0, 0])
+                stage_totals[0] += wall
+                stage_totals[1] += cpu
+                stage_totals[2] += nbytes
+        return totals
+
+    def slowest(self, count=10):
+        """Returns the count pages with the highest total wall time as
+        (page, wall) pairs, slowest first."""
+        page_walls = [
+            (page, sum(wall for wall, _, _ in stages.values()))
+            for page, stages in self.pages.items()
+            if page != SITE
+        ]
+        page_walls.sort(key=lambda item: item[1], reverse=True)
+        return page_walls[:count]
+
+    def report(self, top=10):
+        def as_dict(stages):
+            return {
+                stage: {"wall": wall, "cpu": cpu, "bytes": nbytes}
+                for stage, (wall, cpu, nbytes) in stages.items()
+            }
+
+        return {
+            "totals": as_dict(self.totals()),
+            "pages": {page: as_dict(stages) for page, stages in self.pages.items()},
+            "slowest": [{"page": page, "wall": wall} for page, wall in self.slowest(top)],
+        }
+
+    def write_json(self, path, top=10):
+        with open(path, "w") as fd:
+            json.dump(self.report(top), fd, indent=1)
+
+    def format_table(self, top=10):
+        """Returns a text table of stage totals and the top slowest pages,
+        with wall times in milliseconds."""
+        lines = [f"{'stage':<22}{'wall ms':>10}{'cpu ms':>10}{'bytes':>14}"]
+        totals = self.totals()
+        for stage in STAGES:
+            if stage in totals:
+                wall, cpu, nbytes = totals[stage]
+                lines.append(f"{stage:<22}{wall * 1000:>10.1f}{cpu * 1000:>10.1f}{nbytes:>14,}")
+
+        columns = [stage for stage in STAGES if stage != "static_copy"]
+        lines.append("")
+        lines.append(f"{'slowest pages':<40}{'total':>9}" + "".join(f"{c[:9]:>10}" for c in columns))
+        for page, wall in self.slowest(top):
+            stages = self.pages[page]
+            cells = "".join(
+                f"{stages[c][0] * 1000:>10.1f}" if c in stages else f"{'-':>10}"
+                for c in columns
+            )
+            lines.append(f"{page[-40:]:<40}{wall * 1000:>9.1f}{cells}")
+        return "\n".join(lines)
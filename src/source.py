@@ -0,0 +1,101 @@
+import mmap
+import os
+
+# Sources at least this large are memory-mapped instead of read
+DEFAULT_MMAP_THRESHOLD = 16 << 20
+# While iterating, mapped pages this far behind the current line are
+# released, so resident memory doesn't grow with the size of the file
+RELEASE_INTERVAL = 8 << 20
+
+
+def map_file(path):
+    """Returns a read-only memory map of the whole file at path."""
+    with open(path, "rb") as fd:
+        mapped = mmap.mmap(fd.fileno(), 0, access=mmap.ACCESS_READ)
+    if hasattr(mapped, "madvise"):
+        # Sources are read front to back, so let the kernel read ahead
+        mapped.madvise(mmap.MADV_SEQUENTIAL)
+    return mapped
+
+
+def release_pages(mapped, start, end):
+    """Drops the pages of mapped between start and end (rounded down to
+    page boundaries) from this process; they stay in the page cache."""
+    start = start // mmap.PAGESIZE * mmap.PAGESIZE
+    end = end // mmap.PAGESIZE * mmap.PAGESIZE
+    if end > start and hasattr(mapped, "madvise"):
+        mapped.madvise(mmap.MADV_DONTNEED, start, end - start)
+    return end
+
+
+def iter_mapped_chunks(mapped, size=RELEASE_INTERVAL):
+    """Yields the contents of mapped as memoryviews of size bytes without
+    copying them, releasing each chunk's pages once it has been used.
+    Chunks are only valid until the next one is requested."""
+    with memoryview(mapped) as view:
+        for offset in range(0, len(mapped), size):
+            with view[offset : offset + size] as chunk:
+                yield chunk
+            release_pages(mapped, offset, offset + size)
+
+
+def should_map(path, mmap_threshold):
+    """Whether a file should be memory-mapped: mmap_threshold None never
+    maps, and empty files can't be mapped."""
+    if mmap_threshold is None:
+        return False
+    size = os.path.getsize(path)
+    return size > 0 and size >= mmap_threshold
+
+
+class MappedSource:
+    """A markdown source read through a memory map.
+
+    Behaves like the text file open() returns as far as rendering needs:
+    it iterates over decoded lines, can seek back to the start and can be
+    read whole. Lines are copied out of the map one at a time, so the file
+    itself is only held once, in the page cache shared by every process
+    rendering it, and pages already read are dropped from this process's
+    mapping as iteration moves on. Like text mode, "\r\n" and lone "\r"
+    line endings are read as "\n".
+    """
+
+    def __init__(self, path):
+        self.map = map_file(path)
+
+    def __iter__(self):
+        mapped = self.map
+        released = mapped.tell()
+        for line in iter(mapped.readline, b""):
+            if b"\r" in line:
+                # A lone "\r" ends a line too, so one "\n" line may hold several
+                lines = line.replace(b"\r\n", b"\n").replace(b"\r", b"\n")
+                yield from (part.decode() for part in lines.splitlines(keepends=True))
+            else:
+                yield line.decode()
+
+            if mapped.tell() - released >= RELEASE_INTERVAL:
+                released = release_pages(mapped, released, mapped.tell())
+
+    def seek(self, offset):
+        self.map.seek(offset)
+
+    def read(self):
+        return self.map.read().decode().replace("\r\n", "\n").replace("\r", "\n")
+
+    def close(self):
+        self.map.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+def open_source(path, mmap_threshold=None):
+    """Opens a markdown source for reading, memory-mapped when it is at
+    least mmap_threshold bytes and as a regular text file otherwise."""
+    if should_map(path, mmap_threshold):
+        return MappedSource(path)
+    return open(path)
@@ -0,0 +1,211 @@
+import logging
+import os
+import shutil
+from functools import partial
+from compress import COMPRESSIBLE_EXTENSIONS, remove_siblings, sibling_suffixes
+from manifest import hash_file, prune_empty_dirs
+
+logger = logging.getLogger(__name__)
+
+
+def copytree(
+    source,
+    destination,
+    previous=None,
+    link=False,
+    checksum=False,
+    stats=None,
+    compressor=None,
+    stale_siblings=True,
+):
+    """Syncs all contents of the source directory into destination.
+
+    Only files that are missing from destination or differ in size or mtime
+    (or content, with checksum=True) are copied; unchanged files are left
+    untouched. previous is the result of the last sync: files listed there
+    that are gone from source are removed from destination. Other files in
+    destination, such as rendered pages, are never touched.
+
+    With link=True files are hardlinked instead of copied when source and
+    destination share a filesystem. With compressor (a compress.Compressor),
+    copied text assets get compressed siblings; without one, siblings left
+    by earlier builds are removed, unless stale_siblings is False because
+    no earlier build wrote any.
+
+    Returns a dict mapping each file's path relative to source to its size
+    and mtime, to be passed back as previous on the next sync. If stats is
+    a dict, the number of files and bytes copied and of files removed are
+    stored in it.
+    """
+    files = {}
+    if stats is None:
+        stats = {}
+    stats.update(copied=0, bytes=0, removed=0)
+    if compressor is None and not stale_siblings:
+        # Nothing to compress and nothing to clean up
+        update = None
+    else:
+        update = partial(update_siblings, compressor=compressor)
+    _sync_dir(source, destination, "", link, checksum, files, stats, update)
+
+    for rel_path in previous or ():
+        if rel_path in files:
+            continue
+        destination_item = os.path.join(destination, rel_path)
+        if os.path.isfile(destination_item):
+            logger.debug("Removing stale file: %s", destination_item)
+            os.remove(destination_item)
+            stats["removed"] += 1
+        remove_siblings(
+            destination_item,
+            [suffix for suffix in sibling_suffixes() if rel_path + suffix not in files],
+        )
+        prune_empty_dirs(os.path.dirname(destination_item), destination)
+
+    if compressor is not None:
+        for path, error in compressor.flush().items():
+            logger.error("Failed to compress %s:\n%s", path, error)
+    return files
+
+
+def sync_paths(
+    source, destination, rel_paths, files, link=False, compressor=None, stale_siblings=True
+):
+    """Syncs only the given paths (relative to source) into destination,
+    updating files, the dict returned by copytree, in place. Paths that no
+    longer exist in source are removed from destination. compressor and
+    stale_siblings handle compressed siblings as in copytree."""
+    update = None
+    if compressor is not None or stale_siblings:
+        update = partial(update_siblings, compressor=compressor)
+    for rel_path in sorted(rel_paths):
+        source_item = os.path.join(source, rel_path)
+        destination_item = os.path.join(destination, rel_path)
+        if os.path.isfile(source_item):
+            stat = os.stat(source_item)
+            files[rel_path] = {"size": stat.st_size, "mtime": stat.st_mtime_ns}
+            if not _is_unchanged(source_item, stat, destination_item, False):
+                logger.debug("Copying file: %s to %s", source_item, destination_item)
+                os.makedirs(os.path.dirname(destination_item), exist_ok=True)
+                copy_file(source_item, destination_item, link)
+                if update is not None:
+                    update(source_item, destination_item)
+            elif update is not None:
+                update(source_item, destination_item, changed=False)
+        elif files.pop(rel_path, None) is not None:
+            if os.path.isfile(destination_item):
+                logger.debug("Removing stale file: %s", destination_item)
+                os.remove(destination_item)
+            remove_siblings(
+                destination_item,
+                [suffix for suffix in sibling_suffixes() if rel_path + suffix not in files],
+            )
+            prune_empty_dirs(os.path.dirname(destination_item), destination)
+
+    if compressor is not None:
+        for path, error in compressor.flush().items():
+            logger.error("Failed to compress %s:\n%s", path, error)
+
+
+def _sync_dir(source, destination, rel_dir, link, checksum, files, stats, update):
+    os.makedirs(destination, exist_ok=True)
+
+    with os.scandir(source) as entries:
+        for entry in sorted(entries, key=lambda entry: entry.name):
+            destination_item = os.path.join(destination, entry.name)
+            rel_path = os.path.join(rel_dir, entry.name)
+
+            if entry.is_dir():
+                _sync_dir(
+                    entry.path,
+                    destination_item,
+                    rel_path,
+                    link,
+                    checksum,
+                    files,
+                    stats,
+                    update,
+                )
+                continue
+
+            stat = entry.stat()
+            files[rel_path] = {"size": stat.st_size, "mtime": stat.st_mtime_ns}
+            if _is_unchanged(entry.path, stat, destination_item, checksum):
+                if update is not None:
+                    update(entry.path, destination_item, changed=False)
+                continue
+
+            logger.debug("Copying file: %s to %s", entry.path, destination_item)
+            copy_file(entry.path, destination_item, link)
+            if update is not None:
+                update(entry.path, destination_item)
+            stats["copied"] += 1
+            stats["bytes"] += stat.st_size
+
+
+def update_siblings(source_item, destination_item, compressor=None, changed=True):
+    """Brings the compressed siblings of a text asset in destination up to
+    date with compressor, or removes them without one. Assets
+    whose compressed version is itself in the static directory are left
+    alone."""
+    if not destination_item.endswith(COMPRESSIBLE_EXTENSIONS):
+        return
+    if any(os.path.exists(source_item + suffix) for suffix in sibling_suffixes()):
+        return
+    if compressor is not None:
+        compressor.update(destination_item, changed=changed)
+    else:
+        remove_siblings(destination_item)
+
+
+def _is_unchanged(source_item, source_stat, destination_item, checksum):
+    try:
+        destination_stat = os.stat(destination_item)
+    except FileNotFoundError:
+        return False
+    if destination_stat.st_size != source_stat.st_size:
+        return False
+    if checksum:
+        return hash_file(source_item) == hash_file(destination_item)
+    return destination_stat.st_mtime_ns == source_stat.st_mtime_ns
+
+
+def copy_file(source, destination, link=False):
+    """Copies one file, preserving its mtime, using the cheapest mechanism
+    available: a hardlink (if link is set), then copy_file_range, which
+    lets filesystems such as btrfs and XFS share extents, and finally
+    shutil.copy2."""
+    # Never write through an existing destination: it may be a hardlink
+    # to the source from a previous linked sync
+    if os.path.lexists(destination):
+        os.remove(destination)
+
+    if link:
+        try:
+            os.link(source, destination)
+            return
+        except OSError:
+            pass  # e.g. different filesystems, fall back to copying
+
+    if hasattr(os, "copy_file_range"):
+        try:
+            _copy_file_range(source, destination)
+            return
+        except OSError:
+            if os.path.lexists(destination):
+                os.remove(destination)
+
+    shutil.copy2(source, destination)
+
+
+def _copy_file_range(source, destination):
+    with open(source, "rb") as source_fd, open(destination, "wb") as destination_fd:
+        remaining = os.fstat(source_fd.fileno()).st_size
+        while remaining > 0:
+            copied = os.copy_file_range(
+                source_fd.fileno(), destination_fd.fileno(), remaining
+            )
+            if copied == 0:
+                break
+            remaining -= copied
+    shutil.copystat(source, destination)
@@ -0,0 +1,73 @@
+import hashlib
+import re
+
+# Placeholder text in template.html -> keyword argument of Template.render
+PLACEHOLDERS = {"{{ Title }}": "title", "{{ Content }}": "content"}
+PLACEHOLDER_RE = re.compile("|".join(re.escape(p) for p in PLACEHOLDERS))
+
+
+def rewrite_paths(html, base_path):
+    """Prefixes root-relative href/src attributes with base_path."""
+    if base_path == "/":  # Only modify paths if not at root
+        return html
+    html = html.replace('href="/', f'href="{base_path}')
+    return html.replace('src="/', f'src="{base_path}')
+
+
+class Template:
+    """A page template compiled once per build.
+
+    The template is split into literal segments and placeholder slots, and
+    the base_path rewrite is applied to the literals up front, so rendering
+    a page is a single join instead of repeated whole-document replaces.
+    """
+
+    def __init__(self, text, base_path="/", digest=None):
+        self.base_path = base_path
+        self.hash = digest or hashlib.sha256(text.encode()).hexdigest()
+        # Literals are plain strings, slots are (name,) tuples
+        self.segments = []
+        pos = 0
+        for match in PLACEHOLDER_RE.finditer(text):
+            self.segments.append(rewrite_paths(text[pos : match.start()], base_path))
+            self.segments.append((PLACEHOLDERS[match.group()],))
+            pos = match.end()
+        self.segments.append(rewrite_paths(text[pos:], base_path))
+
+    @classmethod
+    def from_file(cls, path, base_path="/"):
+        with open(path, "rb") as fd:
+            data = fd.read()
+        return cls(data.decode(), base_path, hashlib.sha256(data).hexdigest())
+
+    def render(self, title, content):
+        values = {
+            "title": rewrite_paths(title, self.base_path),
+            "content": rewrite_paths(content, self.base_path),
+        }
+        return "".join(
+            segment if isinstance(segment, str) else values[segment[0]]
+            for segment in self.segments
+        )
+
+    def iter_render(self, title, content_chunks):
+        """Like render, but yields the page as chunks and takes the content as
+        an iterable of chunks (e.g. HTMLNode.iter_html()), so a page can be
+        written out without ever holding it as a single string.
+        """
+        base_path = self.base_path
+        if self.segments.count(("content",)) > 1:
+            # The chunks can only be consumed once
+            content_chunks = list(content_chunks)
+        for segment in self.segments:
+            if isinstance(segment, str):
+                yield segment
+            elif segment[0] == "title":
+                yield rewrite_paths(title, base_path)
+            elif base_path == "/":
+                yield from content_chunks
+            else:
+                # Tags are emitted as whole chunks, so an attribute never
+                # straddles two chunks
+                for chunk in content_chunks:
+                    yield rewrite_paths(chunk, base_path)
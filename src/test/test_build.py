@@ -0,0 +1,189 @@
+import contextlib
+import io
+import os
+import tempfile
+import unittest
+
+from build import build_site, discover_pages, batch_tasks, render_pages, RenderSettings
+from main import parse_args, resolve_paths
+from template import Template
+
+TEMPLATE = "<title>{{ Title }}</title><body>{{ Content }}</body>"
+
+
+class TestBuild(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.content_dir = os.path.join(self.tmp.name, "content")
+        self.public_dir = os.path.join(self.tmp.name, "docs")
+        self.template_path = os.path.join(self.tmp.name, "template.html")
+        with open(self.template_path, "w") as fd:
+            fd.write(TEMPLATE)
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def write_page(self, rel_path, text):
+        path = os.path.join(self.content_dir, rel_path)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, "w") as fd:
+            fd.write(text)
+
+    def settings(self, **kwargs):
+        return RenderSettings(
+            self.content_dir,
+            self.public_dir,
+            Template.from_file(self.template_path),
+            "/",
+            **kwargs,
+        )
+
+    def tasks(self):
+        return [
+            (root, file, rel_path, None)
+            for root, file, rel_path in discover_pages(self.content_dir)
+        ]
+
+    def read_output(self, rel_path):
+        with open(os.path.join(self.public_dir, rel_path)) as fd:
+            return fd.read()
+
+    def test_discover_pages_sorted(self):
+        self.write_page("b/index.md", "# B")
+        self.write_page("a/index.md", "# A")
+        self.write_page("index.md", "# Home")
+        self.write_page("notes.txt", "ignored")
+        rel_paths = [task[2] for task in discover_pages(self.content_dir)]
+        self.assertEqual(rel_paths, ["index.md", "a/index.md", "b/index.md"])
+
+    def test_batch_tasks(self):
+        for i in range(5):
+            self.write_page(f"p{i}/index.md", "# Page")
+        batches = batch_tasks(self.tasks(), max_pages=2)
+        self.assertEqual([len(batch) for batch in batches], [2, 2, 1])
+
+        # A file over the byte budget ends up alone in its batch
+        self.write_page("p2/index.md", "# Big\n\n" + "x" * 100)
+        batches = batch_tasks(self.tasks(), max_pages=10, max_bytes=50)
+        self.assertIn(1, [len(batch) for batch in batches])
+
+    def test_parallel_matches_serial(self):
+        for i in range(6):
+            self.write_page(f"post{i}/index.md", f"# Post {i}\n\nBody **{i}**")
+        serial_pages, serial_errors = render_pages(self.tasks(), self.settings())
+        serial_html = self.read_output("post3/index.html")
+
+        parallel_pages, parallel_errors = render_pages(
+            self.tasks(), self.settings(), jobs=2
+        )
+        self.assertEqual(serial_pages, parallel_pages)
+        self.assertEqual(serial_errors, parallel_errors)
+        self.assertEqual(serial_html, self.read_output("post3/index.html"))
+        self.assertIn("<b>3</b>", serial_html)
+
+    def test_errors_are_aggregated(self):
+        self.write_page("good/index.md", "# Good")
+        self.write_page("bad/index.md", "no title here")
+        self.write_page("worse/index.md", "# Title\n\nunmatched **bold")
+
+        pages, errors = render_pages(self.tasks(), self.settings(), jobs=2)
+
+        self.assertEqual(list(pages), ["good/index.md"])
+        self.assertEqual([rel_path for rel_path, error in errors], ["bad/index.md", "worse/index.md"])
+        self.assertIn("no h1 title found", errors[0][1])
+
+    def test_background_writes(self):
+        for i in range(6):
+            self.write_page(f"post{i}/index.md", f"# Post {i}\n\nBody **{i}**")
+        os.makedirs(os.path.join(self.public_dir, "post4", "index.html"))
+
+        pages, errors = render_pages(self.tasks(), self.settings(write_threads=2))
+
+        self.assertNotIn("post4/index.md", pages)
+        self.assertEqual([rel_path for rel_path, error in errors], ["post4/index.md"])
+        self.assertIn("<b>3</b>", self.read_output("post3/index.html"))
+
+    def test_unchanged_outputs_keep_mtime(self):
+        for i in range(3):
+            self.write_page(f"post{i}/index.md", f"# Post {i}")
+        pages, _ = render_pages(self.tasks(), self.settings())
+        os.utime(os.path.join(self.public_dir, "post1/index.html"), (0, 0))
+
+        # Rendering again without the previous entries finds the same HTML
+        self.write_page("post2/index.md", "# Post 2 edited")
+        stats = {}
+        new_pages, _ = render_pages(self.tasks(), self.settings(write_threads=2), stats=stats)
+        self.assertEqual((stats["changed"], stats["unchanged"]), (1, 2))
+        self.assertEqual(os.path.getmtime(os.path.join(self.public_dir, "post1/index.html")), 0)
+        self.assertEqual(new_pages["post1/index.md"], pages["post1/index.md"])
+        self.assertNotEqual(new_pages["post2/index.md"]["digest"], pages["post2/index.md"]["digest"])
+
+    def test_force_still_removes_stale_outputs(self):
+        self.write_page("index.md", "# Home")
+        self.write_page("contact/index.md", "# Contact")
+        os.makedirs(os.path.join(self.tmp.name, "static"))
+        with open(os.path.join(self.tmp.name, "static", "old.css"), "w") as fd:
+            fd.write("body {}")
+        build_site(resolve_paths(parse_args(["-q"]), self.tmp.name))
+
+        os.remove(os.path.join(self.content_dir, "contact", "index.md"))
+        os.remove(os.path.join(self.tmp.name, "static", "old.css"))
+        with self.assertLogs("build", "INFO") as logs:
+            build_site(resolve_paths(parse_args(["--force"]), self.tmp.name))
+
+        self.assertEqual(sorted(os.listdir(self.public_dir)), ["index.html"])
+        # The unchanged page is rendered again all the same
+        self.assertIn("1 rendered", logs.output[-1])
+
+    def test_profile_table_is_logged(self):
+        self.write_page("index.md", "# Home")
+        os.makedirs(os.path.join(self.tmp.name, "static"))
+        profile = os.path.join(self.tmp.name, "profile.json")
+        args = resolve_paths(parse_args(["--profile", profile]), self.tmp.name)
+        stdout = io.StringIO()
+        with contextlib.redirect_stdout(stdout), self.assertLogs("build", "INFO") as logs:
+            build_site(args)
+
+        self.assertEqual(stdout.getvalue(), "")
+        self.assertTrue(any("wall ms" in line for line in logs.output))
+        self.assertTrue(os.path.exists(profile))
+
+    def test_static_dependencies(self):
+        static_dir = os.path.join(self.tmp.name, "static")
+        os.makedirs(os.path.join(static_dir, "img"))
+        with open(os.path.join(static_dir, "img", "a.png"), "w") as fd:
+            fd.write("png")
+        self.write_page(
+            "blog/post.md",
+            "# Post\n\n![a](/img/a.png) ![b](b.png) ![c](https://example.com/c.png)",
+        )
+
+        pages, _ = render_pages(self.tasks(), self.settings(static_dir=static_dir))
+
+        deps = pages["blog/post.md"]["deps"]
+        self.assertEqual(sorted(deps), ["blog/b.png", "img/a.png"])
+        self.assertIsNone(deps["blog/b.png"])
+
+    def test_fragment_cache_shared_between_workers(self):
+        footer = "Licensed under **MIT**"
+        for i in range(4):
+            self.write_page(f"post{i}/index.md", f"# Post {i}\n\n{footer}")
+        cache_dir = os.path.join(self.tmp.name, "cache")
+        settings = self.settings(cache_dir=cache_dir, cache_size=100)
+        stats = {}
+        render_pages(self.tasks(), settings, jobs=2, stats=stats)
+        self.assertEqual(
+            stats["cache_memory_hits"] + stats["cache_disk_hits"] + stats["cache_misses"], 8
+        )
+        self.assertIn("<b>MIT</b>", self.read_output("post2/index.html"))
+
+        # A fresh build finds every block on disk
+        for i in range(4):
+            os.remove(os.path.join(self.public_dir, f"post{i}/index.html"))
+        stats = {}
+        render_pages(self.tasks(), settings, jobs=2, stats=stats)
+        self.assertEqual(stats["cache_misses"], 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
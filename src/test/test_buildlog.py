@@ -0,0 +1,67 @@
+import io
+import json
+import logging
+import unittest
+
+from buildlog import Progress, flush_logging, setup_logging
+
+
+class TestBuildLog(unittest.TestCase):
+    def tearDown(self):
+        setup_logging(-1)
+
+    def test_json_lines(self):
+        stream = io.StringIO()
+        setup_logging(0, "json", stream)
+        logging.getLogger("build").info("built %d", 3, extra={"pages": 3})
+        flush_logging()
+        entry = json.loads(stream.getvalue())
+        self.assertEqual(entry["message"], "built 3")
+        self.assertEqual(entry["level"], "info")
+        self.assertEqual(entry["pages"], 3)
+
+    def test_levels(self):
+        stream = io.StringIO()
+        setup_logging(0, "text", stream)
+        logging.getLogger("page").debug("per file")
+        logging.getLogger("build").info("summary")
+        flush_logging()
+        self.assertEqual(stream.getvalue(), "summary\n")
+
+        setup_logging(1, "text", stream)
+        logging.getLogger("page").debug("per file")
+        flush_logging()
+        self.assertTrue(stream.getvalue().endswith("per file\n"))
+
+        setup_logging(-1, "text", stream)
+        self.assertFalse(logging.getLogger("build").isEnabledFor(logging.INFO))
+
+    def test_records_are_buffered(self):
+        stream = io.StringIO()
+        setup_logging(0, "text", stream)
+        logging.getLogger("page").info("one")
+        logging.getLogger("page").info("two")
+        self.assertEqual(stream.getvalue(), "")
+        # Warnings write out what is held, in order
+        logging.getLogger("page").warning("three")
+        self.assertEqual(stream.getvalue(), "one\ntwo\nthree\n")
+        # So does replacing the handler
+        logging.getLogger("page").info("four")
+        setup_logging(0, "text", io.StringIO())
+        self.assertEqual(stream.getvalue(), "one\ntwo\nthree\nfour\n")
+
+    def test_progress_logs_every_tenth(self):
+        stream = io.StringIO()
+        setup_logging(0, "text", stream)
+        progress = Progress(100, "Pages", stream)
+        for _ in range(100):
+            progress.advance()
+        flush_logging()
+        lines = stream.getvalue().splitlines()
+        self.assertEqual(lines[0], "Pages: 1/100")
+        self.assertEqual(lines[-1], "Pages: 100/100")
+        self.assertLessEqual(len(lines), 11)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,62 @@
+import os
+import tempfile
+import unittest
+
+from cache import FragmentCache
+from markdown import markdown_to_html_node
+
+MARKDOWN = """# Title
+
+Shared **footer** text
+
+- one
+- two
+
+Shared **footer** text"""
+
+
+class TestFragmentCache(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.dir = self.tmp.name
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_memory_tier(self):
+        cache = FragmentCache()
+        self.assertIsNone(cache.get("block"))
+        cache.put("block", "<p>block</p>")
+        self.assertEqual(cache.get("block"), "<p>block</p>")
+        self.assertEqual(cache.counts(), (1, 0, 1))
+
+    def test_lru_eviction(self):
+        cache = FragmentCache(max_entries=2)
+        cache.put("a", "A")
+        cache.put("b", "B")
+        cache.get("a")
+        cache.put("c", "C")
+        self.assertEqual(cache.get("a"), "A")
+        self.assertIsNone(cache.get("b"))
+
+    def test_disk_tier_is_shared(self):
+        FragmentCache(self.dir).put("block", "<p>block</p>")
+        cache = FragmentCache(self.dir)
+        self.assertEqual(cache.get("block"), "<p>block</p>")
+        self.assertEqual(cache.get("block"), "<p>block</p>")
+        self.assertEqual(cache.counts(), (1, 1, 0))
+        leftovers = [f for _, _, files in os.walk(self.dir) for f in files if f.endswith(".tmp")]
+        self.assertEqual(leftovers, [])
+
+    def test_cached_render_matches_uncached(self):
+        cache = FragmentCache(self.dir)
+        expected = markdown_to_html_node(MARKDOWN).to_html()
+        self.assertEqual(markdown_to_html_node(MARKDOWN, cache=cache).to_html(), expected)
+        # The repeated paragraph is a hit the first time through
+        self.assertEqual(cache.counts(), (1, 0, 3))
+        self.assertEqual(markdown_to_html_node(MARKDOWN, cache=cache).to_html(), expected)
+        self.assertEqual(cache.counts(), (5, 0, 3))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,182 @@
+import gzip
+import os
+import tempfile
+import unittest
+
+from build import build_site
+from compress import Compressor, make_codecs, remove_siblings
+from main import parse_args, resolve_paths
+from manifest import load_manifest
+from staticfiles import copytree
+from writer import OutputWriter
+
+PAGE = "<p>" + "compressible " * 200 + "</p>"
+
+
+class CompressTestCase(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.dir = self.tmp.name
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def path(self, rel_path):
+        return os.path.join(self.dir, rel_path)
+
+    def write(self, rel_path, text):
+        os.makedirs(os.path.dirname(self.path(rel_path)), exist_ok=True)
+        with open(self.path(rel_path), "w") as fd:
+            fd.write(text)
+
+    def gunzip(self, rel_path):
+        with gzip.open(self.path(rel_path), "rt") as fd:
+            return fd.read()
+
+
+class TestCompressor(CompressTestCase):
+    def test_unknown_codec(self):
+        with self.assertRaises(ValueError):
+            make_codecs(["gzip", "lzma"])
+
+    def test_writes_and_refreshes_siblings(self):
+        self.write("page.html", PAGE)
+        compressor = Compressor(["gzip"])
+        compressor.update(self.path("page.html"))
+        self.assertEqual(self.gunzip("page.html.gz"), PAGE)
+
+        self.write("page.html", PAGE + "edited")
+        compressor.update(self.path("page.html"))
+        self.assertEqual(self.gunzip("page.html.gz"), PAGE + "edited")
+
+    def test_output_is_deterministic(self):
+        self.write("page.html", PAGE)
+        compressor = Compressor(["gzip"])
+        compressor.update(self.path("page.html"))
+        with open(self.path("page.html.gz"), "rb") as fd:
+            first = fd.read()
+        compressor.update(self.path("page.html"))
+        with open(self.path("page.html.gz"), "rb") as fd:
+            self.assertEqual(fd.read(), first)
+
+    def test_small_files_lose_their_siblings(self):
+        self.write("page.html", PAGE)
+        compressor = Compressor(["gzip"], min_size=100)
+        compressor.update(self.path("page.html"))
+        self.write("page.html", "<p>tiny</p>")
+        compressor.update(self.path("page.html"))
+        self.assertFalse(os.path.exists(self.path("page.html.gz")))
+
+    def test_unchanged_files_only_get_missing_siblings(self):
+        self.write("page.html", PAGE)
+        self.write("page.html.gz", "stale")
+        self.write("other.html", PAGE)
+        compressor = Compressor(["gzip"])
+        compressor.update(self.path("page.html"), changed=False)
+        compressor.update(self.path("other.html"), changed=False)
+        with open(self.path("page.html.gz")) as fd:
+            self.assertEqual(fd.read(), "stale")
+        self.assertEqual(self.gunzip("other.html.gz"), PAGE)
+
+    def test_siblings_of_other_codecs_are_removed(self):
+        self.write("page.html", PAGE)
+        self.write("page.html.zst", "stale")
+        Compressor(["gzip"]).update(self.path("page.html"))
+        self.assertFalse(os.path.exists(self.path("page.html.zst")))
+
+    def test_errors_are_collected_with_threads(self):
+        with Compressor(["gzip"], threads=2) as compressor:
+            self.write("page.html", PAGE)
+            compressor.update(self.path("page.html"))
+            compressor.update(self.path("missing.html"))
+            errors = compressor.flush()
+        self.assertEqual(list(errors), [self.path("missing.html")])
+        self.assertEqual(self.gunzip("page.html.gz"), PAGE)
+
+    def test_remove_siblings(self):
+        self.write("page.html.gz", "stale")
+        remove_siblings(self.path("page.html"))
+        remove_siblings(self.path("page.html"))
+        self.assertFalse(os.path.exists(self.path("page.html.gz")))
+
+
+class TestWriterSiblings(CompressTestCase):
+    def test_pages_get_siblings(self):
+        path = self.path("post/index.html")
+        with OutputWriter(compressor=Compressor(["gzip"])) as writer:
+            writer.write(path, PAGE)
+            self.assertEqual(writer.flush(), {})
+        self.assertEqual(self.gunzip("post/index.html.gz"), PAGE)
+
+    def test_siblings_removed_without_compressor(self):
+        path = self.path("index.html")
+        with OutputWriter(threads=0, compressor=Compressor(["gzip"])) as writer:
+            writer.write(path, PAGE)
+            # An unchanged page keeps its sibling
+            os.remove(path + ".gz")
+            writer.write(path, PAGE)
+        self.assertTrue(os.path.exists(path + ".gz"))
+        with OutputWriter(threads=0) as writer:
+            writer.write(path, PAGE)
+        self.assertFalse(os.path.exists(path + ".gz"))
+
+
+class TestStaticSiblings(CompressTestCase):
+    def test_copied_assets_get_siblings(self):
+        self.write("static/style.css", PAGE)
+        self.write("static/image.png", PAGE)
+        self.write("static/app.js", PAGE)
+        self.write("static/app.js.gz", "shipped")
+        source, destination = self.path("static"), self.path("public")
+
+        with Compressor(["gzip"]) as compressor:
+            files = copytree(source, destination, compressor=compressor)
+        self.assertEqual(self.gunzip("public/style.css.gz"), PAGE)
+        self.assertFalse(os.path.exists(self.path("public/image.png.gz")))
+        with open(self.path("public/app.js.gz")) as fd:
+            self.assertEqual(fd.read(), "shipped")
+
+        os.remove(self.path("static/style.css"))
+        copytree(source, destination, files)
+        self.assertEqual(
+            sorted(os.listdir(destination)), ["app.js", "app.js.gz", "image.png"]
+        )
+
+    def test_shipped_siblings_outlive_their_asset(self):
+        self.write("static/a.css", PAGE)
+        self.write("static/a.css.gz", "shipped")
+        self.write("static/a.css.zst", "shipped")
+        source, destination = self.path("static"), self.path("public")
+        files = copytree(source, destination)
+        os.remove(self.path("static/a.css"))
+        files = copytree(source, destination, files)
+        self.assertEqual(sorted(os.listdir(destination)), ["a.css.gz", "a.css.zst"])
+        self.assertEqual(sorted(files), ["a.css.gz", "a.css.zst"])
+
+    def test_siblings_only_removed_after_compressed_builds(self):
+        self.write("static/style.css", PAGE)
+        source, destination = self.path("static"), self.path("public")
+        with Compressor(["gzip"]) as compressor:
+            files = copytree(source, destination, compressor=compressor)
+        # Without stale siblings to clean up, assets aren't even checked
+        copytree(source, destination, files, stale_siblings=False)
+        self.assertTrue(os.path.exists(self.path("public/style.css.gz")))
+        copytree(source, destination, files)
+        self.assertFalse(os.path.exists(self.path("public/style.css.gz")))
+
+    def test_build_records_static_siblings(self):
+        self.write("template.html", "<title>{{ Title }}</title>{{ Content }}")
+        self.write("content/index.md", "# Home")
+        self.write("static/style.css", PAGE)
+        args = resolve_paths(parse_args(["-q", "--compress"]), self.dir)
+        build_site(args)
+        self.assertTrue(load_manifest(args.manifest_path)["static_siblings"])
+
+        args = resolve_paths(parse_args(["-q"]), self.dir)
+        build_site(args)
+        self.assertFalse(os.path.exists(self.path("docs/style.css.gz")))
+        self.assertFalse(load_manifest(args.manifest_path)["static_siblings"])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,32 @@
+import os
+import random
+import tempfile
+import unittest
+
+from bench.corpus import generate_corpus, generate_page
+from markdown import markdown_to_html_node
+from page import extract_title
+
+
+class TestCorpus(unittest.TestCase):
+    def test_pages_are_valid_markdown(self):
+        rng = random.Random(1)
+        for _ in range(20):
+            md = generate_page(rng, nesting=1.0, code_ratio=0.3)
+            extract_title(md)
+            self.assertTrue(markdown_to_html_node(md).to_html().startswith("<div>"))
+
+    def test_corpus_is_deterministic(self):
+        with tempfile.TemporaryDirectory() as first, tempfile.TemporaryDirectory() as second:
+            first_paths = generate_corpus(first, pages=5, depth=2, seed=3)
+            second_paths = generate_corpus(second, pages=5, depth=2, seed=3)
+            for first_path, second_path in zip(first_paths, second_paths):
+                self.assertEqual(
+                    os.path.relpath(first_path, first), os.path.relpath(second_path, second)
+                )
+                with open(first_path) as a, open(second_path) as b:
+                    self.assertEqual(a.read(), b.read())
+
+
+if __name__ == "__main__":
+    unittest.main()
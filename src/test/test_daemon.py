@@ -0,0 +1,142 @@
+import io
+import logging
+import os
+import tempfile
+import threading
+import unittest
+
+from build import BuildState, build_site, discover_pages
+from buildclient import request, socket_path
+from daemon import BuildDaemon
+from main import parse_args, resolve_paths
+from manifest import load_manifest
+
+
+class SiteTestCase(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.dir = self.tmp.name
+        self.write("template.html", "<title>{{ Title }}</title>{{ Content }}")
+        self.write("content/index.md", "# Home")
+        self.write("content/blog/index.md", "# Blog")
+        self.write("static/index.css", "body {}")
+        self.args = resolve_paths(parse_args(["-q"]), self.dir)
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def path(self, rel_path):
+        return os.path.join(self.dir, rel_path)
+
+    def write(self, rel_path, text):
+        os.makedirs(os.path.dirname(self.path(rel_path)), exist_ok=True)
+        with open(self.path(rel_path), "w") as fd:
+            fd.write(text)
+
+    def read(self, rel_path):
+        with open(self.path(rel_path)) as fd:
+            return fd.read()
+
+
+class TestBuildState(SiteTestCase):
+    def test_discovery_sees_new_and_removed_pages(self):
+        state = BuildState()
+        content_dir = self.path("content")
+        self.assertEqual(
+            [task[2] for task in state.discover_pages(content_dir)],
+            ["index.md", "blog/index.md"],
+        )
+        self.write("content/blog/post.md", "# Post")
+        os.remove(self.path("content/index.md"))
+        self.assertEqual(
+            state.discover_pages(content_dir), discover_pages(content_dir)
+        )
+        self.assertEqual(
+            [task[2] for task in discover_pages(content_dir)],
+            ["blog/index.md", "blog/post.md"],
+        )
+
+    def test_template_reloaded_when_changed(self):
+        state = BuildState()
+        template = state.template(self.path("template.html"), "/")
+        self.assertIs(state.template(self.path("template.html"), "/"), template)
+        self.write("template.html", "<h1>{{ Title }}</h1>{{ Content }}")
+        os.utime(self.path("template.html"), ns=(0, 0))
+        self.assertIsNot(state.template(self.path("template.html"), "/"), template)
+
+    def test_builds_reuse_state(self):
+        state = BuildState()
+        self.assertEqual(build_site(self.args, state=state), [])
+        self.write("content/index.md", "# Home again")
+        self.assertEqual(build_site(self.args, state=state), [])
+        self.assertIn("Home again", self.read("docs/index.html"))
+        self.assertEqual(state.manifest, load_manifest(self.args.manifest_path))
+
+    def test_manifest_written_elsewhere_is_reloaded(self):
+        state = BuildState()
+        build_site(self.args, state=state)
+        # A build outside the daemon removes a page
+        os.remove(self.path("content/blog/index.md"))
+        build_site(self.args)
+        self.write("content/blog/index.md", "# Blog")
+        build_site(self.args, state=state)
+        self.assertIn("blog/index.md", state.manifest["pages"])
+        self.assertTrue(os.path.exists(self.path("docs/blog/index.html")))
+
+
+class TestDaemon(SiteTestCase):
+    def setUp(self):
+        super().setUp()
+        self.socket = socket_path(self.dir)
+        self.daemon = BuildDaemon(
+            self.socket, lambda argv: resolve_paths(parse_args(argv), self.dir), -1
+        )
+        self.thread = threading.Thread(target=self.daemon.serve)
+        self.thread.start()
+
+    def tearDown(self):
+        if self.thread.is_alive():
+            self.request({"stop": True})
+            self.thread.join()
+        self.daemon.server_close()
+        logging.getLogger().handlers.clear()
+        super().tearDown()
+
+    def request(self, message):
+        stdout = io.StringIO()
+        stderr = io.StringIO()
+        status = request(self.socket, message, stdout, stderr)
+        return status, stdout.getvalue(), stderr.getvalue()
+
+    def test_build_request(self):
+        status, _, stderr = self.request({"argv": []})
+        self.assertEqual(status, 0)
+        self.assertIn("Built 2 page(s)", stderr)
+        self.assertIn("<title>Home</title>", self.read("docs/index.html"))
+
+        self.write("content/index.md", "no title")
+        status, _, stderr = self.request({"argv": ["--explain"]})
+        self.assertEqual(status, 1)
+        self.assertIn("Failed to build index.md", stderr)
+
+    def test_invalid_arguments(self):
+        status, _, stderr = self.request({"argv": ["--no-such-flag"]})
+        self.assertEqual(status, 2)
+        self.assertIn("unrecognized arguments", stderr)
+
+    def test_stop(self):
+        self.assertEqual(self.request({"stop": True})[0], 0)
+        self.thread.join()
+        self.daemon.server_close()
+        self.assertFalse(os.path.exists(self.socket))
+        with self.assertRaises(OSError):
+            request(self.socket, {"argv": []})
+
+    def test_second_daemon_refused(self):
+        with self.assertRaises(OSError):
+            BuildDaemon(self.socket, parse_args)
+        self.assertTrue(os.path.exists(self.socket))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,138 @@
+import gzip
+import os
+import shutil
+import tempfile
+import unittest
+
+from build import build_site
+from compress import Compressor
+from devserver import PollingWatcher, inotify_simple, InotifyWatcher, rebuild
+from main import parse_args, resolve_paths
+from manifest import file_fingerprint, load_manifest
+from template import Template
+
+
+class TestWatch(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.dir = self.tmp.name
+        self.write("template.html", "<title>{{ Title }}</title>{{ Content }}")
+        self.write("content/index.md", "# Home")
+        self.write("content/blog/index.md", "# Blog")
+        self.write("static/index.css", "body {}")
+        self.args = resolve_paths(parse_args([]), self.dir)
+        build_site(self.args)
+        self.manifest = load_manifest(self.args.manifest_path)
+        self.template = Template.from_file(self.args.template_path)
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def path(self, rel_path):
+        return os.path.join(self.dir, rel_path)
+
+    def write(self, rel_path, text):
+        os.makedirs(os.path.dirname(self.path(rel_path)), exist_ok=True)
+        with open(self.path(rel_path), "w") as fd:
+            fd.write(text)
+
+    def read(self, rel_path):
+        with open(self.path(rel_path)) as fd:
+            return fd.read()
+
+    def rebuild(self, *rel_paths, compressor=None):
+        self.template, errors = rebuild(
+            self.args,
+            self.manifest,
+            self.template,
+            {self.path(rel_path) for rel_path in rel_paths},
+            compressor,
+        )
+        return errors
+
+    def test_polling_watcher(self):
+        watcher = PollingWatcher([self.path("content"), self.path("template.html")], 0)
+        self.write("content/new.md", "# New")
+        self.assertEqual(watcher.wait(), {self.path("content/new.md")})
+
+    def test_rebuilds_only_changed_page(self):
+        os.utime(self.path("docs/blog/index.html"), ns=(0, 0))
+        self.write("content/index.md", "# Home again")
+
+        self.assertEqual(self.rebuild("content/index.md"), [])
+
+        self.assertIn("Home again", self.read("docs/index.html"))
+        self.assertEqual(os.stat(self.path("docs/blog/index.html")).st_mtime_ns, 0)
+
+    def test_template_change_rebuilds_all(self):
+        self.write("template.html", "<h6>{{ Title }}</h6>{{ Content }}")
+        self.rebuild("template.html")
+        self.assertIn("<h6>Blog</h6>", self.read("docs/blog/index.html"))
+        self.assertIn("<h6>Home</h6>", self.read("docs/index.html"))
+
+    def test_missing_template_is_kept(self):
+        template = self.template
+        os.rename(self.path("template.html"), self.path("template.html~"))
+        self.write("content/index.md", "# Home again")
+
+        self.assertEqual(self.rebuild("template.html", "content/index.md"), [])
+
+        self.assertIs(self.template, template)
+        self.assertIn("<title>Home again</title>", self.read("docs/index.html"))
+        os.rename(self.path("template.html~"), self.path("template.html"))
+        self.write("template.html", "<h6>{{ Title }}</h6>{{ Content }}")
+        self.rebuild("template.html")
+        self.assertIn("<h6>Home again</h6>", self.read("docs/index.html"))
+
+    def test_static_change_rebuilds_dependent_pages(self):
+        self.write("static/img/a.png", "png")
+        self.write("content/index.md", "# Home\n\n![a](/img/a.png)")
+        self.rebuild("static/img/a.png", "content/index.md")
+
+        self.write("static/img/a.png", "new png")
+        self.rebuild("static/img/a.png")
+
+        deps = self.manifest["pages"]["index.md"]["deps"]
+        self.assertEqual(deps, {"img/a.png": file_fingerprint(self.path("static/img/a.png"))})
+        self.assertNotIn("deps", self.manifest["pages"]["blog/index.md"])
+
+    def test_removed_page_and_static(self):
+        os.remove(self.path("content/blog/index.md"))
+        os.remove(self.path("static/index.css"))
+        self.rebuild("content/blog/index.md", "static/index.css")
+        self.assertFalse(os.path.exists(self.path("docs/blog")))
+        self.assertFalse(os.path.exists(self.path("docs/index.css")))
+        self.assertNotIn("blog/index.md", self.manifest["pages"])
+
+    def test_removed_directories(self):
+        self.write("static/img/a.png", "png")
+        self.rebuild("static/img/a.png")
+        # A directory moved away is reported on its own, without its files
+        shutil.move(self.path("content/blog"), self.path("blog"))
+        shutil.rmtree(self.path("static/img"))
+        self.assertEqual(self.rebuild("content/blog", "static/img"), [])
+        self.assertFalse(os.path.exists(self.path("docs/blog")))
+        self.assertFalse(os.path.exists(self.path("docs/img")))
+        self.assertEqual(list(self.manifest["pages"]), ["index.md"])
+        self.assertNotIn("img/a.png", self.manifest["static"])
+
+    @unittest.skipIf(inotify_simple is None, "needs inotify_simple")
+    def test_inotify_reports_moved_directory(self):
+        watcher = InotifyWatcher([self.path("content")])
+        try:
+            shutil.move(self.path("content/blog"), self.path("blog"))
+            self.assertEqual(watcher.wait(), {self.path("content/blog")})
+        finally:
+            watcher.close()
+
+    def test_static_change_refreshes_siblings(self):
+        self.args = resolve_paths(parse_args(["--compress", "--compress-min-size", "0"]), self.dir)
+        build_site(self.args)
+        self.write("static/index.css", "body { color: red }")
+        self.rebuild("static/index.css", compressor=Compressor(["gzip"], min_size=0))
+        with gzip.open(self.path("docs/index.css.gz"), "rt") as fd:
+            self.assertEqual(fd.read(), "body { color: red }")
+
+
+if __name__ == "__main__":
+    unittest.main()
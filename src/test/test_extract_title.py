@@ -1,6 +1,7 @@
 import unittest
 
 from main import extract_title
+from page import find_title
 
 
 class TestExtractTitle(unittest.TestCase):
@@ -16,3 +17,21 @@ class TestExtractTitle(unittest.TestCase):
     def test_whitespace_around_h1(self):
         markdown = "   #   Spaced Title   "
         self.assertEqual(extract_title(markdown), "Spaced Title")
+
+
+class TestFindTitle(unittest.TestCase):
+    def test_matches_extract_title(self):
+        for markdown in ["# Valid Title", "   #   Spaced Title   ", "\n\nintro\n# Later\nbody"]:
+            lines = markdown.splitlines(keepends=True)
+            self.assertEqual(find_title(lines), extract_title(markdown))
+
+    def test_stops_at_title(self):
+        def lines():
+            yield "# Title\n"
+            raise AssertionError("read past the title")
+
+        self.assertEqual(find_title(lines()), "Title")
+
+    def test_no_h1_raises_exception(self):
+        with self.assertRaises(Exception):
+            find_title(["no title\n", "## sub\n"])
@@ -0,0 +1,158 @@
+import json
+import os
+import tempfile
+import unittest
+
+from build import build_site
+from feeds import PageSummary, SiteFeeds, page_url, plain_text, terms_path
+from main import parse_args, resolve_paths
+from manifest import load_manifest
+
+
+def page(rel_path, output, title, terms, excerpt=""):
+    return rel_path, {"output": output, "title": title, "excerpt": excerpt}, terms
+
+
+class TestPageSummary(unittest.TestCase):
+    def test_plain_text(self):
+        block = "- **Bold** [link](/x) and ![alt](/a.png)\n- `code` _it_"
+        self.assertEqual(plain_text(block), "Bold link and alt code it")
+
+    def test_summary(self):
+        summary = PageSummary()
+        for block in [
+            "# Title",
+            "[< Back Home](/)",
+            "```\nignored code\n```",
+            "A first paragraph that is long enough to be the excerpt of the page.",
+            "Another paragraph about the page",
+        ]:
+            summary.add_block(block)
+        self.assertEqual(
+            summary.entry_fields(),
+            {"excerpt": "A first paragraph that is long enough to be the excerpt of the page."},
+        )
+        terms = summary.terms()
+        self.assertEqual(terms[:2], ["paragraph", "page"])
+        self.assertNotIn("ignored", terms)
+        self.assertNotIn("the", terms)
+
+
+class TestSiteFeeds(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.dir = self.tmp.name
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def read(self, rel_path):
+        with open(os.path.join(self.dir, rel_path), encoding="utf-8") as fd:
+            return fd.read()
+
+    def build(self, pages):
+        feeds = SiteFeeds(self.dir, "https://example.com", "/site/")
+        for rel_path, page_entry, terms in pages:
+            feeds.add(rel_path, page_entry, terms)
+        return feeds.close()
+
+    def test_page_url(self):
+        self.assertEqual(page_url("https://e.com/", "/", "index.html"), "https://e.com/")
+        self.assertEqual(page_url("https://e.com", "/s/", "a/index.html"), "https://e.com/s/a/")
+        self.assertEqual(page_url("https://e.com", "/", "a/b.html"), "https://e.com/a/b.html")
+
+    def test_artifacts(self):
+        terms = self.build(
+            [
+                page("index.md", "index.html", "Home & Garden", ["tolkien"]),
+                page("blog/a.md", "blog/a.html", "Post A", ["tolkien", "elves"], "About elves"),
+                page("contact/index.md", "contact/index.html", "Contact", ["tolkien"]),
+            ]
+        )
+
+        sitemap = self.read("sitemap.xml")
+        self.assertIn("<loc>https://example.com/site/contact/</loc>", sitemap)
+        feed = self.read("feed.xml")
+        self.assertIn("<title>Home &amp; Garden</title>", feed)
+        self.assertEqual(feed.count("<item>"), 1)
+        self.assertIn("<description>About elves</description>", feed)
+
+        docs = json.loads(self.read("search/docs.json"))
+        self.assertEqual(docs[1], ["https://example.com/site/blog/a.html", "Post A", "About elves"])
+        shard = json.loads(self.read("search/t.json"))
+        # Document numbers are delta-encoded
+        self.assertEqual(shard["tolkien"], [0, 1, 1])
+        self.assertEqual(json.loads(self.read("search/e.json")), {"elves": [1]})
+        self.assertEqual(terms, len({"tolkien", "elves", "home", "garden", "post", "contact"}))
+
+    def test_rebuild_replaces_only_changed_artifacts(self):
+        pages = [page("index.md", "index.html", "Home", ["elves"])]
+        self.build(pages)
+        os.utime(os.path.join(self.dir, "sitemap.xml"), (0, 0))
+
+        self.build([page("index.md", "index.html", "Home", ["dwarves"])])
+
+        self.assertEqual(os.path.getmtime(os.path.join(self.dir, "sitemap.xml")), 0)
+        self.assertEqual(
+            sorted(os.listdir(os.path.join(self.dir, "search"))),
+            ["d.json", "docs.json", "h.json"],
+        )
+
+    def test_other_files_in_search_dir_are_kept(self):
+        # A search page rendered from content/search/ and its static script
+        os.makedirs(os.path.join(self.dir, "search"))
+        for name in ("index.html", "search.js"):
+            with open(os.path.join(self.dir, "search", name), "w") as fd:
+                fd.write(name)
+        self.build([page("index.md", "index.html", "Café", ["elves"])])
+        self.build([page("index.md", "index.html", "Café", ["dwarves"])])
+        self.assertEqual(
+            sorted(os.listdir(os.path.join(self.dir, "search"))),
+            ["c.json", "d.json", "docs.json", "index.html", "search.js"],
+        )
+        self.assertEqual(json.loads(self.read("search/c.json")), {"café": [0]})
+
+
+class TestSiteFeedsBuild(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.dir = self.tmp.name
+        self.write("template.html", "<title>{{ Title }}</title>{{ Content }}")
+        self.write("content/index.md", "# Home")
+        self.write("content/blog/a.md", "# Post\n\nAll about elves")
+        os.makedirs(os.path.join(self.dir, "static"))
+        self.args = resolve_paths(parse_args(["--site-url", "https://example.com"]), self.dir)
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def write(self, rel_path, text):
+        path = os.path.join(self.dir, rel_path)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, "w") as fd:
+            fd.write(text)
+
+    def shard(self, name):
+        with open(os.path.join(self.dir, "docs", "search", name), encoding="utf-8") as fd:
+            return json.load(fd)
+
+    def test_terms_are_kept_out_of_the_manifest(self):
+        build_site(self.args)
+        entry = load_manifest(self.args.manifest_path)["pages"][os.path.join("blog", "a.md")]
+        self.assertNotIn("terms", entry)
+        self.assertEqual(entry["excerpt"], "All about elves")
+        self.assertTrue(os.path.exists(terms_path(self.args.terms_dir, os.path.join("blog", "a.md"))))
+
+        # The unchanged post's terms are read back for the new index
+        self.write("content/contact.md", "# Contact\n\nElves welcome")
+        build_site(self.args)
+        self.assertEqual(len(self.shard("e.json")["elves"]), 2)
+
+        os.remove(os.path.join(self.dir, "content", "blog", "a.md"))
+        build_site(self.args)
+        self.assertFalse(os.path.exists(terms_path(self.args.terms_dir, os.path.join("blog", "a.md"))))
+        self.assertEqual(len(self.shard("e.json")["elves"]), 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -1,3 +1,4 @@
+import io
 import unittest
 
 from htmlnode import HTMLNode, LeafNode, ParentNode
@@ -65,6 +66,30 @@ class TestParentNode(unittest.TestCase):
         self.assertEqual(mixed_parent.to_html(), expected_html)
 
 
+    def test_deeply_nested(self):
+        node = LeafNode("b", "deep")
+        for _ in range(5000):
+            node = ParentNode("span", [node])
+        html = node.to_html()
+        self.assertTrue(html.startswith("<span>" * 5000 + "<b>deep</b>"))
+        self.assertTrue(html.endswith("</span>" * 5000))
+
+    def test_write_html_matches_to_html(self):
+        node = ParentNode(
+            "div",
+            [LeafNode("p", "x" * 50), LeafNode(None, "tail"), ParentNode("ul", [])],
+            {"class": "c"},
+        )
+        fp = io.StringIO()
+        node.write_html(fp, buffer_size=16)
+        self.assertEqual(fp.getvalue(), node.to_html())
+
+    def test_iter_html_raises_on_invalid_child(self):
+        node = ParentNode("div", [ParentNode(None, [])])
+        with self.assertRaises(ValueError):
+            list(node.iter_html())
+
+
 class TestLeafNode(unittest.TestCase):
     def test_leaf_to_html_p(self):
         node = LeafNode("p", "Hello, world!")
@@ -120,6 +145,18 @@ class TestHTMLNode(unittest.TestCase):
         node = HTMLNode(props=None)  # or simply HTMLNode()
         assert node.props_to_html() == ""
 
+    def test_nodes_are_slotted(self):
+        for node in [HTMLNode("p"), LeafNode("b", "x"), ParentNode("div", [])]:
+            with self.subTest(node=node):
+                self.assertFalse(hasattr(node, "__dict__"))
+
+    def test_empty_children_and_props_are_shared(self):
+        first = LeafNode("b", "one")
+        second = LeafNode("i", "two", {})
+        self.assertIs(first.children, second.children)
+        self.assertIs(first.props, second.props)
+        self.assertIs(first.attributes, first.props)
+
     def test_empty_props(self):
         node = HTMLNode(props={})
         assert node.props_to_html() == ""
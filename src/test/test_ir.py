@@ -0,0 +1,99 @@
+import unittest
+
+from htmlnode import HTMLNode, LeafNode
+from ir import Document, NO_NODE
+from markdown import markdown_to_document, markdown_to_html_node
+
+MARKDOWN = """# Title
+
+A paragraph with **bold**, _italic_ and `code`, a [link](/a) and ![img](/b.png).
+
+- one
+- two
+
+```
+code block
+```
+"""
+
+
+class TestDocument(unittest.TestCase):
+    def build(self):
+        doc = Document()
+        div = doc.element("div")
+        p = doc.element("p", div)
+        source = "xx hello world yy"
+        doc.leaf(None, source, p, 3, 9)
+        doc.leaf("b", source, p, 9, 14)
+        doc.leaf("a", "link", div, attributes=(("href", "/x"),))
+        return doc, div, p
+
+    def test_serializes_spans(self):
+        doc, _, _ = self.build()
+        self.assertEqual(
+            doc.to_html(), '<div><p>hello <b>world</b></p><a href="/x">link</a></div>'
+        )
+
+    def test_links(self):
+        doc, div, p = self.build()
+        self.assertEqual(list(doc.children(div)), [p, 4])
+        self.assertEqual(list(doc.children(p)), [2, 3])
+        self.assertEqual(doc.parents[p], div)
+        self.assertEqual(doc.parents[div], NO_NODE)
+        self.assertEqual(doc.text(3), "world")
+
+    def test_subtree(self):
+        doc, _, p = self.build()
+        self.assertEqual(doc.subtree_end(p), 4)
+        self.assertEqual(doc.to_html(p), "<p>hello <b>world</b></p>")
+        self.assertEqual("".join(doc.iter_html(p)), "<p>hello <b>world</b></p>")
+
+    def test_top_level_nodes(self):
+        doc = Document()
+        doc.element("p")
+        doc.leaf(None, "text", 0)
+        doc.element("p")
+        self.assertEqual(doc.to_html(), "<p>text</p><p></p>")
+
+    def test_clear(self):
+        doc, _, _ = self.build()
+        doc.clear()
+        self.assertEqual(len(doc), 0)
+        doc.leaf("i", "again")
+        self.assertEqual(doc.to_html(), "<i>again</i>")
+
+    def test_node_view(self):
+        doc, _, _ = self.build()
+        node = doc.node()
+        self.assertIsInstance(node, HTMLNode)
+        self.assertEqual(node.tag, "div")
+        paragraph, link = node.children
+        self.assertIsInstance(link, LeafNode)
+        self.assertEqual(link.props, {"href": "/x"})
+        self.assertEqual([child.value for child in paragraph.children], ["hello ", "world"])
+        self.assertEqual(node.to_html(), doc.to_html())
+
+
+class TestMarkdownToDocument(unittest.TestCase):
+    def test_matches_tree(self):
+        doc = markdown_to_document(MARKDOWN)
+        self.assertEqual(doc.to_html(), markdown_to_html_node(MARKDOWN).to_html())
+        self.assertEqual(
+            doc.to_html(),
+            "<div><h1>Title</h1><p>A paragraph with <b>bold</b>, <i>italic</i> and "
+            '<code>code</code>, a <a href="/a">link</a> and '
+            '<img src="/b.png" alt="img"></img>.</p>'
+            "<ul><li>one</li><li>two</li></ul>"
+            "<pre><code>code block\n</code></pre></div>",
+        )
+
+    def test_inline_leaves_are_spans(self):
+        doc = markdown_to_document("Some **bold** text")
+        paragraph_text = doc.sources[2]
+        self.assertEqual(paragraph_text, "Some **bold** text")
+        self.assertIs(doc.sources[3], paragraph_text)
+        self.assertEqual([doc.text(i) for i in range(2, 5)], ["Some ", "bold", " text"])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,130 @@
+import os
+import tempfile
+import unittest
+
+from manifest import (
+    hash_file,
+    load_manifest,
+    save_manifest,
+    empty_manifest,
+    page_entry,
+    is_up_to_date,
+    stale_reasons,
+    dependents,
+    file_fingerprint,
+    remove_stale_outputs,
+)
+
+
+class TestManifest(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.dir = self.tmp.name
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def write(self, rel_path, text):
+        path = os.path.join(self.dir, rel_path)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, "w") as fd:
+            fd.write(text)
+        return path
+
+    def test_hash_file_changes_with_content(self):
+        path = self.write("a.md", "# One")
+        first = hash_file(path)
+        self.write("a.md", "# Two")
+        self.assertNotEqual(first, hash_file(path))
+
+    def test_missing_manifest_is_empty(self):
+        manifest = load_manifest(os.path.join(self.dir, "missing.json"))
+        self.assertEqual(manifest, empty_manifest())
+
+    def test_corrupt_manifest_is_empty(self):
+        path = self.write("manifest.json", "{not json")
+        self.assertEqual(load_manifest(path), empty_manifest())
+
+    def test_round_trip(self):
+        path = os.path.join(self.dir, "manifest.json")
+        manifest = empty_manifest()
+        manifest["pages"]["index.md"] = page_entry("abc", "def", "/", "index.html")
+        save_manifest(path, manifest)
+        self.assertEqual(load_manifest(path), manifest)
+
+    def test_is_up_to_date(self):
+        self.write("out/index.html", "<p>hi</p>")
+        public_dir = os.path.join(self.dir, "out")
+        entry = page_entry("abc", "def", "/", "index.html")
+
+        self.assertTrue(is_up_to_date(dict(entry), entry, public_dir))
+        # The recorded output digest isn't one of the page's inputs
+        self.assertTrue(is_up_to_date(dict(entry, digest="123"), entry, public_dir))
+        self.assertFalse(
+            is_up_to_date(page_entry("abc", "changed", "/", "index.html"), entry, public_dir)
+        )
+        self.assertFalse(
+            is_up_to_date(page_entry("abc", "def", "/blog/", "index.html"), entry, public_dir)
+        )
+
+        os.remove(os.path.join(public_dir, "index.html"))
+        self.assertFalse(is_up_to_date(dict(entry), entry, public_dir))
+
+    def test_stale_reasons(self):
+        self.write("out/index.html", "<p>hi</p>")
+        image = self.write("static/a.png", "png")
+        public_dir = os.path.join(self.dir, "out")
+        static_dir = os.path.join(self.dir, "static")
+        entry = page_entry("abc", "def", "/", "index.html")
+        previous = dict(entry, deps={"a.png": file_fingerprint(image)})
+
+        self.assertEqual(stale_reasons(None, entry, public_dir), ["not in the previous build"])
+        self.assertEqual(stale_reasons(previous, entry, public_dir, static_dir), [])
+        self.assertEqual(
+            stale_reasons(previous, page_entry("abc", "new", "/", "index.html"), public_dir),
+            ["template changed"],
+        )
+        compressed = dict(entry, compress=["gzip"])
+        self.assertEqual(stale_reasons(entry, compressed, public_dir), ["compression changed"])
+        self.assertEqual(stale_reasons(compressed, entry, public_dir), ["compression changed"])
+        minified = dict(entry, minify=True)
+        self.assertEqual(stale_reasons(entry, minified, public_dir), ["minification changed"])
+
+        os.utime(image, ns=(0, 0))
+        self.assertEqual(
+            stale_reasons(previous, entry, public_dir, static_dir),
+            ["static file a.png changed"],
+        )
+        # Without a static directory, static dependencies aren't checked
+        self.assertEqual(stale_reasons(previous, entry, public_dir), [])
+
+    def test_dependents(self):
+        pages = {
+            "a.md": {"deps": {"img/x.png": [1, 2]}},
+            "b.md": {"deps": {"img/y.png": [1, 2]}},
+            "c.md": {},
+        }
+        self.assertEqual(dependents(pages, ["img/x.png"]), {"a.md"})
+        self.assertEqual(dependents(pages, ["img/z.png"]), set())
+
+    def test_remove_stale_outputs(self):
+        public_dir = os.path.join(self.dir, "out")
+        self.write("out/index.html", "kept")
+        self.write("out/blog/old/index.html", "stale")
+        previous = {
+            "index.md": page_entry("a", "t", "/", "index.html"),
+            "blog/old/index.md": page_entry("b", "t", "/", "blog/old/index.html"),
+        }
+        current = {"index.md": previous["index.md"]}
+
+        removed = remove_stale_outputs(previous, current, public_dir)
+
+        self.assertEqual(removed, ["blog/old/index.html"])
+        self.assertTrue(os.path.exists(os.path.join(public_dir, "index.html")))
+        # Emptied directories are pruned, but never the output root itself
+        self.assertFalse(os.path.exists(os.path.join(public_dir, "blog")))
+        self.assertTrue(os.path.isdir(public_dir))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -1,7 +1,10 @@
+import io
 import unittest
 import textwrap
 from markdown import (
     markdown_to_blocks,
+    iter_blocks,
+    iter_markdown_html,
     block_to_block_type,
     BlockType,
     markdown_to_html_node,
@@ -117,6 +120,76 @@ class TestBlockToBlockType(unittest.TestCase):
         block = "- First item\nSecond item without hyphen\n- Third item"
         self.assertEqual(block_to_block_type(block), BlockType.paragraph)
 
+    def test_ordered(self):
+        block = "\n".join(f"{i}. item {i}" for i in range(1, 150))
+        self.assertEqual(block_to_block_type(block), BlockType.ordered_list)
+
+        # Numbers must count up from 1
+        block = "1. first\n3. third"
+        self.assertEqual(block_to_block_type(block), BlockType.paragraph)
+        block = "1. first\n02. second"
+        self.assertEqual(block_to_block_type(block), BlockType.paragraph)
+
+    def test_presplit_lines(self):
+        for block in ["1. a\n2. b", "- a\n- b", "> a\n> b", "# a", "1. a\nb"]:
+            lines = block.split("\n")
+            self.assertEqual(
+                block_to_block_type(block, lines), block_to_block_type(block)
+            )
+
+    def test_blocks_with_lines(self):
+        md = "# Title\n\n1. a\n2. b\n"
+        pairs = list(iter_blocks(md.split("\n"), with_lines=True))
+        self.assertEqual(pairs, [("# Title", ["# Title"]), ("1. a\n2. b", ["1. a", "2. b"])])
+
+
+class TestStreamingBlocks(unittest.TestCase):
+    MARKDOWN = textwrap.dedent(
+        """\
+        # Title
+
+        Paragraph with **bold**
+        over two lines
+
+        ```
+        code
+
+        with a blank line
+        ```
+        - a
+        - b
+
+        > quote
+        """
+    )
+
+    def test_iter_blocks_over_file_lines(self):
+        lines = io.StringIO(self.MARKDOWN)
+        self.assertEqual(list(iter_blocks(lines)), markdown_to_blocks(self.MARKDOWN))
+
+    def test_iter_blocks_is_lazy(self):
+        def lines():
+            yield "first block\n"
+            yield "\n"
+            raise AssertionError("read past the first block")
+
+        self.assertEqual(next(iter_blocks(lines())), "first block")
+
+    def test_iter_markdown_html_matches_tree(self):
+        html = "".join(iter_markdown_html(io.StringIO(self.MARKDOWN)))
+        self.assertEqual(html, markdown_to_html_node(self.MARKDOWN).to_html())
+
+    def test_stream_matches_string(self):
+        # A fence left open at the end of the file keeps its final newline
+        for markdown in (self.MARKDOWN, "# Title\n\n````\ncode\n", "# Title\n\n````\ncode"):
+            self.assertEqual(
+                list(iter_blocks(io.StringIO(markdown))), markdown_to_blocks(markdown)
+            )
+            self.assertEqual(
+                "".join(iter_markdown_html(io.StringIO(markdown))),
+                markdown_to_html_node(markdown).to_html(),
+            )
+
 
 class TestMarkdownToBlocks(unittest.TestCase):
     def test_markdown_to_blocks(self):
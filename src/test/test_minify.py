@@ -0,0 +1,127 @@
+import os
+import random
+import tempfile
+import unittest
+
+from build import discover_pages, render_pages, RenderSettings
+from minify import minify, iter_minify
+from template import Template
+
+DOCUMENT = (
+    "<!DOCTYPE html>\n<html>\n<head>\n  <title>Page</title>\n</head>\n<body>\n"
+    "<div class=\"post\">\n <p>Hello   <b>bold</b> <i>it</i>\n text</p> <!-- note -->\n"
+    "<pre><code>  x\n   y  </code></pre>\n"
+    "<p><a href=\"/a b\">link</a> <img src=\"/x.png\" alt=\"\"/> after</p>\n"
+    "<svg><path d=\"M0\"/></svg> <code> a  b </code>\n"
+    "<script>\nvar x = '<p> </p>';\n</script>\n<!--[if IE]><p>old</p><![endif]-->\n"
+    "</div>\n</body>\n</html>\n"
+)
+
+
+class TestMinify(unittest.TestCase):
+    def test_whitespace_between_tags(self):
+        self.assertEqual(minify("<div>\n  <p>a</p>\n  <p>b</p>\n</div>"), "<div><p>a</p><p>b</p></div>")
+        # Next to inline elements whitespace still renders, as one space
+        self.assertEqual(minify("<b>a</b>\n\t<i>b</i>"), "<b>a</b> <i>b</i>")
+        # Whitespace within text is left alone
+        self.assertEqual(minify("<p>a  \n b <b>c</b></p>"), "<p>a  \n b <b>c</b></p>")
+
+    def test_comments(self):
+        self.assertEqual(minify("<p>a<!-- <b>x</b> --></p>"), "<p>a</p>")
+        conditional = "<!--[if IE]><p>old</p><![endif]-->"
+        self.assertEqual(minify(conditional), conditional)
+
+    def test_attributes(self):
+        self.assertEqual(
+            minify('<a href="/post/" class="x y" title=\'it\'>a</a>'),
+            "<a href=/post/ class=\"x y\" title=it>a</a>",
+        )
+        self.assertEqual(minify('<img src="/a.png" alt="" />'), '<img src=/a.png alt="">')
+        # Non-void elements keep the slash, away from an unquoted value
+        self.assertEqual(minify('<path d="M0"/>'), "<path d=M0 />")
+        self.assertEqual(minify("<INPUT  disabled\n>"), "<INPUT disabled>")
+
+    def test_preserved_elements(self):
+        for html in (
+            "<pre>  a\n\n  <b>b</b>  </pre>",
+            "<code> a  b </code>",
+            "<textarea>\n  x\n</textarea>",
+            "<script>\nif (a <b) { x = '<p> </p>'; }\n</script>",
+            "<style>\n p  > a { }\n</style>",
+            "<pre><code>  <!-- kept -->\n</code></pre>",
+        ):
+            self.assertEqual(minify(html), html)
+        self.assertEqual(
+            minify('<pre class="x">  a  </pre>\n<p>b</p>'), "<pre class=x>  a  </pre><p>b</p>"
+        )
+
+    def test_document(self):
+        self.assertEqual(
+            minify(DOCUMENT),
+            "<!DOCTYPE html><html><head><title>Page</title></head><body><div class=post>"
+            "<p>Hello   <b>bold</b> <i>it</i>\n text</p><pre><code>  x\n   y  </code></pre>"
+            "<p><a href=\"/a b\">link</a> <img src=/x.png alt=\"\"> after</p>"
+            "<svg><path d=M0 /></svg> <code> a  b </code>"
+            "<script>\nvar x = '<p> </p>';\n</script><!--[if IE]><p>old</p><![endif]-->\n"
+            "</div></body></html>",
+        )
+
+    def test_streaming_matches_whole_document(self):
+        expected = minify(DOCUMENT)
+        rng = random.Random(0)
+        for _ in range(500):
+            cuts = sorted(rng.sample(range(len(DOCUMENT)), rng.randint(1, 12)))
+            chunks = [DOCUMENT[a:b] for a, b in zip([0] + cuts, cuts + [len(DOCUMENT)])]
+            self.assertEqual("".join(iter_minify(chunks, rng.choice([1, 64]))), expected)
+
+    def test_streaming_around_comments(self):
+        # Dropping a comment at a cut brings the whitespace after it up to
+        # the tag before it, so the cut has to go elsewhere
+        html = (
+            "<div><p><!-- c -->\n<pre>a  b</pre><b>x</b> <!-- c --><i>y</i>"
+            "<!-- c --> <b>z</b><!--[if IE]><p>old</p><![endif]--><code><!-- k --></code></div>"
+        )
+        expected = minify(html)
+        self.assertIn("<p><pre>", expected)
+        rng = random.Random(0)
+        for _ in range(500):
+            cuts = sorted(rng.sample(range(len(html)), rng.randint(1, 12)))
+            chunks = [html[a:b] for a, b in zip([0] + cuts, cuts + [len(html)])]
+            self.assertEqual("".join(iter_minify(chunks, batch_size=1)), expected)
+
+
+class TestMinifiedBuild(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.content_dir = os.path.join(self.tmp.name, "content")
+        self.public_dir = os.path.join(self.tmp.name, "docs")
+        os.makedirs(self.content_dir)
+        with open(os.path.join(self.content_dir, "index.md"), "w") as fd:
+            fd.write("# Home\n\nSome **bold** text\n\n```\n  code\n```\n\n- [a](/a/)\n- b")
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def render(self, **kwargs):
+        template = Template("<html>\n<title>{{ Title }}</title>\n<body>\n{{ Content }}\n</body>\n</html>")
+        settings = RenderSettings(self.content_dir, self.public_dir, template, "/", **kwargs)
+        tasks = [task + (None,) for task in discover_pages(self.content_dir)]
+        pages, errors = render_pages(tasks, settings)
+        self.assertEqual(errors, [])
+        with open(os.path.join(self.public_dir, "index.html")) as fd:
+            return pages["index.md"], fd.read()
+
+    def test_pages_are_minified(self):
+        entry, plain = self.render()
+        minified_entry, html = self.render(minify=True)
+        self.assertEqual(html, minify(plain))
+        self.assertIn("<a href=/a/>a</a>", html)
+        self.assertIn("<pre><code>  code\n</code></pre>", html)
+        self.assertTrue(minified_entry["minify"])
+        self.assertNotIn("minify", entry)
+        # Streamed straight to the file, without the write threads
+        self.assertEqual(self.render(minify=True, write_threads=0)[1], html)
+
+
+if __name__ == "__main__":
+    unittest.main()
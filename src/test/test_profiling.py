@@ -0,0 +1,66 @@
+import os
+import tempfile
+import unittest
+
+from markdown import markdown_to_html_node
+from page import generate_page
+from profiling import PageRecorder, Profiler
+from template import Template
+
+MARKDOWN = "# Title\n\nSome **bold** text\n\n- a [link](/x)\n- b"
+
+
+class TestProfiler(unittest.TestCase):
+    def test_add_merges_and_calls_hooks(self):
+        calls = []
+        profiler = Profiler()
+        profiler.add_hook(lambda *args: calls.append(args))
+
+        profiler.add("a.md", {"read": [0.5, 0.25, 10]})
+        profiler.add("a.md", {"read": [0.5, 0.25, 10], "write": [1.0, 0.5, 20]})
+        profiler.add("b.md", {"read": [0.1, 0.1, 1]})
+
+        self.assertEqual(profiler.pages["a.md"]["read"], [1.0, 0.5, 20])
+        self.assertEqual(profiler.totals()["read"], [1.1, 0.6, 21])
+        self.assertEqual(len(calls), 4)
+        self.assertEqual(calls[-1], ("b.md", "read", 0.1, 0.1, 1))
+
+    def test_slowest(self):
+        profiler = Profiler()
+        profiler.add("fast.md", {"read": [0.1, 0.0, 0]})
+        profiler.add("slow.md", {"read": [0.1, 0.0, 0], "to_html": [2.0, 0.0, 0]})
+        self.assertEqual([page for page, _ in profiler.slowest(1)], ["slow.md"])
+        report = profiler.report(top=2)
+        self.assertEqual(report["slowest"][0]["page"], "slow.md")
+        self.assertIn("slow.md", profiler.format_table(top=2))
+
+    def test_markdown_stages_recorded(self):
+        recorder = PageRecorder("page.md")
+        html = markdown_to_html_node(MARKDOWN, recorder).to_html()
+        self.assertEqual(html, markdown_to_html_node(MARKDOWN).to_html())
+        self.assertEqual(
+            set(recorder.stages), {"markdown_to_blocks", "block_to_block_type", "inline"}
+        )
+        self.assertEqual(recorder.stages["markdown_to_blocks"][2], len(MARKDOWN))
+
+    def test_profiled_page_matches_unprofiled(self):
+        template = Template('<title>{{ Title }}</title><a href="/">{{ Content }}</a>', "/b/")
+        with tempfile.TemporaryDirectory() as tmp:
+            source = os.path.join(tmp, "index.md")
+            with open(source, "w") as fd:
+                fd.write(MARKDOWN)
+            plain = os.path.join(tmp, "plain.html")
+            profiled = os.path.join(tmp, "profiled.html")
+            recorder = PageRecorder("index.md")
+
+            generate_page(source, template, plain, "/b/")
+            generate_page(source, template, profiled, "/b/", recorder)
+
+            with open(plain) as a, open(profiled) as b:
+                self.assertEqual(a.read(), b.read())
+        for stage in ["read", "to_html", "template", "write"]:
+            self.assertIn(stage, recorder.stages)
+
+
+if __name__ == "__main__":
+    unittest.main()
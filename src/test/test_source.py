@@ -0,0 +1,56 @@
+import os
+import tempfile
+import unittest
+
+from manifest import hash_file
+from page import generate_page
+from source import MappedSource, open_source
+from template import Template
+
+MARKDOWN = "# Title\r\n\r\nParagraph with **bold**\r\n\r\n- one\n- two\n"
+
+
+class TestSource(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmp.name, "page.md")
+        with open(self.path, "w", newline="") as fd:
+            fd.write(MARKDOWN)
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_open_source_threshold(self):
+        with open_source(self.path) as source:
+            self.assertNotIsInstance(source, MappedSource)
+        with open_source(self.path, mmap_threshold=os.path.getsize(self.path)) as source:
+            self.assertIsInstance(source, MappedSource)
+
+    def test_mapped_lines_match_text_mode(self):
+        for markdown in (MARKDOWN, "# Title\r\rOld\rMac\r\n- é\r- two\r"):
+            with open(self.path, "w", newline="") as fd:
+                fd.write(markdown)
+            with open(self.path) as fd:
+                expected = list(fd)
+            with MappedSource(self.path) as source:
+                self.assertEqual(list(source), expected)
+                source.seek(0)
+                self.assertEqual(list(source), expected)
+                source.seek(0)
+                self.assertEqual(source.read(), "".join(expected))
+
+    def test_mapped_hash(self):
+        self.assertEqual(hash_file(self.path, mmap_threshold=0), hash_file(self.path))
+
+    def test_mapped_page_matches_read_page(self):
+        template = Template("<h1>{{ Title }}</h1>{{ Content }}")
+        read_path = os.path.join(self.tmp.name, "read.html")
+        mapped_path = os.path.join(self.tmp.name, "mapped.html")
+        generate_page(self.path, template, read_path, "/")
+        generate_page(self.path, template, mapped_path, "/", mmap_threshold=0)
+        with open(read_path) as read_fd, open(mapped_path) as mapped_fd:
+            self.assertEqual(read_fd.read(), mapped_fd.read())
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,97 @@
+import os
+import tempfile
+import unittest
+
+from staticfiles import copytree, copy_file
+
+
+class TestCopytree(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.source = os.path.join(self.tmp.name, "static")
+        self.destination = os.path.join(self.tmp.name, "docs")
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def write(self, path, text):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, "w") as fd:
+            fd.write(text)
+
+    def read(self, path):
+        with open(path) as fd:
+            return fd.read()
+
+    def test_copies_tree(self):
+        self.write(os.path.join(self.source, "index.css"), "body {}")
+        self.write(os.path.join(self.source, "images", "a.png"), "png")
+
+        files = copytree(self.source, self.destination)
+
+        self.assertEqual(sorted(files), ["images/a.png", "index.css"])
+        self.assertEqual(self.read(os.path.join(self.destination, "images", "a.png")), "png")
+
+    def test_unchanged_files_are_not_copied(self):
+        source_file = os.path.join(self.source, "index.css")
+        destination_file = os.path.join(self.destination, "index.css")
+        self.write(source_file, "body {}")
+        copytree(self.source, self.destination)
+        # Same size and mtime as the source, so a second copy would be noticed
+        self.write(destination_file, "marker!")
+        mtime = os.stat(source_file).st_mtime_ns
+        os.utime(destination_file, ns=(mtime, mtime))
+
+        copytree(self.source, self.destination)
+        self.assertEqual(self.read(destination_file), "marker!")
+
+        self.write(source_file, "body { color: red }")
+        copytree(self.source, self.destination)
+        self.assertEqual(self.read(destination_file), "body { color: red }")
+
+    def test_checksum_ignores_mtime(self):
+        source_file = os.path.join(self.source, "index.css")
+        destination_file = os.path.join(self.destination, "index.css")
+        self.write(source_file, "body {}")
+        self.write(destination_file, "body {}")
+        os.utime(destination_file, ns=(0, 0))
+
+        copytree(self.source, self.destination, checksum=True)
+        self.assertEqual(os.stat(destination_file).st_mtime_ns, 0)
+
+    def test_removes_stale_files_only(self):
+        self.write(os.path.join(self.source, "images", "old.png"), "old")
+        previous = copytree(self.source, self.destination)
+        self.write(os.path.join(self.destination, "index.html"), "page")
+        os.remove(os.path.join(self.source, "images", "old.png"))
+
+        copytree(self.source, self.destination, previous=previous)
+
+        self.assertFalse(os.path.exists(os.path.join(self.destination, "images")))
+        self.assertTrue(os.path.exists(os.path.join(self.destination, "index.html")))
+
+    def test_link(self):
+        source_file = os.path.join(self.source, "a.png")
+        destination_file = os.path.join(self.destination, "a.png")
+        self.write(source_file, "png")
+        copytree(self.source, self.destination, link=True)
+        self.assertTrue(os.path.samefile(source_file, destination_file))
+
+    def test_copy_file_replaces_hardlink(self):
+        source_file = os.path.join(self.source, "a.png")
+        destination_file = os.path.join(self.destination, "a.png")
+        self.write(source_file, "png")
+        os.makedirs(self.destination)
+        os.link(source_file, destination_file)
+
+        copy_file(source_file, destination_file)
+
+        self.assertFalse(os.path.samefile(source_file, destination_file))
+        self.assertEqual(self.read(source_file), "png")
+        self.assertEqual(
+            os.stat(source_file).st_mtime_ns, os.stat(destination_file).st_mtime_ns
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,67 @@
+import unittest
+
+from template import Template, rewrite_paths
+
+TEMPLATE = (
+    '<title>{{ Title }}</title><link href="/index.css" />'
+    "<article>{{ Content }}</article>"
+)
+
+
+class TestTemplate(unittest.TestCase):
+    def test_render_at_root(self):
+        template = Template(TEMPLATE)
+        self.assertEqual(
+            template.render(title="Home", content='<a href="/blog">Blog</a>'),
+            '<title>Home</title><link href="/index.css" />'
+            '<article><a href="/blog">Blog</a></article>',
+        )
+
+    def test_render_with_base_path(self):
+        template = Template(TEMPLATE, "/site/")
+        html = template.render(title="Home", content='<img src="/a.png"></img>')
+        self.assertEqual(
+            html,
+            '<title>Home</title><link href="/site/index.css" />'
+            '<article><img src="/site/a.png"></img></article>',
+        )
+
+    def test_literals_are_rewritten_once(self):
+        template = Template(TEMPLATE, "/site/")
+        self.assertIn('href="/site/index.css"', template.segments[2])
+        self.assertEqual(template.segments[1], ("title",))
+        self.assertEqual(template.segments[3], ("content",))
+
+    def test_matches_replace_pipeline(self):
+        base_path = "/static-site-generator/"
+        title = "Title"
+        content = '<p><a href="/">Back</a></p>'
+        html = TEMPLATE.replace("{{ Title }}", title).replace("{{ Content }}", content)
+        self.assertEqual(
+            Template(TEMPLATE, base_path).render(title=title, content=content),
+            rewrite_paths(html, base_path),
+        )
+
+    def test_repeated_placeholder(self):
+        template = Template("{{ Title }} - {{ Title }}")
+        self.assertEqual(template.render(title="A", content=""), "A - A")
+
+    def test_iter_render_matches_render(self):
+        template = Template(TEMPLATE, "/site/")
+        chunks = ["<p>", '<a href="/x">', "x", "</a>", "</p>"]
+        self.assertEqual(
+            "".join(template.iter_render("T", iter(chunks))),
+            template.render(title="T", content="".join(chunks)),
+        )
+
+    def test_iter_render_repeated_content(self):
+        template = Template("{{ Content }}|{{ Content }}")
+        self.assertEqual("".join(template.iter_render("", iter(["a", "b"]))), "ab|ab")
+
+    def test_hash_tracks_text(self):
+        self.assertEqual(Template(TEMPLATE).hash, Template(TEMPLATE, "/x/").hash)
+        self.assertNotEqual(Template(TEMPLATE).hash, Template(TEMPLATE + " ").hash)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -10,9 +10,20 @@ from textnode import (
     split_nodes_image,
     split_nodes_link,
     text_to_textnodes,
+    tokenize_inline,
 )
 
 
+def chained_split(text):
+    """The multi-pass pipeline tokenize_inline replaces."""
+    nodes = [TextNode(text, TextType.TEXT)]
+    nodes = split_nodes_delimiter(nodes, "**", TextType.BOLD)
+    nodes = split_nodes_delimiter(nodes, "_", TextType.ITALIC)
+    nodes = split_nodes_delimiter(nodes, "`", TextType.CODE)
+    nodes = split_nodes_image(nodes)
+    return split_nodes_link(nodes)
+
+
 class TestExtractMarkdown(unittest.TestCase):
     def test_extract_markdown_images(self):
         matches = extract_markdown_images(
@@ -118,6 +129,15 @@ class TestTextNode(unittest.TestCase):
         node2 = TextNode("This is a text node", TextType.BOLD, url=None)
         self.assertEqual(node, node2)
 
+    def test_not_eq_url(self):
+        node = TextNode("link", TextType.LINK, "https://a.com")
+        node2 = TextNode("link", TextType.LINK, "https://b.com")
+        self.assertNotEqual(node, node2)
+        self.assertNotEqual(node, "link")
+
+    def test_slotted(self):
+        self.assertFalse(hasattr(TextNode("x", TextType.TEXT), "__dict__"))
+
     def test_text_prop(self):
         node = TextNode("This is a text node", TextType.BOLD)
         node2 = TextNode("This is a text node", TextType.ITALIC)
@@ -500,6 +520,29 @@ class TestTextNode(unittest.TestCase):
             new_nodes,
         )
 
+    def test_split_link_after_identical_image(self):
+        node = TextNode("![x](u.png) then [x](u.png)", TextType.TEXT)
+        self.assertListEqual(
+            [
+                TextNode("![x](u.png) then ", TextType.TEXT),
+                TextNode("x", TextType.LINK, "u.png"),
+            ],
+            split_nodes_link([node]),
+        )
+
+    def test_split_repeated_links(self):
+        node = TextNode("[a](u) and [a](u) and [a](u)", TextType.TEXT)
+        self.assertListEqual(
+            [
+                TextNode("a", TextType.LINK, "u"),
+                TextNode(" and ", TextType.TEXT),
+                TextNode("a", TextType.LINK, "u"),
+                TextNode(" and ", TextType.TEXT),
+                TextNode("a", TextType.LINK, "u"),
+            ],
+            split_nodes_link([node]),
+        )
+
     def test_text_to_textnodes(self):
         markdown_string = "This is **text** with an *italic* word and a `code block` and an ![obi wan image](https://i.imgur.com/fJRm4Vk.jpeg) and a [link](https://boot.dev)"
         new_nodes = text_to_textnodes(markdown_string)
@@ -526,5 +569,152 @@ class TestTextNode(unittest.TestCase):
         )
 
 
+class TestTokenizeInline(unittest.TestCase):
+    def test_all_markup(self):
+        text = "This is **text** with an _italic_ word and a `code block` and an ![obi wan image](https://i.imgur.com/fJRm4Vk.jpeg) and a [link](https://boot.dev)"
+        self.assertListEqual(
+            [
+                TextNode("This is ", TextType.TEXT),
+                TextNode("text", TextType.BOLD),
+                TextNode(" with an ", TextType.TEXT),
+                TextNode("italic", TextType.ITALIC),
+                TextNode(" word and a ", TextType.TEXT),
+                TextNode("code block", TextType.CODE),
+                TextNode(" and an ", TextType.TEXT),
+                TextNode(
+                    "obi wan image", TextType.IMAGE, "https://i.imgur.com/fJRm4Vk.jpeg"
+                ),
+                TextNode(" and a ", TextType.TEXT),
+                TextNode("link", TextType.LINK, "https://boot.dev"),
+            ],
+            tokenize_inline(text),
+        )
+
+    def test_matches_chained_split(self):
+        cases = [
+            "plain text",
+            "**bold** at start and _italic_ at end_",
+            "**a _b_ c** and **`code` in bold**",
+            "_italic with `code`_",
+            "![img](a.png)[link](b.html) and [another](c)",
+            "[not a link and ![not an image",
+            "**b**_i_`c`",
+            "empty ****",
+        ]
+        for text in cases:
+            with self.subTest(text=text):
+                try:
+                    expected = chained_split(text)
+                except Exception:
+                    with self.assertRaises(Exception):
+                        tokenize_inline(text)
+                else:
+                    self.assertListEqual(expected, tokenize_inline(text))
+
+    def test_links_and_code_are_atomic(self):
+        self.assertListEqual(
+            [
+                TextNode("see ", TextType.TEXT),
+                TextNode("snake_case", TextType.CODE),
+                TextNode(" and ", TextType.TEXT),
+                TextNode("docs", TextType.LINK, "https://example.com/a_b"),
+            ],
+            tokenize_inline("see `snake_case` and [docs](https://example.com/a_b)"),
+        )
+
+    def test_link_text_and_alt_text_are_literal(self):
+        text = "see [the `x` docs](u)"
+        self.assertEqual(chained_split(text)[1], TextNode("x", TextType.CODE))
+        self.assertListEqual(
+            [TextNode("see ", TextType.TEXT), TextNode("the `x` docs", TextType.LINK, "u")],
+            tokenize_inline(text),
+        )
+        self.assertListEqual(
+            [TextNode("a**b**", TextType.LINK, "u")], tokenize_inline("[a**b**](u)")
+        )
+        self.assertListEqual(
+            [TextNode("a _b_ c", TextType.IMAGE, "u")], tokenize_inline("![a _b_ c](u)")
+        )
+
+    def test_delimiters_in_urls_dont_pair_with_text(self):
+        # The chained split paired the "_" in the URL with the lone one
+        # after it, mangling the link; here the lone one is unmatched
+        text = "see [docs](https://example.com/a_b) and a lone _ here"
+        self.assertEqual(chained_split(text)[1].text_type, TextType.ITALIC)
+        with self.assertRaisesRegex(Exception, "Unmatched delimiter found: '_' at offset 47"):
+            tokenize_inline(text)
+
+    def test_unmatched_delimiter(self):
+        for text in ["a **b", "a _b", "a `b", "**a _b**"]:
+            with self.subTest(text=text):
+                with self.assertRaises(Exception):
+                    tokenize_inline(text)
+
+
+
+class TestTextNodeSpans(unittest.TestCase):
+    SOURCE = "Some **bold** and a [link](/x) with ![alt](/y.png)"
+
+    def assertSpansOf(self, source, nodes):
+        for node in nodes:
+            self.assertIs(node.source, source)
+
+    def test_span(self):
+        node = TextNode("xx bold yy", TextType.BOLD, None, 3, 7)
+        self.assertEqual(node.text, "bold")
+        self.assertEqual(node, TextNode("bold", TextType.BOLD))
+
+    def test_pipeline_keeps_spans_of_the_source(self):
+        nodes = text_to_textnodes(self.SOURCE)
+        self.assertSpansOf(self.SOURCE, nodes)
+        self.assertEqual(
+            [(node.text, node.text_type, node.url) for node in nodes],
+            [
+                ("Some ", TextType.TEXT, None),
+                ("bold", TextType.BOLD, None),
+                (" and a ", TextType.TEXT, None),
+                ("link", TextType.LINK, "/x"),
+                (" with ", TextType.TEXT, None),
+                ("alt", TextType.IMAGE, "/y.png"),
+            ],
+        )
+        self.assertEqual([node.start for node in nodes[:3]], [0, 7, 13])
+
+    def test_tokenize_inline_keeps_spans_of_the_source(self):
+        nodes = tokenize_inline(self.SOURCE)
+        self.assertSpansOf(self.SOURCE, nodes)
+        self.assertListEqual(nodes, text_to_textnodes(self.SOURCE))
+
+    def test_split_within_span(self):
+        node = TextNode("ignored **a** b **c** ignored", TextType.TEXT, None, 8, 21)
+        nodes = split_nodes_delimiter([node], "**", TextType.BOLD)
+        self.assertListEqual(
+            nodes,
+            [
+                TextNode("a", TextType.BOLD),
+                TextNode(" b ", TextType.TEXT),
+                TextNode("c", TextType.BOLD),
+            ],
+        )
+
+    def test_unchanged_nodes_are_reused(self):
+        node = TextNode("plain", TextType.TEXT)
+        self.assertIs(split_nodes_delimiter([node], "**", TextType.BOLD)[0], node)
+        self.assertIs(split_nodes_link([node])[0], node)
+
+    def test_empty_nodes_are_dropped(self):
+        self.assertListEqual(text_to_textnodes(""), [])
+        node = TextNode("a **b**", TextType.TEXT, None, 2, 2)
+        self.assertListEqual(split_nodes_delimiter([node], "**", TextType.BOLD), [])
+        self.assertListEqual(split_nodes_link([node]), [])
+
+    def test_unmatched_delimiter_position(self):
+        with self.assertRaisesRegex(Exception, r"'\*\*' at offset 10"):
+            split_nodes_delimiter(
+                [TextNode("fine text **open", TextType.TEXT)], "**", TextType.BOLD
+            )
+        with self.assertRaisesRegex(Exception, r"'_' at offset 7, near '_never closed'"):
+            tokenize_inline("**ok** _never closed")
+
 if __name__ == "__main__":
     unittest.main()
@@ -0,0 +1,80 @@
+import os
+import tempfile
+import unittest
+
+from writer import OutputWriter
+
+
+class TestOutputWriter(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.dir = self.tmp.name
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def read(self, rel_path):
+        with open(os.path.join(self.dir, rel_path)) as fd:
+            return fd.read()
+
+    def test_writes_pages(self):
+        # A single pending slot makes every write wait for the previous one
+        with OutputWriter(threads=2, max_pending=1) as writer:
+            for i in range(10):
+                writer.write(os.path.join(self.dir, f"post{i}", "index.html"), f"page {i}")
+            self.assertEqual(writer.flush(), {})
+        self.assertEqual(self.read("post7/index.html"), "page 7")
+        self.assertEqual(
+            sorted(os.listdir(os.path.join(self.dir, "post7"))), ["index.html"]
+        )
+
+    def test_creates_each_directory_once(self):
+        with OutputWriter() as writer:
+            writer.write(os.path.join(self.dir, "a", "one.html"), "1")
+            writer.write(os.path.join(self.dir, "a", "two.html"), "2")
+            writer.flush()
+            self.assertEqual(writer.created_dirs, {os.path.join(self.dir, "a")})
+
+    def test_failed_write_is_reported(self):
+        blocked = os.path.join(self.dir, "blocked.html")
+        os.mkdir(blocked)
+        with OutputWriter() as writer:
+            writer.write(blocked, "page")
+            writer.write(os.path.join(self.dir, "fine.html"), "page")
+            errors = writer.flush()
+        self.assertEqual(list(errors), [blocked])
+        self.assertEqual(self.read("fine.html"), "page")
+        self.assertFalse(os.path.exists(blocked + ".tmp"))
+
+    def test_unchanged_output_is_not_rewritten(self):
+        path = os.path.join(self.dir, "page.html")
+        with OutputWriter(threads=0) as writer:
+            digest = writer.write(path, "page")
+        os.utime(path, (0, 0))
+
+        # Compared against the file on disk, then against the known digest
+        for known_digest in (None, digest):
+            with OutputWriter() as writer:
+                self.assertEqual(writer.write(path, "page", known_digest), digest)
+                writer.flush()
+                self.assertEqual(writer.unchanged, {path})
+            self.assertEqual(os.path.getmtime(path), 0)
+
+        with OutputWriter() as writer:
+            writer.write(path, "edited page", digest)
+            writer.flush()
+            self.assertEqual(writer.unchanged, set())
+        self.assertEqual(self.read("page.html"), "edited page")
+
+    def test_write_stream(self):
+        path = os.path.join(self.dir, "sub", "page.html")
+        chunks = ["<p>", "x" * 100000, "</p>"]
+        with OutputWriter(threads=0) as writer:
+            digest = writer.write_stream(path, chunks)
+            self.assertEqual(writer.write(path, "".join(chunks)), digest)
+            self.assertEqual(writer.unchanged, {path})
+        self.assertEqual(self.read("sub/page.html"), "".join(chunks))
+
+
+if __name__ == "__main__":
+    unittest.main()
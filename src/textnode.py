@@ -2,14 +2,17 @@ import re
 from enum import Enum
 from htmlnode import LeafNode
 
+IMAGE_RE = re.compile(r"!\[([^\[\]]*)\]\(([^\(\)]*)\)")
+LINK_RE = re.compile(r"(?<!!)\[([^\[\]]*)\]\(([^\(\)]*)\)")
+
 
 def extract_markdown_images(text):
-    results = re.findall(r"!\[([^\[\]]*)\]\(([^\(\)]*)\)", text)
+    results = IMAGE_RE.findall(text)
     return results
 
 
 def extract_markdown_links(text):
-    results = re.findall(r"(?<!!)\[([^\[\]]*)\]\(([^\(\)]*)\)", text)
+    results = LINK_RE.findall(text)
     return results
 
 
@@ -47,48 +50,108 @@ def text_to_textnodes(text):
     return nodes
 
 
-def split_nodes_image(old_nodes):
-    """
-    Split TextNode image link into its subcomponents.
+# Delimiter -> the TextType of the text it encloses
+INLINE_DELIMITERS = {"**": TextType.BOLD, "_": TextType.ITALIC, "`": TextType.CODE}
 
-    old_nodes -- List of TextNode objects to process
+# Markup recognized inside text of each type. Links and images are only
+# recognized in plain text, and code spans are always literal.
+INLINE_TOKEN_RES = {
+    TextType.TEXT: re.compile(r"\*\*|_|`|!?\["),
+    TextType.BOLD: re.compile(r"_|`"),
+    TextType.ITALIC: re.compile(r"`"),
+}
+
+
+def tokenize_inline(text):
     """
-    result = []
-    for old_node in old_nodes:
-        if old_node.text_type != TextType.TEXT:
-            result.append(old_node)
-            continue
+    Converts a string with inline markdown (**bold**, _italic_, `code`,
+    images and links) to a list of TextNode objects in a single left-to-right
+    pass, without rebuilding the node list once per kind of markup as
+    splitting by "**", "_" and "`" and then splitting images and links did.
+
+    The result is the same as that pipeline's unless a delimiter is inside
+    a code span or a link or image. Those are taken as a whole, so their
+    text, alt text and URL are literal: "[the `x` docs](u)" is a link whose
+    text is "the `x` docs", where the pipeline made a code span and left
+    the brackets as text, and "[a](/x_y)" is a link, where the pipeline
+    raised. "[a](/x_y) _" raises for the lone "_", where the pipeline
+    paired it with the one in the URL and mangled the link.
+
+    Raises an exception if a delimiter is never closed.
+    """
+    nodes = []
 
-        images = extract_markdown_images(old_node.text)
-        # print(f"Extracted images: {images}")  # debug
+    def emit(text_type, start, end, url=None):
+        nodes.append(TextNode(text, text_type, url, start, end))
 
-        if not images:
-            result.append(old_node)
-            continue
+    scan_inline(text, emit)
+    return nodes
 
-        remaining_text = old_node.text
 
-        for image_alt, image_url in images:
-            image_markdown = f"![{image_alt}]({image_url})"
-            parts = remaining_text.split(image_markdown, 1)
+def scan_inline(text, emit):
+    """
+    Parses the inline markdown in text without building any nodes: for
+    every run of text, in order, emit(text_type, start, end, url) is called
+    with its type and its span text[start:end]; url is only passed for
+    links and images, whose span is their text.
 
-            if parts[0]:
-                result.append(TextNode(parts[0], TextType.TEXT))
+    Raises an exception if a delimiter is never closed.
+    """
+    _scan_inline(text, 0, len(text), TextType.TEXT, emit)
+
+
+def _scan_inline(text, start, end, text_type, emit):
+    """Emits the runs of text[start:end], which is enclosed in text_type."""
+    token_re = INLINE_TOKEN_RES[text_type]
+    pending = start  # start of text not yet emitted
+    pos = start
+    while True:
+        token = token_re.search(text, pos, end)
+        if token is None:
+            break
+        token_start = token.start()
+        marker = token.group()
+
+        if marker[-1] == "[":
+            pattern = IMAGE_RE if marker == "![" else LINK_RE
+            match = pattern.match(text, token_start, end)
+            if match is None:
+                # Not a link after all, keep it as plain text
+                pos = token_start + 1
+                continue
+            if pending < token_start:
+                emit(text_type, pending, token_start)
+            link_type = TextType.IMAGE if marker == "![" else TextType.LINK
+            emit(link_type, match.start(1), match.end(1), match.group(2))
+            pending = pos = match.end()
+            continue
 
-            # result.append(TextNode(image_alt, TextType.IMAGE, image_url))
-            node = TextNode(image_alt, TextType.IMAGE, image_url)
-            # print(f"Created image node: {node.text}, {node.text_type}, URL={node.url}")
-            result.append(node)
+        inner_start = token.end()
+        inner_end = text.find(marker, inner_start, end)
+        if inner_end == -1:
+            raise Exception(unmatched_delimiter_message(text, marker, token_start))
+        if pending < token_start:
+            emit(text_type, pending, token_start)
 
-            if len(parts) > 1:
-                remaining_text = parts[1]
-            else:
-                remaining_text = ""
+        inner_type = INLINE_DELIMITERS[marker]
+        if inner_type == TextType.CODE:
+            if inner_start < inner_end:
+                emit(TextType.CODE, inner_start, inner_end)
+        else:
+            _scan_inline(text, inner_start, inner_end, inner_type, emit)
+        pending = pos = inner_end + len(marker)
 
-        if remaining_text:
-            result.append(TextNode(remaining_text, TextType.TEXT))
+    if pending < end:
+        emit(text_type, pending, end)
 
-    return result
+
+def split_nodes_image(old_nodes):
+    """
+    Split TextNode image link into its subcomponents.
+
+    old_nodes -- List of TextNode objects to process
+    """
+    return _split_nodes_pattern(old_nodes, IMAGE_RE, TextType.IMAGE)
 
 
 def split_nodes_link(old_nodes):
@@ -97,34 +160,38 @@ def split_nodes_link(old_nodes):
 
     old_nodes -- List of TextNode objects to process.
     """
+    return _split_nodes_pattern(old_nodes, LINK_RE, TextType.LINK)
+
+
+def _split_nodes_pattern(old_nodes, pattern, text_type):
+    """
+    Splits every TEXT node around the matches of pattern, whose groups are
+    (text, url). Matches are searched for within each node's span and the
+    new nodes are spans of the same source, so no text is copied.
+    """
     result = []
     for old_node in old_nodes:
         if old_node.text_type != TextType.TEXT:
             result.append(old_node)
             continue
 
-        links = extract_markdown_links(old_node.text)
-
-        if not links:
-            result.append(old_node)
-            continue
-
-        remaining_text = old_node.text
-
-        for link_alt, link_url in links:
-            link_markdown = f"[{link_alt}]({link_url})"
-            parts = remaining_text.split(link_markdown, 1)
+        source, start, end = old_node.source, old_node.start, old_node.end
+        pos = start
+        for match in pattern.finditer(source, start, end):
+            if match.start() > pos:
+                result.append(TextNode(source, TextType.TEXT, None, pos, match.start()))
+            result.append(
+                TextNode(source, text_type, match.group(2), match.start(1), match.end(1))
+            )
+            pos = match.end()
+
+        if pos == start:
+            # No matches, keep the node as is unless it's empty
+            if start < end:
+                result.append(old_node)
+        elif pos < end:
+            result.append(TextNode(source, TextType.TEXT, None, pos, end))
 
-            if parts[0]:
-                result.append(TextNode(parts[0], TextType.TEXT))
-            result.append(TextNode(link_alt, TextType.LINK, link_url))
-
-            if len(parts) > 1:
-                remaining_text = parts[1]
-            else:
-                remaining_text = ""
-        if remaining_text:
-            result.append(TextNode(remaining_text, TextType.TEXT))
     return result
 
 
@@ -136,31 +203,48 @@ def split_nodes_delimiter(old_nodes, delimiter, text_type):
     delimiter -- The delimiter string to split on (e.g., "`", "**", "_")
     text_type -- The TextType to assign to text between delimiters
 
-    Returns a new list of TextNode objects with appropriate text types.
-    Raises an exception if a matching closing delimiter
+    Returns a new list of TextNode objects with appropriate text types,
+    which are spans of the same sources as old_nodes. Raises an exception,
+    giving the delimiter's offset in its source, if a delimiter is never
+    closed.
     """
     new_nodes = []
 
     for node in old_nodes:
-        parts = node.text.split(delimiter)
-
-        if len(parts) % 2 == 0:
-            raise Exception("Unmatched delimiter found.")
-
-        for i, part in enumerate(parts):
-            if part:  # Avoid adding empty strings
-                if i % 2 == 0:
-                    new_nodes.append(
-                        TextNode(part, node.text_type, node.url)
-                    )  # Normal text
-                else:
-                    new_nodes.append(
-                        TextNode(part, text_type, node.url)
-                    )  # Delimited text
+        source, start, end = node.source, node.start, node.end
+        pos = start
+        delimited = False
+        while True:
+            found = source.find(delimiter, pos, end)
+            if found == -1:
+                break
+            if found > pos:  # Avoid adding empty nodes
+                # Delimited text or normal text
+                part_type = text_type if delimited else node.text_type
+                new_nodes.append(TextNode(source, part_type, node.url, pos, found))
+            delimited = not delimited
+            opened = found
+            pos = found + len(delimiter)
+
+        if delimited:
+            raise Exception(unmatched_delimiter_message(source, delimiter, opened))
+        if pos == start:
+            # No delimiters, keep the node as is unless it's empty
+            if start < end:
+                new_nodes.append(node)
+        elif pos < end:
+            new_nodes.append(TextNode(source, node.text_type, node.url, pos, end))
 
     return new_nodes
 
 
+def unmatched_delimiter_message(source, delimiter, offset):
+    return (
+        f"Unmatched delimiter found: {delimiter!r} at offset {offset}, "
+        f"near {source[offset : offset + 30]!r}"
+    )
+
+
 def text_node_to_html_node(text_node):
     """TODO describe function
     :param text_node:
@@ -186,15 +270,34 @@ def text_node_to_html_node(text_node):
 
 
 class TextNode:
-    def __init__(self, text, text_type, url=None):
-        self.text = text
+    """
+    A run of inline text of one TextType, held as the span
+    source[start:end] of the text it was parsed from rather than as a copy;
+    the text property slices it out when it is needed. TextNode(text,
+    text_type) spans all of text.
+    """
+
+    __slots__ = ("source", "start", "end", "text_type", "url")
+
+    def __init__(self, text, text_type, url=None, start=0, end=None):
+        self.source = text
+        self.start = start
+        self.end = len(text) if end is None else end
         self.text_type = text_type
         self.url = url
 
+    @property
+    def text(self):
+        return self.source[self.start : self.end]
+
     def __eq__(self, other):
         if not isinstance(other, TextNode):
             return False
-        return self.__dict__ == other.__dict__
+        return (self.text, self.text_type, self.url) == (
+            other.text,
+            other.text_type,
+            other.url,
+        )
 
     def __repr__(self):
         return f"TextNode({self.text}, {self.text_type}, {self.url})"
@@ -0,0 +1,185 @@
+import hashlib
+import logging
+import os
+import threading
+import traceback
+from concurrent.futures import ThreadPoolExecutor
+from compress import remove_siblings
+from manifest import hash_file
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_WRITE_THREADS = 4
+# Rendered pages waiting to be written; rendering pauses when this many are
+# queued, so a slow output volume can't make memory grow without bound
+MAX_PENDING_WRITES = 64
+# Streamed output is encoded and written in pieces of about this size
+STREAM_BUFFER_SIZE = 1 << 16
+
+
+class OutputWriter:
+    """Writes rendered pages, from a pool of background threads unless
+    threads is 0.
+
+    write() returns as soon as the page is queued, so rendering carries on
+    while earlier pages are written. Each file is written to a temporary
+    path and renamed into place, so readers never see a partial page and a
+    failed write keeps the previous output. Directories are only created
+    the first time a page is written to them.
+
+    A page whose output is already on disk with the same contents is left
+    alone, so its mtime doesn't change; its path is added to unchanged.
+    Callers pass the digest the output had when they last wrote it
+    (known_digest) to skip reading the old file back.
+
+    With compressor (a compress.Compressor running on the calling thread),
+    compressed siblings are written along with every page, and for
+    unchanged pages if they're missing. Without one, siblings left by an
+    earlier build are removed whenever their page is rendered.
+
+    Write errors don't raise: flush() waits for every queued write and
+    returns {dest_path: error} for the ones that failed.
+    """
+
+    def __init__(
+        self, threads=DEFAULT_WRITE_THREADS, max_pending=MAX_PENDING_WRITES, compressor=None
+    ):
+        self.compressor = compressor
+        self.executor = ThreadPoolExecutor(max_workers=threads) if threads else None
+        self.pending = threading.BoundedSemaphore(max_pending)
+        self.created_dirs = set()
+        self.unchanged = set()
+        self.futures = {}
+        self.errors = {}
+
+    def makedirs(self, directory):
+        if directory not in self.created_dirs:
+            os.makedirs(directory, exist_ok=True)
+            self.created_dirs.add(directory)
+
+    def write(self, dest_path, text, known_digest=None):
+        """Queues text to be written to dest_path and returns its sha256
+        hex digest."""
+        data = text.encode()
+        digest = hashlib.sha256(data).hexdigest()
+        if self.executor is None:
+            try:
+                self._write(dest_path, data, digest, known_digest)
+            except Exception as error:
+                self.errors[dest_path] = _format_error(error)
+            return digest
+
+        self.pending.acquire()
+        try:
+            future = self.executor.submit(
+                self._write, dest_path, data, digest, known_digest
+            )
+        except BaseException:
+            self.pending.release()
+            raise
+        future.add_done_callback(lambda _: self.pending.release())
+        self.futures[dest_path] = future
+        return digest
+
+    def _write(self, dest_path, data, digest, known_digest):
+        self.makedirs(os.path.dirname(dest_path))
+        if self._is_unchanged(dest_path, digest, len(data), known_digest):
+            self.unchanged.add(dest_path)
+            self._update_siblings(dest_path, data, changed=False)
+            return
+        tmp_path = dest_path + ".tmp"
+        try:
+            with open(tmp_path, "wb") as output_fd:
+                output_fd.write(data)
+            os.replace(tmp_path, dest_path)
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+        logger.debug("Wrote %s", dest_path)
+        self._update_siblings(dest_path, data)
+
+    def write_stream(self, dest_path, chunks, known_digest=None):
+        """Writes the text chunks to dest_path on the calling thread as they
+        are produced, so the whole page is never held in memory. Returns
+        the output's sha256 hex digest. Unlike write(), errors raise."""
+        self.makedirs(os.path.dirname(dest_path))
+        digest = hashlib.sha256()
+        size = 0
+        tmp_path = dest_path + ".tmp"
+        try:
+            with open(tmp_path, "wb") as output_fd:
+                buffered = []
+                buffered_size = 0
+                for chunk in chunks:
+                    buffered.append(chunk)
+                    buffered_size += len(chunk)
+                    if buffered_size >= STREAM_BUFFER_SIZE:
+                        size += self._write_chunk(output_fd, digest, buffered)
+                        buffered = []
+                        buffered_size = 0
+                size += self._write_chunk(output_fd, digest, buffered)
+        except BaseException:
+            os.remove(tmp_path)
+            raise
+
+        digest = digest.hexdigest()
+        if self._is_unchanged(dest_path, digest, size, known_digest):
+            os.remove(tmp_path)
+            self.unchanged.add(dest_path)
+            self._update_siblings(dest_path, changed=False)
+        else:
+            os.replace(tmp_path, dest_path)
+            logger.debug("Wrote %s", dest_path)
+            self._update_siblings(dest_path)
+        return digest
+
+    def _update_siblings(self, dest_path, data=None, changed=True):
+        if self.compressor is not None:
+            self.compressor.update(dest_path, data, changed)
+        else:
+            remove_siblings(dest_path)
+
+    @staticmethod
+    def _write_chunk(output_fd, digest, chunks):
+        data = "".join(chunks).encode()
+        digest.update(data)
+        output_fd.write(data)
+        return len(data)
+
+    @staticmethod
+    def _is_unchanged(dest_path, digest, size, known_digest):
+        try:
+            if os.path.getsize(dest_path) != size:
+                return False
+        except OSError:
+            return False
+        if known_digest is not None:
+            return known_digest == digest
+        return hash_file(dest_path) == digest
+
+    def flush(self):
+        errors = self.errors
+        for dest_path, future in self.futures.items():
+            error = future.exception()
+            if error is not None:
+                errors[dest_path] = _format_error(error)
+        self.futures = {}
+        self.errors = {}
+        return errors
+
+    def close(self):
+        errors = self.flush()
+        if self.executor is not None:
+            self.executor.shutdown()
+        return errors
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+def _format_error(error):
+    return "".join(traceback.format_exception(error, limit=3))